@@ -0,0 +1,182 @@
+"""
+Offline index of retractions, corrections and expressions of concern, built from the related-article links in a local corpus.
+
+Amendments are published as separate articles (with `article-type` set to e.g. `retraction`), which link to the article
+they amend. A single pass over the corpus collects these links, so that checking whether an article was retracted
+is a dictionary lookup instead of a request to its landing page.
+Only the first few kilobytes of every file are read to get its article type, amendments are the only ones that are parsed.
+"""
+
+import json
+import os
+import re
+
+from rarticle import Article
+from xml_parsers import parse_front
+
+# bump this when the format of the saved index changes
+INDEX_VERSION = 1
+
+RETRACTION = 'retraction'
+CORRECTION = 'correction'
+EXPRESSION_OF_CONCERN = 'expression-of-concern'
+AMENDMENT_TYPES = (RETRACTION, CORRECTION, EXPRESSION_OF_CONCERN)
+
+# how many bytes are read from the start of a file to find the article type in the root element
+HEAD_SIZE = 4096
+_article_type_regex = re.compile(rb'<article\s[^>]*?\barticle-type\s*=\s*["\']([^"\']+)["\']')
+
+
+def get_stamp(path) -> list:
+    """
+    :return: size and modification time of `path` (the corpus zip or directory), which change whenever the corpus does.
+        For a directory, these are the number of files in it, their total size and the newest modification time of any of them
+        (files changed in place do not change the directory itself).
+    """
+    stat = os.stat(path)
+    if not os.path.isdir(path):
+        return [stat.st_size, stat.st_mtime_ns]
+    count, size, mtime = 0, 0, stat.st_mtime_ns
+    with os.scandir(path) as entries:
+        for entry in entries:
+            entry_stat = entry.stat()
+            count += 1
+            size += entry_stat.st_size
+            mtime = max(mtime, entry_stat.st_mtime_ns)
+    return [count, size, mtime]
+
+
+def read_article_type(head: bytes):
+    """
+    :param head: bytes from the start of an XML file
+    :return: the `article-type` attribute of the root element, or `None` if it is not in `head`
+    """
+    match = _article_type_regex.search(head)
+    return match.group(1).decode() if match else None
+
+
+def parse_amendment(xml_string):
+    """
+    Parses the front matter of an amendment article.
+
+    :return: a tuple `(amendment_type, doi, related_dois)`, where `related_dois` are the DOIs of the amended articles
+    :rtype: tuple
+    """
+    root = parse_front(xml_string)
+    if root is None:
+        raise ValueError("No front matter found.")
+    a = Article(root.find("front/article-meta/article-id[@pub-id-type='doi']").text.strip())
+    a.tree = root.getroottree()
+    return a.type_, a.doi, a.related_dois
+
+
+class AmendmentIndex:
+    """
+    Maps DOIs of amended articles to the DOIs of their retractions, corrections and expressions of concern.
+
+    Usage:
+    ```
+    index = AmendmentIndex.build(get_article_files())
+    index.save(path, stamp)
+    ...
+    index = AmendmentIndex.load(path, stamp)
+    if index is not None and index.is_retracted(doi):
+        ...
+    ```
+    DOIs are compared case-insensitively.
+    """
+
+    def __init__(self, entries = None):
+        """
+        :param entries: dictionary `{amended_doi: {amendment_type: [amendment_doi, ...]}}`
+        """
+        self._entries = entries if entries is not None else {}
+
+    def __contains__(self, doi):
+        return doi.lower() in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, amendment_type, doi, related_dois):
+        """
+        Records that the amendment `doi` (of type `amendment_type`) amends the articles `related_dois`.
+        """
+        for related_doi in related_dois:
+            amendments = self._entries.setdefault(related_doi.lower(), {})
+            dois = amendments.setdefault(amendment_type, [])
+            if doi not in dois:
+                dois.append(doi)
+
+    def get_amendments(self, doi) -> dict:
+        """
+        :return: dictionary `{amendment_type: [amendment_doi, ...]}` for the article `doi`, empty if it was never amended
+        """
+        return self._entries.get(doi.lower(), {})
+
+    def is_retracted(self, doi) -> bool:
+        return RETRACTION in self._entries.get(doi.lower(), ())
+
+    def is_corrected(self, doi) -> bool:
+        return CORRECTION in self._entries.get(doi.lower(), ())
+
+    @classmethod
+    def build(cls, article_files, logger = None):
+        """
+        Builds the index in a single pass over a corpus.
+
+        :param article_files: iterable of `(filename, fp)` tuples, where `fp` is opened for reading bytes. All of them are closed.
+        :param logger: if given, files that could not be parsed are logged to it
+        """
+        index = cls()
+        index.add_files(article_files, logger = logger)
+        return index
+
+    def add_files(self, article_files, logger = None) -> list:
+        """
+        Adds the amendments among `article_files` to the index, e.g. the files added to a corpus since the index was built.
+        For the parameters, see `build`.
+
+        :return: DOIs of the articles amended by these files
+        """
+        amended_dois = []
+        for filename, fp in article_files:
+            try:
+                head = fp.read(HEAD_SIZE)
+                article_type = read_article_type(head)
+                if article_type is not None and article_type not in AMENDMENT_TYPES:
+                    continue
+                amendment_type, doi, related_dois = parse_amendment(head + fp.read())
+                if amendment_type in AMENDMENT_TYPES:
+                    self.add(amendment_type, doi, related_dois)
+                    amended_dois += related_dois
+            except Exception as e:
+                if logger is not None:
+                    logger.error(f"There was a {e.__class__.__name__} while looking for amendments in {filename}: {str(e)}")
+            finally:
+                fp.close()
+        return amended_dois
+
+    def save(self, path, stamp = None):
+        """
+        Saves the index to a JSON file at `path`, together with the `stamp` of the corpus it was built from.
+        """
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as fp:
+            json.dump({'version': INDEX_VERSION, 'stamp': stamp, 'entries': self._entries}, fp)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, stamp = None, check_stamp = True):
+        """
+        :param check_stamp: if `False`, the index is loaded even if it was built from a corpus with a different `stamp`
+        :return: the index saved at `path`, or `None` if there is none, or it was built from a corpus with a different `stamp`
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as fp:
+                saved = json.load(fp)
+        except (OSError, ValueError):
+            return None
+        if saved.get('version') != INDEX_VERSION or (check_stamp and saved.get('stamp') != stamp):
+            return None
+        return cls(saved['entries'])
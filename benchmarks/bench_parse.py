@@ -0,0 +1,190 @@
+"""
+Benchmarks for `parse_article_xml` and `parse_subarticle` of the PLOS and eLife crawlers.
+
+Every benchmark runs in its own process (so that peak RSS is measured separately) over a fixed set of JATS files:
+either all XML files in a given directory, or a deterministic sample of the corpus zip/directory used by the crawler.
+Everything the crawlers write goes to a temporary directory, supplementary materials are never downloaded.
+
+Reports articles (or sub-articles) per second, p50/p99 latency per item and peak RSS,
+and saves the results to a JSON file, which can be compared with the results of a previous run:
+
+```python -m benchmarks.bench_parse --limit 500 --compare benchmarks/results/previous.json```
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+BENCHMARKS_DIR = os.path.abspath(os.path.dirname(__file__))
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, 'results')
+
+TARGETS = ['plos.parse_article_xml', 'plos.parse_subarticle', 'elife.parse_article_xml', 'elife.parse_subarticle']
+
+
+def get_crawler(source):
+    if source == 'plos':
+        import plos_crawler
+        return plos_crawler
+    import elife_crawler
+    return elife_crawler
+
+
+def get_default_fixtures(source):
+    """Location of the corpus which the crawler for `source` would use."""
+    crawler = get_crawler(source)
+    if source == 'plos':
+        return crawler.zipfile_path if os.path.exists(crawler.zipfile_path) else crawler.default_extract_dir
+    return getattr(crawler, 'elife_corpus_path', None)
+
+
+def load_fixtures(path, limit) -> list:
+    """
+    Reads up to `limit` XML files from `path`, which is either a zip or a directory.
+    The files are spread evenly over the sorted list of names, so the same ones are picked on every run.
+
+    :return: list of `(filename, xml_bytes)` tuples
+    """
+    from zip_index import get_zip_index
+    if os.path.isdir(path):
+        names = sorted(f for f in os.listdir(path) if f.lower().endswith('.xml'))
+        read = lambda name: open(os.path.join(path, name), 'rb').read()
+    else:
+        index = get_zip_index(path)
+        names = sorted(f for f in index.namelist() if f.lower().endswith('.xml'))
+        read = lambda name: index.open(name).read()
+    names = names[::max(1, len(names) // limit)][:limit]
+    return [(name, read(name)) for name in names]
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, round(q * (len(sorted_values) - 1)))]
+
+
+def summarize(latencies, errors, elapsed) -> dict:
+    latencies = sorted(latencies)
+    return {'items': len(latencies),
+            'errors': errors,
+            'items_per_sec': len(latencies) / elapsed if elapsed else None,
+            'p50_ms': percentile(latencies, 0.5) * 1000 if latencies else None,
+            'p99_ms': percentile(latencies, 0.99) * 1000 if latencies else None,
+            # on Linux, ru_maxrss is in kilobytes
+            'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+
+def run_target(target, fixtures_path, limit) -> dict:
+    """
+    Runs a single benchmark. Meant to be called in a fresh process.
+    """
+    source, function = target.split('.')
+    crawler = get_crawler(source)
+    fixtures = load_fixtures(fixtures_path, limit)
+    latencies, errors = [], 0
+    with tempfile.TemporaryDirectory() as output_dir:
+        crawler.all_articles_path = os.path.join(output_dir, 'all_articles')
+        crawler.filtered_path = os.path.join(output_dir, 'reviewed_articles')
+        os.makedirs(crawler.all_articles_path)
+        os.makedirs(crawler.filtered_path)
+        if function == 'parse_article_xml':
+            items = [xml for _, xml in fixtures]
+            call = lambda xml: crawler.parse_article_xml(xml, update = True, skip_sm_dl = True)
+        else:
+            items = [sub_a for _, xml in fixtures for sub_a in crawler.Article.from_xml(xml).get_subarticles()]
+            call = lambda sub_a: crawler.parse_subarticle(crawler.SubArticle(sub_a))
+        start = time.perf_counter()
+        for item in items:
+            t = time.perf_counter()
+            try:
+                call(item)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - t)
+        elapsed = time.perf_counter() - start
+    result = summarize(latencies, errors, elapsed)
+    result['fixtures'] = len(fixtures)
+    return result
+
+
+def get_git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=BENCHMARKS_DIR).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, previous, threshold) -> list:
+    """
+    :return: list of targets whose throughput dropped by more than `threshold` (a fraction) compared to `previous`
+    """
+    regressions = []
+    for target, result in results['results'].items():
+        old = previous['results'].get(target)
+        if not old or not old.get('items_per_sec') or not result.get('items_per_sec'):
+            continue
+        change = result['items_per_sec'] / old['items_per_sec'] - 1
+        print(f"{target:26} {old['items_per_sec']:10.1f} -> {result['items_per_sec']:10.1f} items/s ({change:+.1%})")
+        if change < -threshold:
+            regressions.append(target)
+    return regressions
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Benchmark parse_article_xml and parse_subarticle of the crawlers.")
+    parser.add_argument('--plos-fixtures', help='zip or directory with PLOS articles (defaults to the PLOS corpus)')
+    parser.add_argument('--elife-fixtures', help='zip or directory with eLife articles (defaults to the eLife corpus)')
+    parser.add_argument('--limit', type=int, default=500, help='number of articles taken from each corpus')
+    parser.add_argument('--targets', nargs='+', default=TARGETS, choices=TARGETS)
+    parser.add_argument('--output', help='where to save the results, defaults to a timestamped file in benchmarks/results')
+    parser.add_argument('--compare', help='results of a previous run to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1, help=
+                        'slowdown (as a fraction of items/s) which counts as a regression when comparing')
+    args = parser.parse_args(argv)
+
+    fixtures = {'plos': args.plos_fixtures, 'elife': args.elife_fixtures}
+    results = {'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+               'git_commit': get_git_commit(),
+               'python': platform.python_version(),
+               'limit': args.limit,
+               'results': {}}
+    for target in args.targets:
+        source = target.split('.')[0]
+        fixtures_path = fixtures[source] or get_default_fixtures(source)
+        if not fixtures_path or not os.path.exists(fixtures_path):
+            print(f"{target}: no fixtures found, skipping.")
+            continue
+        # a new process for every target, so that peak RSS does not carry over
+        with ProcessPoolExecutor(max_workers = 1, mp_context = get_context('spawn')) as executor:
+            result = executor.submit(run_target, target, fixtures_path, args.limit).result()
+        results['results'][target] = result
+        print(f"{target:26} {result['items']:6} items {result['items_per_sec']:10.1f}/s  "
+              f"p50 {result['p50_ms']:.2f} ms  p99 {result['p99_ms']:.2f} ms  "
+              f"peak RSS {result['peak_rss_kb'] / 1024:.0f} MB  errors {result['errors']}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"parse_{results['timestamp'].replace(':', '-')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as fp:
+        json.dump(results, fp, indent=2)
+    print(f"Results saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as fp:
+            regressions = compare(results, json.load(fp), args.threshold)
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+Benchmark for the shared parsers in `xml_parsers`, compared with `et.fromstring` with the default parser settings.
+
+Every file of a sample of eLife articles is parsed with both, and the serialized trees are compared,
+so that the benchmark also checks that the tuned parsers give the same output.
+
+```python -m benchmarks.bench_xml_parsers --limit 2000```
+"""
+
+import argparse
+import sys
+import time
+
+import lxml.etree as et
+
+from benchmarks.bench_parse import get_default_fixtures, load_fixtures
+
+
+def time_parser(parse, sources, repeat) -> float:
+    """:return: the best time (in seconds) of `repeat` runs of `parse` over all `sources`"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for source in sources:
+            parse(source)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Compare the shared XML parsers with the default lxml parser on eLife articles.")
+    parser.add_argument('--fixtures', help='zip or directory with eLife articles (defaults to the eLife corpus)')
+    parser.add_argument('--limit', type=int, default=2000, help='number of articles taken from the corpus')
+    parser.add_argument('--repeat', type=int, default=3, help='how many times every parser is run, the best time is reported')
+    args = parser.parse_args(argv)
+
+    from xml_parsers import parse_xml
+    fixtures_path = args.fixtures or get_default_fixtures('elife')
+    if not fixtures_path:
+        print("No eLife fixtures found.")
+        return 1
+    fixtures = load_fixtures(fixtures_path, args.limit)
+    sources = [xml for _, xml in fixtures]
+
+    mismatches = [name for name, xml in fixtures if et.tostring(et.fromstring(xml)) != et.tostring(parse_xml(xml))]
+    default = time_parser(et.fromstring, sources, args.repeat)
+    shared = time_parser(parse_xml, sources, args.repeat)
+
+    size = sum(len(source) for source in sources) / 1024 / 1024
+    print(f"{len(sources)} articles, {size:.1f} MB")
+    print(f"et.fromstring:          {len(sources) / default:10.1f} articles/s {size / default:8.1f} MB/s")
+    print(f"xml_parsers.parse_xml:  {len(sources) / shared:10.1f} articles/s {size / shared:8.1f} MB/s ({default / shared - 1:+.1%})")
+    print(f"different output: {len(mismatches)} {' '.join(mismatches[:10])}")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
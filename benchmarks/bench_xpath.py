@@ -0,0 +1,91 @@
+"""
+Micro-benchmark for the XPath lookups of `rarticle.Article`.
+
+Covers every expression `Article` used to evaluate: the ones still looked up with XPath (`rarticle.XPATHS`)
+and the paths of the front matter which `rarticle.FrontMatter` now collects in one walk (`FrontMatter.EXPRESSIONS`).
+Over the same set of eLife articles (parsed once, before timing), measures the time per article of:
+- evaluating all of them, compiled again on every lookup (which is what `root.xpath(expression)` does),
+- evaluating all of them, precompiled,
+- what `Article` does now: the expressions of `XPATHS`, precompiled, and one `FrontMatter` walk.
+
+```python -m benchmarks.bench_xpath --limit 2000```
+"""
+
+import argparse
+import sys
+import time
+
+import lxml.etree as et
+
+from benchmarks.bench_parse import get_default_fixtures, load_fixtures
+
+
+def evaluate_all(articles, expressions, get_xpath):
+    """
+    :param get_xpath: returns the `XPath` of an expression, called for every lookup
+    """
+    for a in articles:
+        root = a.root
+        for expression in expressions:
+            get_xpath(expression)(root)
+
+
+def evaluate_current(rarticle, articles):
+    for a in articles:
+        root = a.root
+        for xpath in rarticle.XPATHS.values():
+            xpath(root)
+        rarticle.FrontMatter(root)
+
+
+def time_best(run, repeat) -> float:
+    """:return: the best time (in seconds) of `repeat` calls of `run`"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Compare the XPath lookups of rarticle.Article compiled on every lookup, precompiled, and replaced by FrontMatter.")
+    parser.add_argument('--fixtures', help='zip or directory with eLife articles (defaults to the eLife corpus)')
+    parser.add_argument('--limit', type=int, default=2000, help='number of articles taken from the corpus')
+    parser.add_argument('--repeat', type=int, default=3, help='how many times every variant is run, the best time is reported')
+    args = parser.parse_args(argv)
+
+    import rarticle
+    fixtures_path = args.fixtures or get_default_fixtures('elife')
+    if not fixtures_path:
+        print("No eLife fixtures found.")
+        return 1
+    articles = []
+    for _, xml in load_fixtures(fixtures_path, args.limit):
+        try:
+            articles.append(rarticle.Article.from_xml(xml))
+        except Exception:
+            pass
+    if not articles:
+        print("No articles could be parsed.")
+        return 1
+
+    expressions = list(dict.fromkeys([*rarticle.XPATHS, *rarticle.FrontMatter.EXPRESSIONS.values()]))
+    compiled = {expression: et.XPath(expression) for expression in expressions}
+    uncompiled = time_best(lambda: evaluate_all(articles, expressions, et.XPath), args.repeat)
+    precompiled = time_best(lambda: evaluate_all(articles, expressions, compiled.__getitem__), args.repeat)
+    current = time_best(lambda: evaluate_current(rarticle, articles), args.repeat)
+
+    per_article = lambda seconds: seconds / len(articles) * 1e6
+    print(f"{len(articles)} articles, {len(expressions)} XPath expressions each "
+          f"({len(rarticle.FrontMatter.EXPRESSIONS)} of them replaced by FrontMatter)")
+    print(f"compiled on every lookup:  {per_article(uncompiled):10.1f} us/article")
+    print(f"precompiled:               {per_article(precompiled):10.1f} us/article")
+    print(f"XPATHS + FrontMatter:      {per_article(current):10.1f} us/article")
+    print(f"saving:                    {per_article(uncompiled - current):10.1f} us/article ({1 - current / uncompiled:.1%})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+Background downloader for supplementary materials of reviewed articles.
+
+Files are downloaded by a small pool of threads, each keeping its own `requests.Session` (so connections are kept alive and reused, see `sessions`).
+Responses are streamed to disk in chunks, into a `.part` file which is renamed once the download is complete.
+If a `.part` file already exists, the download is resumed with a Range request. Failed downloads are retried with exponential backoff,
+except for client errors (4xx) other than `RETRIED_STATUS_CODES`, which would only fail again.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from sessions import ThreadSessions
+from utils import get_logger
+
+logger = get_logger("downloader")
+
+PART_SUFFIX = '.part'
+
+# client errors which may go away when the request is sent again: Request Timeout and Too Many Requests
+RETRIED_STATUS_CODES = {408, 429}
+
+
+def download_file(url, path, session = None, chunk_size = 64*1024, timeout = 30):
+    """
+    Downloads the file from `url` to `path`, streaming it to disk in chunks of `chunk_size` bytes.
+    An incomplete download (a file `path` + `PART_SUFFIX`) is resumed with a Range request, if the server supports it.
+
+    :param session: `requests.Session` used for the request, if `None` then a new connection is made
+    :raises requests.RequestException: if the download failed
+    """
+    part_path = path + PART_SUFFIX
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = {'Range': f'bytes={offset}-'} if offset else {}
+    get = session.get if session is not None else requests.get
+    with get(url, stream=True, headers=headers, timeout=timeout) as r:
+        if offset and r.status_code == 416:
+            # the server has nothing past `offset`, so the previous download was already complete
+            os.replace(part_path, path)
+            return
+        r.raise_for_status()
+        mode = 'ab' if offset and r.status_code == 206 else 'wb'
+        with open(part_path, mode) as fp:
+            for chunk in r.iter_content(chunk_size=chunk_size):
+                fp.write(chunk)
+    os.replace(part_path, path)
+
+
+def try_download_file(url, path, **kwargs) -> bool:
+    """
+    Same as `download_file`, but an error is logged instead of raised (and the download is not retried),
+    so that a missing supplementary material does not stop the article it belongs to, like in `Downloader`.
+
+    :param kwargs: passed on to `download_file`
+    :return: `True` if the file was downloaded
+    """
+    try:
+        download_file(url, path, **kwargs)
+        return True
+    except (requests.RequestException, OSError) as e:
+        logger.error(f'There was a {e.__class__.__name__} while downloading {url}: {str(e)}')
+        return False
+
+
+def is_final(e) -> bool:
+    """Whether a download which failed with `e` would fail again, i.e. the server answered with a client error that is not in `RETRIED_STATUS_CODES`."""
+    response = getattr(e, 'response', None)
+    if not isinstance(e, requests.HTTPError) or response is None:
+        return False
+    return 400 <= response.status_code < 500 and response.status_code not in RETRIED_STATUS_CODES
+
+
+class Downloader:
+    """
+    Downloads files in background threads, so that parsing does not have to wait for the network.
+
+    Usage:
+    ```
+    with Downloader() as downloader:
+        downloader.submit(url, path)
+        ...
+    # all downloads are finished here
+    ```
+    `submit` blocks when `max_queued` downloads are already waiting, which keeps the queue bounded.
+    Downloads which failed after all retries (or with a client error, see `is_final`) are listed in `failed` as `(url, path)` tuples.
+    """
+
+    def __init__(self, max_workers = 4, max_queued = 64, retries = 3, backoff = 0.5, chunk_size = 64*1024, timeout = 30):
+        """
+        :param max_workers: number of download threads
+        :param max_queued: maximum number of downloads that were submitted, but are not finished yet
+        :param retries: how many times a failed download is retried
+        :param backoff: seconds to wait before the first retry, doubled for every next one
+        """
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.failed = []
+        self._executor = ThreadPoolExecutor(max_workers = max_workers, thread_name_prefix = 'downloader')
+        self._slots = threading.BoundedSemaphore(max_queued)
+        self._sessions = ThreadSessions()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _download(self, url, path) -> bool:
+        for attempt in range(self.retries + 1):
+            try:
+                download_file(url, path, session = self._sessions.get(), chunk_size = self.chunk_size, timeout = self.timeout)
+                logger.debug(f'Downloaded {url} to {path}')
+                return True
+            except (requests.RequestException, OSError) as e:
+                if attempt == self.retries or is_final(e):
+                    logger.error(f'There was a {e.__class__.__name__} while downloading {url}, giving up: {str(e)}')
+                    break
+                delay = self.backoff * 2**attempt
+                logger.info(f'There was a {e.__class__.__name__} while downloading {url}, retrying in {delay} seconds: {str(e)}')
+                time.sleep(delay)
+        with self._lock:
+            self.failed.append((url, path))
+        return False
+
+    def submit(self, url, path):
+        """
+        Queues the file at `url` to be downloaded to `path`.
+
+        :return: a `Future` which resolves to `True` if the file was downloaded
+        """
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(self._download, url, path)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def close(self):
+        """
+        Waits for all queued downloads to finish and closes the sessions.
+        """
+        self._executor.shutdown(wait = True)
+        self._sessions.close()
+        if self.failed:
+            logger.warning(f'{len(self.failed)} downloads failed.')
@@ -1,15 +1,24 @@
 from genericpath import isdir
 import json
 import os
-from zipfile import ZipFile
 import zipfile
-import requests
-import lxml.etree as et
 
-from rarticle import Article
+from amendments import AmendmentIndex, get_stamp
+from downloader import Downloader, try_download_file
+from file_writer import FileWriter
+from rarticle import Article, SubArticle
+from review_crawler import ReviewCrawler
+from shards import ShardWriter
+from timings import Timings
+from xml_parsers import parse_stream
+from zip_index import get_zip_index
 from utils import get_logger, get_extension_from_str, CRAWLER_DIR, OUTPUT_DIR, INPUT_DIR
 
 logger = get_logger("elife")
+# time spent on every metadata field and I/O step in `parse_article_xml`, only measured when enabled
+timings = Timings()
+# retractions and corrections found in the corpus, `parse_article_xml` uses it to fill in `retracted`
+amendment_index = AmendmentIndex()
 
 # globals:
 
@@ -31,15 +40,50 @@ else:
 # this is where parsed data is stored:
 ALL_ARTICLES_DIR = os.path.join("elife", "all_articles" )
 FILTERED_DIR = os.path.join("elife", "reviewed_articles")
+ALL_ARTICLES_SHARDS_DIR = os.path.join("elife", "all_articles_jsonl")
 all_articles_path = os.path.join(OUTPUT_DIR, ALL_ARTICLES_DIR)
+all_articles_shards_path = os.path.join(OUTPUT_DIR, ALL_ARTICLES_SHARDS_DIR)
 filtered_path = os.path.join(OUTPUT_DIR, FILTERED_DIR)
+# links between amendments and the articles they amend, see `amendments.AmendmentIndex`
+amendment_index_path = os.path.join(OUTPUT_DIR, "elife", "amendments.json")
+# the newest version of every article that was parsed, see `load_versions`
+version_index_path = os.path.join(OUTPUT_DIR, "elife", "versions.json")
+# bump this when the format of the saved versions changes
+VERSION_INDEX_VERSION = 1
+# articles larger than this (in bytes, uncompressed) are parsed in chunks instead of being read whole, see `ElifeCrawler.read_article`
+MAX_ARTICLE_SIZE = 4*1024*1024
 
 
 
 # transformations:
 
 def filename_to_short_doi(filename: str) -> str:
-    return filename.replace('-', '.', 1).split('-')[0]
+    """
+    'elife-article-xml-master/articles/elife-00003-v2.xml' -> 'eLife.00003', the same as `doi_to_short_doi` of the article's DOI.
+    """
+    stem = os.path.basename(filename).split('-v')[0]
+    prefix, _, number = stem.partition('-')
+    if not number:
+        return stem
+    return ('eLife' if prefix.lower() == 'elife' else prefix) + '.' + number
+
+def split_version(filename: str) -> tuple:
+    """
+    'elife-00003-v2.xml' -> ('elife-00003', 2)
+
+    :raises ValueError: if there is no version number in `filename`
+    """
+    splat = os.path.splitext(filename)[0].split('-v')
+    return splat[0], int(splat[-1])
+
+def get_version(filename: str) -> int:
+    """
+    'elife-00003-v2.xml' -> 2, or -1 if there is no version number in `filename`
+    """
+    try:
+        return split_version(filename)[1]
+    except ValueError:
+        return -1
 
 def doi_to_short_doi(doi: str) -> str:
     return doi.split('/')[-1]
@@ -48,13 +92,11 @@ def doi_to_url(doi: str) -> str:
     return "https://elifesciences.org/articles/" + doi.split('.')[-1]
 
 
-def parse_subarticle(root: et.Element) -> dict:
+def parse_subarticle(sub_article: SubArticle) -> dict:
     metadata = {}
-    front = root.find('front-stub')
-    body = root.find('body')
 
-    metadata['type'] = root.attrib['article-type']
-    metadata['doi'] = front.find('article-id').text.strip()
+    metadata['type'] = sub_article.type_
+    metadata['doi'] = sub_article.doi
     # here ends super code
     orig_doi = metadata['doi'].rsplit('.', 1)[0]
     metadata['original_article_doi'] = orig_doi
@@ -71,26 +113,22 @@ def parse_subarticle(root: et.Element) -> dict:
     # TODO: parse rounds: in eLife they are containd within the same sub-article sometimes
     
     metadata['reviewers'] = []
-    for contrib in front.findall('.//contrib'):
-        if contrib.attrib['contrib-type'] == "reviewer":
-            metadata['reviewers'].append({
-                'name': f"{contrib.find('.//given-names').text.strip()} {contrib.find('.//surname').text.strip()}"
-            })
+    for contrib_type, name in sub_article.contributors:
+        if contrib_type == "reviewer":
+            metadata['reviewers'].append({'name': name})
         else:
-            metadata[contrib.attrib['contrib-type']] = {
-                'name': f"{contrib.find('.//given-names').text.strip()} {contrib.find('.//surname').text.strip()}"
-            }
+            metadata[contrib_type] = {'name': name}
     # TODO: find out reviewer numbers and how many reviewers were anonymous
 
     # find supplementary materials (if any):
     supplementary, i = [], 1
     # TODO: code below was copied directly from PLOS and may not work for eLife supplementary materials (if there are any)
-    for elem in body.findall('supplementary-material'):
+    for _, original_filename in sub_article.supplementary_materials:
         # arbitrary generaion of id's
         sm_id = a_short_doi+'.s'+str(i)
         i+=1
         sm = {'id': sm_id, # these will be in "short" doi format
-              'original_filename': elem.find('.//named-content').text}
+              'original_filename': original_filename}
         sm['filename'] = sm['id'] + get_extension_from_str(sm['original_filename'])
         supplementary.append(sm)
     metadata['supplementary_materials'] = supplementary
@@ -98,7 +136,8 @@ def parse_subarticle(root: et.Element) -> dict:
     return metadata
 
 
-def parse_article_xml(xml_string: str, update = False, skip_sm_dl = False) -> dict:
+def parse_article_xml(xml_string: str, update = False, skip_sm_dl = False, downloader = None, writer = None, save_all_articles = True,
+                      with_stats = False) -> dict:
     """
     Parses an XML string that's assumed to contain a research article.
     This function relies on the `Article` class (originally from `allofplos` library) to extract metadata from XML.
@@ -107,30 +146,49 @@ def parse_article_xml(xml_string: str, update = False, skip_sm_dl = False) -> di
     Files containing reviewed articles, their sub-articles and supplementary materials are saved to sub-directories in `FILTERED_DIR`. 
     Metadata in JSON format is also saved there. 
 
-    :param xml_string: XML-encoded string containing a research article.
+    :param xml_string: XML-encoded string containing a research article, or its root element if it was already parsed (e.g. with `xml_parsers.parse_stream`).
     :param update: if set to `True`, existing files will be overwritten.
     :param skip_sm_dl: whether to skip downloading supplementary materials.
+    :param downloader: a `Downloader` to queue supplementary materials to. If `None`, they are downloaded before this function returns.
+    :param writer: a `FileWriter` to write files through, e.g. an `AsyncWriter`. If `None`, they are written before this function returns.
+    :param save_all_articles: whether to save metadata to `ALL_ARTICLES_DIR`. Set to `False` when the caller stores it somewhere else (e.g. in shards).
+    :param with_stats: whether to add the numbers of figures, tables, equations, references, sub-articles and words to metadata (as `stats`).
     :return: dictionary object containing parsed metadata
     :rtype: dict
     """
-    a = Article.from_xml(xml_string)
+    if writer is None:
+        writer = FileWriter()
+    with timings('parse'):
+        a = Article.from_xml(xml_string) if isinstance(xml_string, (bytes, str)) else Article.from_root(xml_string)
     a_short_doi = doi_to_short_doi(a.doi)
     metadata = {}
     # get metadata from Article object:
-    metadata['doi'] = a.doi
-    metadata['title'] = a.title
-    metadata['url'] = doi_to_url(a.doi)
+    with timings('doi'):
+        metadata['doi'] = a.doi
+    with timings('title'):
+        metadata['title'] = a.title
+    with timings('url'):
+        metadata['url'] = doi_to_url(a.doi)
     # metadata['fulltext_pdf_url'] =  TODO: some kind of link is available in the XML, but it's relative and I don't the base form
-    metadata['journal'] = {'title': a.journal, 'volume': a.volume}  # elife journals don't have issues
-    metadata['publication_date'] = {'year': a.pubdate.year,
-                                    'month': a.pubdate.month, 
-                                    'day': a.pubdate.day}
-    metadata['authors'] = a.get_author_names()
-    metadata['keywords'] = a.keywords
-    metadata['retracted'] = False # TODO: change to check_if_article_retracted
+    with timings('journal'):
+        metadata['journal'] = {'title': a.journal, 'volume': a.volume}  # elife journals don't have issues
+    with timings('publication_date'):
+        metadata['publication_date'] = {'year': a.pubdate.year,
+                                        'month': a.pubdate.month, 
+                                        'day': a.pubdate.day}
+    with timings('authors'):
+        metadata['authors'] = a.get_author_names()
+    with timings('keywords'):
+        metadata['keywords'] = a.keywords
+    metadata['retracted'] = amendment_index.is_retracted(a.doi)
+    if with_stats:
+        with timings('stats'):
+            metadata['stats'] = a.stats.to_dict()
     
+    with timings('get_subarticles'):
+        sub_articles = [SubArticle(sub_a) for sub_a in a.get_subarticles()]
     # assuming if sub-articles are present, then article was reviewed
-    if len(a.get_subarticles()) > 0:
+    if len(sub_articles) > 0:
         metadata["has_reviews"] = True
         # TODO: provide a link to reviews!
         metadata['sub_articles'] = []
@@ -138,62 +196,128 @@ def parse_article_xml(xml_string: str, update = False, skip_sm_dl = False) -> di
         article_dir = os.path.join(filtered_path, a_short_doi)
         sub_articles_dir = os.path.join(article_dir, "sub-articles")
         logger.info(f'this article probably has reviews! It will be saved to {FILTERED_DIR}.')
+        # the directory is created by `writer` with the first file written to it
         write_files = True
-        if not os.path.exists(article_dir):
-            os.makedirs(article_dir, exist_ok=False)
-        elif update:
-            logger.warning(f"files for article {a_short_doi} and its sub-articles already exist in {FILTERED_DIR} and will be overwritten.")
-        else:
-            write_files = False
+        if os.path.exists(article_dir):
+            if update:
+                logger.warning(f"files for article {a_short_doi} and its sub-articles already exist in {FILTERED_DIR} and will be overwritten.")
+            else:
+                write_files = False
         logger.debug("Parsing sub-articles...")
         # iterate over sub-articles
-        for sub_a in a.get_subarticles():
-            subtree = et.ElementTree(sub_a)
-            sub_a_metadata = parse_subarticle(sub_a)
+        for sub_a in sub_articles:
+            with timings('parse_subarticle'):
+                sub_a_metadata = parse_subarticle(sub_a)
             # find a warning (if any)
             # boxed_text = subtree.find('.//boxed-text')
             # if boxed_text is not None:
             #     logger.warning(f"found boxed_text in {sub_a_metadata['doi']}:\n{boxed_text.find('.//p').text.strip()}")
             if write_files:
-                if not os.path.exists(sub_articles_dir):
-                    os.mkdir(sub_articles_dir)
                 # download supplementary materials (if any)
                 if not skip_sm_dl and 'supplementary_materials' in sub_a_metadata.keys():
+                    # downloads are written straight to the directory, so it has to exist already
+                    writer.makedirs(sub_articles_dir)
                     for sm in sub_a_metadata['supplementary_materials']:
-                        with open(os.path.join(sub_articles_dir, sm['filename']), 'wb') as fp:
-                            url = 'https://doi.org/' + metadata['doi'] + get_extension_from_str(sm['id'])
+                        sm_path = os.path.join(sub_articles_dir, sm['filename'])
+                        url = 'https://doi.org/' + metadata['doi'] + get_extension_from_str(sm['id'])
+                        if downloader is not None:
+                            logger.debug(f'Queueing supplementary material from {url} for download')
+                            downloader.submit(url, sm_path)
+                        else:
                             logger.debug(f'Downloading supplementary material from {url}')
-                            r = requests.get(url, stream=True)
-                            fp.write(r.content)
+                            try_download_file(url, sm_path)
                  # saving this sub-article:
                 sub_a_filename = sub_a_metadata['id'] + '.xml'
                 sub_a_path = os.path.join(sub_articles_dir, sub_a_filename)
-                subtree.write(sub_a_path)
+                with timings('write_sub_article_xml'):
+                    writer.write_tree(sub_a_path, sub_a.tree)
                 sub_a_metadata['supplementary_materials'].append({
                     'filename': sub_a_filename, 'id': sub_a_metadata['id'], 'title': "This sub_article in XML."
                 })
                 # save metadata to JSON:
-                with open(os.path.join(sub_articles_dir, sub_a_metadata['id'] + '.json'), 'w+') as fp:
-                    json.dump(sub_a_metadata, fp)
+                with timings('write_sub_article_json'):
+                    writer.write_json(os.path.join(sub_articles_dir, sub_a_metadata['id'] + '.json'), sub_a_metadata)
                 logger.debug(f"sub-article {sub_a_metadata['doi']} saved to {FILTERED_DIR}{os.path.sep}{a_short_doi}")
             metadata['sub_articles'].append(sub_a_metadata)
             
         if write_files:
             # save this article's XML
-            a.tree.write(os.path.join(article_dir, a.filename))
+            with timings('write_article_xml'):
+                writer.write_tree(os.path.join(article_dir, a.filename), a.tree)
             # save metadata to the same directory
-            with open(os.path.join(article_dir, "metadata.json"), 'w+') as fp:
-                json.dump(metadata, fp)
+            with timings('write_metadata_json'):
+                writer.write_json(os.path.join(article_dir, "metadata.json"), metadata)
     else:
         metadata['has_reviews'] = False
+    # everything was extracted and written, so the tree can be freed before the next article is parsed
+    a.release()
 
     # finally, save metadata to all_articles
+    if save_all_articles:
+        save_metadata(metadata, update = update, writer = writer)
+    return metadata
+
+
+def save_metadata(metadata, update = False, writer = None):
+    """
+    Saves metadata returned by `parse_article_xml` to `ALL_ARTICLES_DIR`.
+
+    :param update: if set to `True`, an existing file will be overwritten.
+    :param writer: a `FileWriter` to write the file through. If `None`, it is written before this function returns.
+    """
+    a_short_doi = doi_to_short_doi(metadata['doi'])
     _filename = os.path.join(all_articles_path, a_short_doi + ".json")
     if update or not os.path.exists(_filename):
-        with open(_filename, 'w+') as fp:
-            json.dump(metadata, fp)
+        with timings('write_all_articles_json'):
+            (writer if writer is not None else FileWriter()).write_json(_filename, metadata)
         logger.debug(f"metadata for {a_short_doi} saved to {ALL_ARTICLES_DIR}.")
-    return metadata
+
+
+def get_newest_versions(filenames) -> dict:
+    """
+    Finds the newest version of every article in a single pass over the names of files in the eLife corpus.
+
+    :return: dictionary `{article: (version, filename)}`, where `article` is the filename without the version and extension.
+        Files without a version number are kept under their own name, with version -1.
+    """
+    articles = {}
+    for filename in filenames:
+        # ignore everything that is not an XML
+        if os.path.splitext(filename)[1].lower() != '.xml':
+            continue
+        try:
+            article, v_no = split_version(filename)
+            if article in articles:
+                if v_no < articles[article][0]:
+                    continue
+            articles[article] = v_no, filename
+        except Exception as e:
+            logger.info(f"Surprising filename found: {filename}|Exception caught: {e}")
+            articles[filename] = -1, filename
+    return articles
+
+
+def load_versions(path) -> dict:
+    """
+    :return: dictionary `{short_doi: version}` with the newest version of every article parsed in the previous runs,
+        empty if it was never saved (or was saved in a different format)
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as fp:
+            saved = json.load(fp)
+    except (OSError, ValueError):
+        return {}
+    if saved.get('version') != VERSION_INDEX_VERSION:
+        return {}
+    return saved['articles']
+
+
+def save_versions(path, versions):
+    tmp_path = path + '.tmp'
+    os.makedirs(os.path.dirname(path), exist_ok = True)
+    with open(tmp_path, 'w', encoding='utf-8') as fp:
+        json.dump({'version': VERSION_INDEX_VERSION, 'articles': versions}, fp)
+    os.replace(tmp_path, path)
 
 
 def get_article_files(input_path):
@@ -205,34 +329,22 @@ def get_article_files(input_path):
 
     Yields:
         tuple: a tuple: `(filename, fp)` where `fp` is a readable filepointer to the file named `filename`.
+
+    Raises:
+        zipfile.BadZipFile, OSError: if `input_path` is neither a directory nor a readable zip file
     """
     
     if os.path.isdir(input_path):
         filenames = os.listdir(input_path)
     else:
         try:
-            elife_zip = ZipFile(input_path, 'r')
-            filenames = elife_zip.namelist()
-        except:
-            logger.error("The provided path is not a valid archive.")
-        
-    articles = {}
-    for filename in filenames:
-        filen = os.path.splitext(filename)
-        # ignore everything that is not an XML
-        if filen[1].lower() != '.xml':
-            continue
-        try:
-            splat = filen[0].split('-v')
-            v_no = int(splat[-1])
-            if splat[0] in articles:
-                if v_no < articles[splat[0]][0]:
-                    continue
-            articles[splat[0]] = v_no, filename
-        except Exception as e:
-            logger.info(f"Surprising filename found: {filename}|Exception caught: {e}")
-            articles[filename] = -1, filename
-        
+            elife_zip = get_zip_index(input_path)
+        except (zipfile.BadZipFile, OSError):
+            logger.error(f"{input_path} is neither a directory nor a valid archive.")
+            raise
+        filenames = elife_zip.namelist()
+
+    articles = get_newest_versions(filenames)
     for a in articles:
         v_no, filename = articles[a]
         if os.path.isdir(input_path):
@@ -242,14 +354,138 @@ def get_article_files(input_path):
         yield filename, fp
         
 
+def get_article_size(input_path, filename, zip_index = None) -> int:
+    """
+    :param zip_index: `ZipIndex` of `input_path` if it is a zip, looked up (and checked for changes) on every call if `None`
+    :return: size in bytes of a file from the eLife corpus (uncompressed, if it is in a zip)
+    """
+    if zip_index is not None:
+        return zip_index.getinfo(filename).file_size
+    if os.path.isdir(input_path):
+        return os.path.getsize(os.path.join(input_path, filename))
+    return get_zip_index(input_path).getinfo(filename).file_size
+
+
+def get_amendment_index(input_path) -> AmendmentIndex:
+    """
+    Loads the index of retractions and corrections in the eLife corpus from `amendment_index_path`.
+    If the corpus changed since it was saved (or it was never saved), the index is built again in a single pass over the corpus.
+
+    :param input_path: should point either to a zip file or a directory containing eLife XML articles
+    """
+    stamp = get_stamp(input_path)
+    index = AmendmentIndex.load(amendment_index_path, stamp)
+    if index is None:
+        logger.info("looking for retractions and corrections in the eLife corpus...")
+        index = AmendmentIndex.build(get_article_files(input_path), logger = logger)
+        os.makedirs(os.path.dirname(amendment_index_path), exist_ok = True)
+        index.save(amendment_index_path, stamp)
+        logger.info(f"found amendments of {len(index)} articles, saved them to {amendment_index_path}.")
+    return index
+
+
 def process_article(a_filename, update = False, skip_sm_dl = False):
     logger.info(f'Processing {a_filename}')
     with open(a_filename, 'rb') as fp:
         a_xml = fp.read()
     return  parse_article_xml(a_xml, update = update, skip_sm_dl = skip_sm_dl)
+
+
+class ElifeCrawler(ReviewCrawler):
+    """
+    Runs every article from the eLife corpus through the `ReviewCrawler` pipeline, see `process_elife_corpus`.
+    Articles which were already parsed are skipped before they are read, metadata is saved to `ALL_ARTICLES_DIR` (or to shards) in the write stage.
+    """
+
+    def __init__(self, input_path, update = False, skip_sm_dl = False, downloader = None, shard_writer = None, with_stats = False,
+                 parse_workers = 1, max_article_size = MAX_ARTICLE_SIZE):
+        """
+        :param shard_writer: a `ShardWriter` to save metadata to, if `None` then it is saved to `ALL_ARTICLES_DIR`
+        :param parse_workers: number of threads parsing articles
+        :param max_article_size: articles larger than this many bytes are parsed in chunks (see `read_article`), `None` for no limit
+        For the other parameters, see `process_elife_corpus`.
+        """
+        super().__init__(logger, timings = timings, parse_workers = parse_workers)
+        self.input_path = input_path
+        self.update = update
+        self.skip_sm_dl = skip_sm_dl
+        self.downloader = downloader
+        self.shard_writer = shard_writer
+        self.with_stats = with_stats
+        self.max_article_size = max_article_size
+        # resolved once, instead of checking whether the zip changed for every article in `read_article`
+        self.zip_index = None
+        if max_article_size is not None and not os.path.isdir(input_path):
+            self.zip_index = get_zip_index(input_path)
+        # short DOIs of articles with a directory in `FILTERED_DIR` and with metadata in `ALL_ARTICLES_DIR`,
+        # listed once here and then kept up to date, instead of checking the file system for every article
+        self.reviewed = set(os.listdir(filtered_path))
+        self.processed = {os.path.splitext(f)[0] for f in os.listdir(all_articles_path)} if shard_writer is None else set()
+        self.versions = load_versions(version_index_path)
+
+    def get_article_files(self):
+        return get_article_files(self.input_path)
+
+    def should_parse(self, filename) -> bool:
+        a_short_doi = filename_to_short_doi(filename)     # TODO: find a better, universal way to get identifiers from filenames
+        version = get_version(filename)
+        if self.shard_writer is not None:
+            metadata_file_exists = a_short_doi in self.shard_writer
+        else:
+            metadata_file_exists = a_short_doi in self.processed
+        # articles are parsed again when a newer version was added, or when it is not known which version was parsed
+        already_parsed = metadata_file_exists and self.versions.get(a_short_doi, -1) >= version >= 0
+        # skipping files that were already parsed:
+        if already_parsed and not self.update and not a_short_doi in self.reviewed:    # NOTE: reviewed articles are NEVER skipped
+            logger.debug(f'Skipping {filename} as it was already parsed.')
+            return False
+        elif metadata_file_exists and self.update: 
+            logger.warning(f"file with metadata for {a_short_doi} already exists in {ALL_ARTICLES_DIR} and will be overwritten.")
+        logger.info(f'Processing {filename}')
+        return True
+
+    def read_article(self, filename, fp):
+        """
+        Reads small articles whole, so that they are parsed in the parse stage from a single string.
+        Articles larger than `max_article_size` are fed to the parser in chunks right away (see `xml_parsers.parse_stream`),
+        so their raw bytes and their tree are never in memory together. Their root element is handed to the parse stage instead.
+        """
+        if self.max_article_size is not None and get_article_size(self.input_path, filename, self.zip_index) > self.max_article_size:
+            logger.debug(f'{filename} is larger than {self.max_article_size} bytes, parsing it in chunks.')
+            return parse_stream(fp)
+        return fp.read()
+
+    def parse_article_xml(self, xml_string, writer) -> dict:
+        return parse_article_xml(xml_string, update = self.update, skip_sm_dl = self.skip_sm_dl, downloader = self.downloader,
+                                 writer = writer, save_all_articles = False, with_stats = self.with_stats)
+
+    def parse_subarticle(self, sub_article) -> dict:
+        return parse_subarticle(sub_article)
+
+    def write_outcome(self, filename, metadata, files):
+        if metadata is None:
+            return
+        written_short_doi = doi_to_short_doi(metadata['doi'])
+        if self.shard_writer is None:
+            save_metadata(metadata, update = self.update, writer = files)
+        with self.lock:
+            if self.shard_writer is not None:
+                self.shard_writer.write(written_short_doi, metadata)
+            else:
+                self.processed.add(written_short_doi)
+            if metadata['has_reviews']:
+                self.reviewed.add(written_short_doi)
+            # an article with files which could not be written is parsed again in the next run, see `write_failed`
+            if not files.failed:
+                self.versions[filename_to_short_doi(filename)] = get_version(filename)
+
+    def write_failed(self, filename, files):
+        with self.lock:
+            self.versions.pop(filename_to_short_doi(filename), None)
     
 
-def process_elife_corpus(input_path, update = False, skip_sm_dl = False):
+def process_elife_corpus(input_path, update = False, skip_sm_dl = False, output_format = 'json', flush_size = 1000, instrument = False,
+                         check_retractions = True, with_stats = False, parse_workers = 1, max_article_size = MAX_ARTICLE_SIZE):
     """
     Goes through the eLife corpus, parses metadata from each article.
     For each article in the corpus, metadata is extracted and stored in a JSON file in `ALL_ARTICLES_DIR`. 
@@ -259,44 +495,59 @@ def process_elife_corpus(input_path, update = False, skip_sm_dl = False):
     Sub-articles (reviews, decision letters etc.) are saved to subdirectories named 'sub-articles'.
     
     :param input_path: should point either to a zip file or a directory containing eLife XML articles
-    :param update: if is set to `True`, already existing files will be overwritten. Otherwise (and by default), files that were already parsed are skipped.
+    :param update: if is set to `True`, already existing files will be overwritten. Otherwise (and by default), articles that were already parsed
+        are skipped, unless a newer version of them was added to the corpus since then. The version parsed last time is kept in `version_index_path`.
     :param skip_sm_dl: whether to skip downloading supplementary materials. 
+    :param output_format: `'json'` to save metadata of every article to its own file in `ALL_ARTICLES_DIR`,
+        or `'jsonl'` to append it to JSON Lines shards in `ALL_ARTICLES_SHARDS_DIR` (see `shards.ShardWriter`).
+    :param flush_size: with `output_format='jsonl'`, how many records are buffered before they are written to the shards.
+    :param instrument: if set to `True`, the time spent on every metadata field and I/O step is measured and a summary is logged at the end.
+    :param check_retractions: if set to `True`, `retracted` is filled in from the index of amendments in the corpus (see `get_amendment_index`).
+        Otherwise, it is always `False`.
+    :param with_stats: if set to `True`, size statistics of every article are added to its metadata (see `rarticle.ArticleStats`).
+    :param parse_workers: number of threads parsing articles, while other threads read the corpus and write the outputs (see `ElifeCrawler`).
+    :param max_article_size: memory cap per article: files larger than this many bytes (uncompressed) are never read whole,
+        but fed to the parser in chunks. `None` to read all files whole.
     
     """
 
-    logger.debug(f'setting up a crawler to go through eLife corpus. | update = {update} ')
+    global amendment_index
+    logger.debug(f'setting up a crawler to go through eLife corpus. | update = {update}, output_format = {output_format} ')
     if not os.path.exists(filtered_path):
             os.makedirs(filtered_path)
     if not os.path.exists(all_articles_path):
         os.makedirs(all_articles_path)
 
-    reviewed_counter = 0
-    errors_counter = 0 
-    
-    for filename, fp in get_article_files(input_path):
-        try:
-            a_short_doi = filename_to_short_doi(filename)     # TODO: find a better, universal way to get identifiers from filenames
-            metadata_file_exists = os.path.exists(os.path.join(all_articles_path, a_short_doi +".json"))
-            # skipping files that were already parsed:
-            if metadata_file_exists and not update and not a_short_doi in os.listdir(filtered_path):    # NOTE: reviewed articles are NEVER skipped
-                logger.debug(f'Skipping {filename} as it was already parsed.')
-                continue
-            elif metadata_file_exists and update: 
-                logger.warning(f"file with metadata for {a_short_doi} already exists in {ALL_ARTICLES_DIR} and will be overwritten.")
-                
-            logger.info(f'Processing {filename}')
-            a_xml = fp.read()
-            fp.close()
-            
-            a_metadata = parse_article_xml(a_xml, update = update, skip_sm_dl = skip_sm_dl)
-            if a_metadata['has_reviews']: reviewed_counter += 1
-            
-        except Exception as e:
-            errors_counter += 1
-            logger.error(f"There was a {e.__class__.__name__} while parsing {filename}: {str(e)}")
+    shard_writer = None
+    if output_format == 'jsonl':
+        shard_writer = ShardWriter(all_articles_shards_path, flush_size = flush_size)
+    elif output_format != 'json':
+        raise ValueError(f"Unknown output format: {output_format}")
+
+    if check_retractions:
+        amendment_index = get_amendment_index(input_path)
+    timings.reset()
+    timings.enabled = instrument
+    # supplementary materials are downloaded in the background while the corpus is parsed
+    downloader = None if skip_sm_dl else Downloader()
+    crawler = None
+    try:
+        crawler = ElifeCrawler(input_path, update = update, skip_sm_dl = skip_sm_dl, downloader = downloader, shard_writer = shard_writer,
+                               with_stats = with_stats, parse_workers = parse_workers, max_article_size = max_article_size)
+        reviewed_counter, errors_counter = crawler.parse_corpus()
+    finally:
+        if downloader is not None:
+            downloader.close()
+        if shard_writer is not None:
+            shard_writer.close()
+        if crawler is not None:
+            save_versions(version_index_path, crawler.versions)
+        timings.enabled = False
+        amendment_index = AmendmentIndex()
         
     logger.info(f"Finished parsing the eLife corpus with {errors_counter} errors encountered in the meantime.")
     logger.info(f"found {reviewed_counter} reviewed articles.")
+    timings.log_summary(logger)
     
 
 if __name__ == '__main__':
@@ -0,0 +1,216 @@
+"""
+Writers for the output files of the crawlers: XML of articles and sub-articles, and metadata in JSON.
+
+`FileWriter` writes every file right away, `AsyncWriter` hands it to background threads, so that parsing does not
+have to wait for the disk (which dominates on network file systems). Both serialize XML and JSON in the calling thread,
+so the trees and dictionaries can be changed or freed as soon as the call returns.
+Every file is written to a temporary file first and renamed once it is complete, so a crash never leaves a half-written output.
+Directories are created once, the first time a file is written to them, and then remembered.
+
+Usage:
+```
+with AsyncWriter() as writer:
+    writer.write_tree(path, a.tree)
+    writer.write_json(metadata_path, metadata)
+    ...
+# all files are written here
+```
+"""
+
+import json
+import os
+import queue
+import threading
+
+import lxml.etree as et
+
+from utils import get_logger
+
+logger = get_logger("file_writer")
+
+TMP_SUFFIX = '.tmp'
+
+# tells a thread of an `AsyncWriter` to stop
+_STOP = object()
+
+
+class FileWriter:
+    """
+    Writes files right away, in the calling thread. Exceptions are raised to the caller.
+    """
+
+    def __init__(self):
+        self._dirs = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def makedirs(self, path):
+        """Creates the directory `path` (and its parents) unless it was already created by this writer."""
+        if path in self._dirs:
+            return
+        os.makedirs(path, exist_ok = True)
+        self._dirs.add(path)
+
+    def write_bytes(self, path, data, files = None):
+        """
+        :param files: the `ArticleFiles` this file belongs to, marked as failed if the file could not be written
+        """
+        try:
+            self.makedirs(os.path.dirname(path))
+            tmp_path = path + TMP_SUFFIX
+            with open(tmp_path, 'wb') as fp:
+                fp.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if files is not None:
+                files.fail()
+            raise
+
+    def write_json(self, path, obj):
+        """Writes `obj` the same way as `json.dump` does."""
+        self.write_bytes(path, json.dumps(obj).encode())
+
+    def write_tree(self, path, tree):
+        """Writes an lxml `ElementTree` the same way as `tree.write(path)` does."""
+        self.write_bytes(path, et.tostring(tree))
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class AsyncWriter(FileWriter):
+    """
+    Writes files in background threads. `write_bytes` (and so `write_json` and `write_tree`) blocks when `max_queued`
+    files are already waiting, which keeps the queue bounded. Every thread takes up to `batch_size` files at a time
+    from the queue and creates the directories of all of them before writing them.
+
+    Exceptions can not reach the caller, so files which could not be written are listed in `failed` as `(path, exception)` tuples
+    and passed to `on_error`.
+    """
+
+    def __init__(self, max_workers = 4, max_queued = 256, batch_size = 64, on_error = None):
+        """
+        :param max_workers: number of writing threads, more than one help when every write waits for a network file system
+        :param max_queued: maximum number of files waiting to be written
+        :param batch_size: maximum number of files a thread takes from the queue at once
+        :param on_error: function called with `(path, exception)` for every file which could not be written,
+            if `None` then the error is logged
+        """
+        super().__init__()
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.on_error = on_error
+        self.failed = []
+        self._queue = queue.Queue(max_queued)
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def makedirs(self, path):
+        # directories are also created from the calling thread, e.g. for downloads
+        with self._lock:
+            super().makedirs(path)
+
+    def write_bytes(self, path, data, files = None):
+        if not self._threads:
+            with self._lock:
+                if not self._threads:
+                    self._threads = [threading.Thread(target = self._run, name = 'file_writer', daemon = True)
+                                     for _ in range(self.max_workers)]
+                    for thread in self._threads:
+                        thread.start()
+        self._queue.put((path, data, files))
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            items = [item for item in batch if item is not _STOP]
+            for path in {os.path.dirname(item[0]) for item in items}:
+                try:
+                    self.makedirs(path)
+                except OSError:
+                    # reported for every file in the directory below
+                    pass
+            for path, data, files in items:
+                self._write(path, data, files)
+            for _ in batch:
+                self._queue.task_done()
+            stops = len(batch) - len(items)
+            if stops:
+                # every thread has to get its own marker
+                for _ in range(stops - 1):
+                    self._queue.put(_STOP)
+                return
+
+    def _write(self, path, data, files):
+        try:
+            FileWriter.write_bytes(self, path, data, files)
+        except Exception as e:
+            with self._lock:
+                self.failed.append((path, e))
+            if self.on_error is not None:
+                self.on_error(path, e)
+            else:
+                logger.error(f"There was a {e.__class__.__name__} while writing {path}: {str(e)}")
+
+    def flush(self):
+        """Waits until all queued files are written."""
+        if self._threads:
+            self._queue.join()
+
+    def close(self):
+        """Waits until all queued files are written and stops the threads. Writing again starts new ones."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(_STOP)
+        for thread in threads:
+            thread.join()
+        if self.failed:
+            logger.warning(f'{len(self.failed)} files could not be written.')
+
+
+class ArticleFiles(FileWriter):
+    """
+    Writes the files of a single article through another writer and keeps their paths, so that the outcome of
+    the article can tell which files it produced and whether all of them were written.
+
+    With an `AsyncWriter`, a failure is only known once the file was taken from the queue, so `failed` is final
+    only after the writer was flushed. `on_failure` is called (from a thread of the writer) the first time it is set.
+    """
+
+    def __init__(self, writer, on_failure = None):
+        """
+        :param writer: the `FileWriter` or `AsyncWriter` which writes the files
+        :param on_failure: function called with this object when the first of its files could not be written
+        """
+        super().__init__()
+        self.writer = writer
+        self.on_failure = on_failure
+        self.paths = []
+        self.failed = False
+
+    def makedirs(self, path):
+        self.writer.makedirs(path)
+
+    def write_bytes(self, path, data, files = None):
+        self.paths.append(path)
+        self.writer.write_bytes(path, data, self)
+
+    def fail(self):
+        if self.failed:
+            return
+        self.failed = True
+        if self.on_failure is not None:
+            self.on_failure(self)
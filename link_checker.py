@@ -0,0 +1,218 @@
+"""
+Batch version of `Article.check_if_link_works` and `Article.check_if_doi_resolves`, for auditing the links of a whole corpus.
+
+Checks run in a pool of threads, each keeping its own `requests.Session`, and requests to the same host are spaced out
+so that no host gets more than `rate` requests per second. Results are kept in a small SQLite cache,
+so links which were checked less than `ttl` seconds ago are not requested again.
+Only definite answers are cached: responses other than 200 and 404 and network errors are checked again next time.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+from rarticle import INVALID_DOI_STRUCTURE
+from sessions import ThreadSessions
+from utils import get_logger
+
+logger = get_logger("link_checker")
+
+# same resolver as `Article.check_if_doi_resolves`
+DOI_RESOLVER = 'http://dx.doi.org/'
+CSL_JSON = 'application/vnd.citationstyles.csl+json'
+
+
+class LinkCache:
+    """
+    Results of link checks in an SQLite database, keyed by e.g. `link:<url>` or `doi:<doi>`, which expire after `ttl` seconds.
+    Safe to use from many threads.
+    """
+
+    def __init__(self, path, ttl = 7*24*3600, commit_every = 100):
+        """
+        :param path: path to the SQLite database file, it is created if it does not exist yet.
+        :param ttl: how many seconds a result is valid for
+        :param commit_every: how many results are written before they are committed to the database
+        """
+        self.ttl = ttl
+        self.commit_every = commit_every
+        self._uncommitted = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread = False)
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS checks (
+                                key TEXT PRIMARY KEY,
+                                result TEXT NOT NULL,
+                                checked_at REAL NOT NULL)""")
+        self._conn.commit()
+
+    def get(self, key, default = None):
+        """:return: the cached result for `key`, or `default` if there is none or it expired"""
+        with self._lock:
+            row = self._conn.execute("SELECT result, checked_at FROM checks WHERE key = ?", (key,)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return default
+        return json.loads(row[0])
+
+    def set(self, key, result):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO checks VALUES (?, ?, ?)", (key, json.dumps(result), time.time()))
+            self._uncommitted += 1
+            if self._uncommitted >= self.commit_every:
+                self._conn.commit()
+                self._uncommitted = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+
+class HostRateLimiter:
+    """
+    Spaces out requests to the same host, so that there are at most `rate` of them per second.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        """Blocks until a request to the host of `url` may be sent."""
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class LinkChecker:
+    """
+    Checks links and DOIs concurrently.
+
+    Usage:
+    ```
+    with LinkChecker(cache_path = 'links.sqlite') as checker:
+        results = checker.check_dois(articles)    # {doi: 'works', ...}
+    ```
+    The results are the same as those of `Article.check_if_link_works` (`True`, `False` or `'error'`)
+    and `Article.check_if_doi_resolves` (`'works'`, `"doesn't work"` or the DOI found in the metadata).
+    """
+
+    def __init__(self, max_workers = 8, rate = 5, timeout = 30, cache_path = None, ttl = 7*24*3600, doi_resolver = DOI_RESOLVER):
+        """
+        :param max_workers: number of threads sending requests
+        :param rate: maximum number of requests per second to a single host, `0` for no limit
+        :param timeout: timeout of every request in seconds
+        :param cache_path: path to the SQLite cache of results, if `None` then results are not cached
+        :param ttl: how many seconds cached results are valid for
+        :param doi_resolver: URL which DOIs are appended to, to get their metadata
+        """
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.doi_resolver = doi_resolver
+        self.rate_limiter = HostRateLimiter(rate)
+        self.cache = LinkCache(cache_path, ttl) if cache_path is not None else None
+        self._sessions = ThreadSessions()
+        # one pool for the lifetime of the checker, so its threads (and their sessions) are reused by every batch
+        self._executor = ThreadPoolExecutor(max_workers = max_workers, thread_name_prefix = 'link_checker')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _get(self, url, **kwargs) -> requests.Response:
+        self.rate_limiter.wait(url)
+        return self._sessions.get().get(url, timeout = self.timeout, **kwargs)
+
+    def _cached(self, key, check):
+        """:return: the cached result for `key`, or the result of `check()`, which is cached unless it is `None` or `'error'`"""
+        if self.cache is not None:
+            result = self.cache.get(key)
+            if result is not None:
+                return result
+        result = check()
+        if self.cache is not None and result is not None and result != 'error':
+            self.cache.set(key, result)
+        return result
+
+    def check_link(self, url):
+        """
+        :return: `True` if `url` returns status 200, `False` for 404 and `'error'` for any other status or a network error
+        """
+        def check():
+            try:
+                status_code = self._get(url).status_code
+            except requests.RequestException as e:
+                logger.info(f'There was a {e.__class__.__name__} while checking {url}: {str(e)}')
+                return 'error'
+            if status_code == 200:
+                return True
+            elif status_code == 404:
+                return False
+            return 'error'
+        return self._cached('link:' + url, check)
+
+    def get_metadata_doi(self, doi):
+        """
+        :return: the DOI in the metadata that `doi` resolves to, or `None` if it could not be retrieved
+        """
+        def check():
+            try:
+                r = self._get(self.doi_resolver + doi, headers = {'accept': CSL_JSON})
+                r.raise_for_status()
+                return r.json()['DOI']
+            except (requests.RequestException, ValueError, KeyError) as e:
+                logger.info(f'There was a {e.__class__.__name__} while resolving {doi}: {str(e)}')
+                return None
+        return self._cached('doi:' + doi, check)
+
+    def check_doi(self, item, validate = None):
+        """
+        Whether a DOI resolves to the right article, like `Article.check_if_doi_resolves`.
+
+        :param item: an `Article` (its `url` is checked first) or a DOI (the link through `doi_resolver` is checked)
+        :param validate: function that tells if a DOI has a valid structure, e.g. `allofplos.plos_regex.validate_doi`
+        :return: `'works'`, `"doesn't work"`, `INVALID_DOI_STRUCTURE` or the DOI in the metadata if it is a different one
+        """
+        doi, url = (item, self.doi_resolver + item) if isinstance(item, str) else (item.doi, item.url)
+        if validate is not None and validate(doi) is False:
+            return INVALID_DOI_STRUCTURE
+        if self.check_link(url) is not True:
+            return "doesn't work"
+        metadata_doi = self.get_metadata_doi(doi)
+        if metadata_doi is None:
+            return "doesn't work"
+        return 'works' if metadata_doi == doi else metadata_doi
+
+    def check_links(self, urls) -> dict:
+        """:return: dictionary `{url: result of check_link}`"""
+        urls = list(urls)
+        return dict(zip(urls, self._executor.map(self.check_link, urls)))
+
+    def check_dois(self, items, validate = None) -> dict:
+        """
+        :param items: `Article`s or DOIs
+        :return: dictionary `{doi: result of check_doi}`
+        """
+        items = list(items)
+        dois = [item if isinstance(item, str) else item.doi for item in items]
+        return dict(zip(dois, self._executor.map(lambda item: self.check_doi(item, validate), items)))
+
+    def close(self):
+        """Stops the threads, closes their sessions and commits the cache."""
+        self._executor.shutdown(wait = True)
+        self._sessions.close()
+        if self.cache is not None:
+            self.cache.close()
@@ -0,0 +1,110 @@
+"""
+A small SQLite manifest of the members of a corpus zip file which were already processed by a crawler.
+
+For every member, the CRC32 and uncompressed size from its `ZipInfo` are stored together with the outcome of parsing it
+and the list of files that were produced. Both values are read from the zip's central directory,
+so deciding whether a member changed since the last run needs no stat calls on the output tree and no XML parsing.
+"""
+
+import json
+import sqlite3
+
+# possible outcomes of parsing a member:
+OUTCOME_PARSED = 'parsed'
+OUTCOME_REVIEWED = 'reviewed'
+OUTCOME_ERROR = 'error'
+
+
+class ZipManifest:
+    """
+    Persistent record of processed zip members, keyed by member name.
+
+    Usage:
+    ```
+    with ZipManifest(path) as manifest:
+        for zinfo in zip.infolist():
+            if manifest.is_unchanged(zinfo):
+                continue
+            ...
+            manifest.record(zinfo, OUTCOME_PARSED, files)
+    ```
+    Records are committed in batches of `commit_every` and when the manifest is closed.
+    """
+
+    def __init__(self, path, commit_every = 1000):
+        """
+        :param path: path to the SQLite database file, it is created if it does not exist yet.
+        :param commit_every: how many records are written before they are committed to the database
+        """
+        self.path = path
+        self.commit_every = commit_every
+        self._uncommitted = 0
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS members (
+                                name TEXT PRIMARY KEY,
+                                crc INTEGER NOT NULL,
+                                size INTEGER NOT NULL,
+                                outcome TEXT NOT NULL,
+                                files TEXT NOT NULL)""")
+        self._conn.commit()
+        # the whole table is loaded once, so that lookups do not hit the database
+        self._entries = {name: (crc, size, outcome) for name, crc, size, outcome
+                         in self._conn.execute("SELECT name, crc, size, outcome FROM members")}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def is_unchanged(self, zinfo) -> bool:
+        """
+        Whether the member described by `zinfo` was already processed without errors, and its CRC32 and size did not change since then.
+        """
+        entry = self._entries.get(zinfo.filename)
+        if entry is None:
+            return False
+        crc, size, outcome = entry
+        return outcome != OUTCOME_ERROR and crc == zinfo.CRC and size == zinfo.file_size
+
+    def get_outcome(self, name):
+        """
+        :return: outcome of the last time the member `name` was processed, or `None` if it was never processed.
+        """
+        entry = self._entries.get(name)
+        return entry[2] if entry is not None else None
+
+    def get_files(self, name) -> list:
+        """
+        :return: list of files that were produced when the member `name` was processed.
+        """
+        row = self._conn.execute("SELECT files FROM members WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row is not None else []
+
+    def record(self, zinfo, outcome, files = ()):
+        """
+        Saves (or replaces) the record for the member described by `zinfo`.
+
+        :param outcome: one of `OUTCOME_PARSED`, `OUTCOME_REVIEWED` or `OUTCOME_ERROR`
+        :param files: paths to the files produced while processing this member
+        """
+        self._conn.execute("INSERT OR REPLACE INTO members VALUES (?, ?, ?, ?, ?)",
+                           (zinfo.filename, zinfo.CRC, zinfo.file_size, outcome, json.dumps(list(files))))
+        self._entries[zinfo.filename] = zinfo.CRC, zinfo.file_size, outcome
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self.commit()
+
+    def commit(self):
+        self._conn.commit()
+        self._uncommitted = 0
+
+    def close(self):
+        self.commit()
+        self._conn.close()
@@ -6,20 +6,33 @@ Parsed metadata about each article in the zip file is saved to `plos/all_article
 """
 
 import argparse
-import json
 import os
-import requests
-import lxml.etree as et
-from zipfile import ZipFile
+from concurrent.futures import ProcessPoolExecutor
 
 from allofplos.allofplos.article import Article
 from allofplos.allofplos.corpus.plos_corpus import download_corpus_zip, unzip_articles
 from allofplos.allofplos.plos_regex import validate_doi, validate_plos_url
-
+from allofplos.allofplos.transformations import filename_to_doi
+
+from amendments import AmendmentIndex, get_stamp
+from downloader import Downloader, try_download_file
+from file_writer import FileWriter
+from manifest import ZipManifest, OUTCOME_ERROR, OUTCOME_PARSED, OUTCOME_REVIEWED
+from rarticle import SubArticle
+from review_crawler import ReviewCrawler
+import serialization
+from shards import ShardWriter
+from timings import Timings
+from xml_parsers import parse_front, parse_xml
+from zip_index import diff_zip_indexes, get_zip_index
 from utils import cook, get_extension_from_str, get_logger, OUTPUT_DIR, INPUT_DIR
 
 
 logger = get_logger("plos", fileh_level='DEBUG', streamh_level='INFO')
+# time spent on every metadata field and I/O step in `parse_article_xml`, only measured when enabled
+timings = Timings()
+# retractions and corrections found in the corpus, `parse_article_xml` uses it to fill in `retracted`
+amendment_index = AmendmentIndex()
 
 ## DEFAULT PATHS ##
 
@@ -31,8 +44,17 @@ default_extract_dir = os.path.join(zipfile_dir, 'allofplos_xml')
 # names of folders for where data is saved
 ALL_ARTICLES_DIR = os.path.join('plos','all_articles' )
 FILTERED_DIR = os.path.join('plos','reviewed_articles')
+ALL_ARTICLES_SHARDS_DIR = os.path.join('plos', 'all_articles_jsonl')
 all_articles_path = os.path.join(OUTPUT_DIR, ALL_ARTICLES_DIR)
+all_articles_shards_path = os.path.join(OUTPUT_DIR, ALL_ARTICLES_SHARDS_DIR)
 filtered_path = os.path.join(OUTPUT_DIR, FILTERED_DIR)
+# records which members of the zip were already parsed, see `manifest.ZipManifest`
+manifest_path = os.path.join(OUTPUT_DIR, 'plos', 'manifest.sqlite')
+# links between amendments and the articles they amend, see `amendments.AmendmentIndex`
+amendment_index_path = os.path.join(OUTPUT_DIR, 'plos', 'amendments.json')
+
+# how many files are handed to a worker process at once (see `process_allofplos_zip`)
+WORKER_CHUNKSIZE = 500
 
 
 
@@ -61,25 +83,63 @@ def doi_to_short_doi(doi) -> str:
 
 
 def check_if_article_retracted(url):
+    """
+    Checks the landing page of an article for a retraction notice. This needs a request for every article,
+    `get_amendment_index` finds all retractions in the local corpus instead.
+    """
     # TODO: change this to work on Soups?
     soup = cook(url)
     return 'has RETRACTION' in soup.text
 
 
-def parse_subarticle(root) -> dict:
+def get_amendment_index() -> AmendmentIndex:
+    """
+    Loads the index of retractions and corrections in the PLOS corpus from `amendment_index_path`.
+    If the corpus changed since it was saved (or it was never saved), the index is built again in a single pass over the corpus.
+    """
+    corpus_path = zipfile_path if os.path.exists(zipfile_path) else default_extract_dir
+    if not os.path.exists(corpus_path):
+        return AmendmentIndex()
+    stamp = get_stamp(corpus_path)
+    index = AmendmentIndex.load(amendment_index_path, stamp)
+    if index is None:
+        logger.info("Looking for retractions and corrections in the PLOS corpus...")
+        index = AmendmentIndex.build(get_article_files(), logger = logger)
+        os.makedirs(os.path.dirname(amendment_index_path), exist_ok = True)
+        index.save(amendment_index_path, stamp)
+        logger.info(f"Found amendments of {len(index)} articles, saved them to {amendment_index_path}.")
+    return index
+
+
+def update_amendment_index(filenames) -> list:
+    """
+    Adds the amendments among `filenames` (members of the corpus zip, e.g. the ones added since the previous snapshot)
+    to the index saved at `amendment_index_path`, so that the rest of the corpus does not have to be read again.
+    The saved index is assumed to be the one built from the previous snapshot. If there is none, it is built from the whole corpus.
+
+    :return: DOIs of the articles amended by these files
+    :rtype: list
+    """
+    index = AmendmentIndex.load(amendment_index_path, check_stamp = False)
+    if index is None:
+        index = get_amendment_index()
+    allofplos_zip = get_zip_index(zipfile_path)
+    amended_dois = index.add_files(((filename, allofplos_zip.open(filename)) for filename in filenames), logger = logger)
+    os.makedirs(os.path.dirname(amendment_index_path), exist_ok = True)
+    index.save(amendment_index_path, get_stamp(zipfile_path))
+    return amended_dois
+
+
+def parse_subarticle(sub_article: SubArticle) -> dict:
     metadata = {}
-    front = root.find('front-stub')
-    body = root.find('body')
 
-    metadata['type'] = root.attrib['article-type']
-    try:
-        metadata['specific_use'] = root.attrib['specific-use']
-    except KeyError:
-        pass
+    metadata['type'] = sub_article.type_
+    if sub_article.specific_use is not None:
+        metadata['specific_use'] = sub_article.specific_use
 
     if metadata['type'] == 'aggregated-review-documents':
-        metadata['round'] = int(front.find('.//article-title').text.strip().split()[-1])
-    metadata['doi'] = front.find('article-id').text.strip()
+        metadata['round'] = int(sub_article.title.split()[-1])
+    metadata['doi'] = sub_article.doi
     
     # create id out of doi:
     splat = doi_to_short_doi(metadata['doi']).rsplit('.', 1)
@@ -89,16 +149,16 @@ def parse_subarticle(root) -> dict:
         id_str = splat[0]+".r{}"
     metadata['id'] = id_str.format(int(splat[1][1:]))
     
-    related_article = front.find('related-object')
-    if related_article is not None and related_article.attrib['link-type'] == 'peer-reviewed-article':
-        metadata['original_article_doi'] = related_article.attrib['document-id']
-    metadata['date'] = body.find('.//named-content').text.strip()
+    related_object = sub_article.related_object
+    if related_object is not None and related_object['link-type'] == 'peer-reviewed-article':
+        metadata['original_article_doi'] = related_object['document-id']
+    metadata['date'] = sub_article.date
 
     # find reviewers:
     if metadata['type'] == 'aggregated-review-documents':
         fr = False
         reviewers = []
-        for text in [p.text for p in body if p.text]:
+        for text in sub_article.paragraphs:
             if 'identity' in text: fr = True
             elif fr and 'Reviewer #' in text:
                 r = {}
@@ -112,9 +172,9 @@ def parse_subarticle(root) -> dict:
 
     # find supplementary materials:
     supplementary = []
-    for elem in body.findall('supplementary-material'):
-        sm = {'id': ('journal.'+elem.attrib['id']), # these will be in "short" doi format
-              'original_filename': elem.find('.//named-content').text}
+    for sm_id, original_filename in sub_article.supplementary_materials:
+        sm = {'id': ('journal.'+sm_id), # these will be in "short" doi format
+              'original_filename': original_filename}
         sm['url'] = "https://doi.org/10.1371/" + sm['id']
         sm['filename'] = sm['id'] + get_extension_from_str(sm['original_filename'])
         supplementary.append(sm)
@@ -123,7 +183,39 @@ def parse_subarticle(root) -> dict:
     return metadata
 
 
-def parse_article_xml(xml_string: str, update = False, skip_sm_dl = False) -> dict:
+def prescan_article_xml(xml_string):
+    """
+    Cheap alternative to `Article.from_xml` for articles without sub-articles, which are the majority of the PLOS corpus.
+    A byte-level check looks for a `<sub-article` tag first. If there is none, the XML is parsed incrementally 
+    only until the end of `<front>`, so the body and back matter never become a part of the tree.
+    All metadata that's saved to `ALL_ARTICLES_DIR` comes from the front matter, so it's the same as after a full parse.
+
+    :param xml_string: XML-encoded string containing a PLOS article.
+    :return: an `Article` with a tree containing only the front matter, or `None` if the article may have sub-articles.
+    """
+    if isinstance(xml_string, str):
+        xml_string = xml_string.encode()
+    if b'<sub-article' in xml_string:
+        return None
+    root = parse_front(xml_string)
+    if root is None:
+        return None
+    a = Article(root.find("front/article-meta/article-id[@pub-id-type='doi']").text.strip())
+    a.tree = root.getroottree()
+    return a
+
+
+def article_from_xml(xml_string):
+    """
+    Same as `Article.from_xml`, but the XML is parsed with the shared parsers from `xml_parsers`.
+    """
+    root = parse_xml(xml_string)
+    a = Article(root.find("front//article-id[@pub-id-type='doi']").text.strip())
+    a.tree = root.getroottree()
+    return a
+
+
+def parse_article_xml(xml_string: str, update = False, skip_sm_dl = False, downloader = None, writer = None, save_all_articles = True) -> dict:
     """
     Parses an XML string that's assumed to contain a PLOS article.
     This function relies on the `Article` class from `allofplos` library to extract metadata from XML.
@@ -135,27 +227,46 @@ def parse_article_xml(xml_string: str, update = False, skip_sm_dl = False) -> di
     :param xml_string: XML-encoded string containing a PLOS article.
     :param update: if set to `True`, existing files will be overwritten.
     :param skip_sm_dl: whether to skip downloading supplementary materials from the PLOS database.
+    :param downloader: a `Downloader` to queue supplementary materials to. If `None`, they are downloaded before this function returns.
+    :param writer: a `FileWriter` to write files through, e.g. an `AsyncWriter`. If `None`, they are written before this function returns.
+    :param save_all_articles: whether to save metadata to `ALL_ARTICLES_DIR`. Set to `False` when the caller stores it somewhere else (e.g. in shards).
     :return: dictionary object containing parsed metadata
     :rtype: dict
     """
-    a = Article.from_xml(xml_string)
+    # the full tree is only built for articles that may have been reviewed:
+    if writer is None:
+        writer = FileWriter()
+    with timings('parse'):
+        a = prescan_article_xml(xml_string)
+        if a is None:
+            a = article_from_xml(xml_string)
     a_short_doi = doi_to_short_doi(a.doi)
     metadata = {}
     # get metadata from Article object:
-    metadata['doi'] = a.doi
-    metadata['title'] = a.title
-    metadata['url'] = a.page
-    metadata['fulltext_xml_url'] = a.url
-    metadata['journal'] = {'title': a.journal, 'volume': a.volume, 'issue': a.issue}
-    metadata['publication_date'] = {'year': a.pubdate.year,
-                                    'month': a.pubdate.month, 
-                                    'day': a.pubdate.day}
-    metadata['authors'] = a.get_author_names()
-    metadata['keywords'] = a.categories
-    metadata['retracted'] = False # TODO: change to check_if_article_retracted
+    with timings('doi'):
+        metadata['doi'] = a.doi
+    with timings('title'):
+        metadata['title'] = a.title
+    with timings('url'):
+        metadata['url'] = a.page
+    with timings('fulltext_xml_url'):
+        metadata['fulltext_xml_url'] = a.url
+    with timings('journal'):
+        metadata['journal'] = {'title': a.journal, 'volume': a.volume, 'issue': a.issue}
+    with timings('publication_date'):
+        metadata['publication_date'] = {'year': a.pubdate.year,
+                                        'month': a.pubdate.month, 
+                                        'day': a.pubdate.day}
+    with timings('authors'):
+        metadata['authors'] = a.get_author_names()
+    with timings('keywords'):
+        metadata['keywords'] = a.categories
+    metadata['retracted'] = amendment_index.is_retracted(a.doi)
     
+    with timings('get_subarticles'):
+        sub_articles = [SubArticle(sub_a) for sub_a in a.get_subarticles()]
     # assuming if sub-articles are present, then article was reviewed
-    if len(a.get_subarticles()) > 0:
+    if len(sub_articles) > 0:
         metadata['has_reviews'] = True
         metadata['reviews_url'] = a.get_page('peerReview')
         metadata['sub_articles'] = []
@@ -163,105 +274,299 @@ def parse_article_xml(xml_string: str, update = False, skip_sm_dl = False) -> di
         article_dir = os.path.join(filtered_path, a_short_doi)
         sub_articles_dir = os.path.join(article_dir, 'sub-articles')
         logger.info(f'Article {a_short_doi} probably has reviews! Full metatada will be saved to {FILTERED_DIR}')
+        # the directory is created by `writer` with the first file written to it
         write_files = True
-        if not os.path.exists(article_dir):
-            os.makedirs(article_dir, exist_ok=False)
-        elif update:
-            logger.warning(f"Files for article {a_short_doi} and its sub-articles already exist in {FILTERED_DIR} and will be overwritten.")
-        else:
-            write_files = False
+        if os.path.exists(article_dir):
+            if update:
+                logger.warning(f"Files for article {a_short_doi} and its sub-articles already exist in {FILTERED_DIR} and will be overwritten.")
+            else:
+                write_files = False
         logger.debug("Parsing sub-articles...")
         # iterate over sub-articles
-        for sub_a in a.get_subarticles():
-            sub_a_metadata = parse_subarticle(sub_a)
+        for sub_a in sub_articles:
+            with timings('parse_subarticle'):
+                sub_a_metadata = parse_subarticle(sub_a)
             if 'specific_use' in sub_a_metadata.keys():
                 if sub_a_metadata['specific_use'] == 'acceptance-letter':
                     # skipping those to save space and time
                     continue
-            subtree = et.ElementTree(sub_a)
             # find a warning (if any)
-            boxed_text = subtree.find('.//boxed-text')
+            boxed_text = sub_a.boxed_text
             if boxed_text is not None:
                 logger.warning(f"{boxed_text.find('.//title').text.strip()} in {sub_a_metadata['doi']}:\n{boxed_text.find('.//p').text.strip()}")
             if write_files:
-                if not os.path.exists(sub_articles_dir):
-                    os.mkdir(sub_articles_dir)
                 # download supplementary materials (if any)
                 if not skip_sm_dl and 'supplementary_materials' in sub_a_metadata.keys():
+                    # downloads are written straight to the directory, so it has to exist already
+                    writer.makedirs(sub_articles_dir)
                     for sm in sub_a_metadata['supplementary_materials']:
-                        with open(os.path.join(sub_articles_dir, sm['filename']), 'wb') as fp:
-                            url = 'https://doi.org/' + metadata['doi'] + get_extension_from_str(sm['id'])
+                        sm_path = os.path.join(sub_articles_dir, sm['filename'])
+                        url = 'https://doi.org/' + metadata['doi'] + get_extension_from_str(sm['id'])
+                        if downloader is not None:
+                            logger.debug(f'Queueing supplementary material from {url} for download')
+                            downloader.submit(url, sm_path)
+                        else:
                             logger.debug(f'Downloading supplementary material from {url}')
-                            r = requests.get(url, stream=True)
-                            fp.write(r.content)
+                            try_download_file(url, sm_path)
                  # saving this sub-article:
                 sub_a_filename = sub_a_metadata['id'] + '.xml'
                 sub_a_path = os.path.join(sub_articles_dir, sub_a_filename)
-                subtree.write(sub_a_path)
+                with timings('write_sub_article_xml'):
+                    writer.write_tree(sub_a_path, sub_a.tree)
                 sub_a_metadata['supplementary_materials'].append({
                     'filename': sub_a_filename, 'id': sub_a_metadata['id'], 'title': "This sub_article in XML."
                 })
                 # save metadata to JSON:
-                with open(os.path.join(sub_articles_dir, sub_a_metadata['id'] + '.json'), 'w+') as fp:
-                    json.dump(sub_a_metadata, fp)
+                with timings('write_sub_article_json'):
+                    writer.write_json(os.path.join(sub_articles_dir, sub_a_metadata['id'] + '.json'), sub_a_metadata)
                 logger.debug(f"Sub-article {sub_a_metadata['doi']} saved to {FILTERED_DIR}{os.path.sep}{a_short_doi}")
             metadata['sub_articles'].append(sub_a_metadata)
             
         if write_files:
             # save this article's XML
-            a.tree.write(os.path.join(article_dir, a.filename))
+            with timings('write_article_xml'):
+                writer.write_tree(os.path.join(article_dir, a.filename), a.tree)
             # save metadata to the same directory
-            with open(os.path.join(article_dir, "metadata.json"), 'w+') as fp:
-                json.dump(metadata, fp)
+            with timings('write_metadata_json'):
+                writer.write_json(os.path.join(article_dir, "metadata.json"), metadata)
     else:
         metadata['has_reviews'] = False
+    # everything was extracted and written, so the tree can be freed before the next article is parsed
+    # (`Article` from allofplos has no `release()`, resetting its memoized attributes does the same)
+    a.reset_memoized_attrs()
 
     # finally, save metadata to all_articles
+    if save_all_articles:
+        save_metadata(metadata, update = update, writer = writer)
+    return metadata
+
+
+def save_metadata(metadata, update = False, writer = None):
+    """
+    Saves metadata returned by `parse_article_xml` to `ALL_ARTICLES_DIR`.
+
+    :param update: if set to `True`, an existing file will be overwritten.
+    :param writer: a `FileWriter` to write the file through. If `None`, it is written before this function returns.
+    """
+    a_short_doi = doi_to_short_doi(metadata['doi'])
     _filename = os.path.join(all_articles_path, a_short_doi + ".json")
     if update or not os.path.exists(_filename):
-        with open(_filename, 'w+') as fp:
-            json.dump(metadata, fp)
+        with timings('write_all_articles_json'):
+            (writer if writer is not None else FileWriter()).write_json(_filename, metadata)
         logger.debug(f"Metadata for {a_short_doi} saved to {ALL_ARTICLES_DIR}.")
-    return metadata
     
     
-def get_article_files(rescan_reviewed = False):
+def get_article_filenames(rescan_reviewed = False):
     """
-    Generator for obtaining the relevant files from PLOS corpus, either in the zipped or unzipped form.
+    Lists the names of the relevant files from PLOS corpus, either in the zipped or unzipped form.
 
-    :param rescan_reviewed: if set to `True`, then only articles that already have a directory in `FILTERED_DIR` will be processed
+    :param rescan_reviewed: if set to `True`, then only articles that already have a directory in `FILTERED_DIR` will be listed
 
-    :return: a tuple: `(filename, fp)` where `fp` is a readable filepointer to the file named `filename`.
+    :return: a tuple: `(from_zip, filenames)`, or `(None, [])` if the corpus could not be located.
     :rtype: tuple
     """
     if not os.path.exists(zipfile_path):
         logger.debug("Did not find the zip file containing the PLOS corpus, will try to look for the unzipped files in the default location.")
-        from_zip = False
         if not os.path.isdir(default_extract_dir):
             logger.error("Unable to locate the PLOS corpus! Crawler will shut down.")
-            return
-        else:
-            logger.info("PLOS corpus located in directory" + default_extract_dir)
+            return None, []
+        logger.info("PLOS corpus located in directory" + default_extract_dir)
+        from_zip = False
+        filenames = os.listdir(default_extract_dir)
     else:
         from_zip = True
-        allofplos_zip = ZipFile(zipfile_path, 'r')
+        filenames = get_zip_index(zipfile_path).namelist()
     if rescan_reviewed:
-        reviewed = os.listdir(filtered_path)
-        if from_zip:
-            filenames = filter(lambda f: os.path.splitext(f)[0] in reviewed, allofplos_zip.namelist())
-        else:
-            filenames = filter(lambda f: os.path.splitext(f)[0] in reviewed, os.listdir(default_extract_dir))
-    else:
-        filenames = allofplos_zip.namelist()
+        reviewed = set(os.listdir(filtered_path))
+        filenames = [f for f in filenames if os.path.splitext(f)[0] in reviewed]
+    return from_zip, filenames
+
+
+def open_article_file(filename, allofplos_zip = None):
+    """
+    Opens a file from the PLOS corpus for reading bytes (because lxml.etree likes them better).
+
+    :param allofplos_zip: a `ZipIndex` (or an open `ZipFile`) of the corpus zip, or `None` if the corpus was unzipped to `default_extract_dir`
+    """
+    if allofplos_zip is not None:
+        return allofplos_zip.open(filename)
+    return open(os.path.join(default_extract_dir, filename), 'rb')
+
+
+def get_article_files(rescan_reviewed = False):
+    """
+    Generator for obtaining the relevant files from PLOS corpus, either in the zipped or unzipped form.
+
+    :param rescan_reviewed: if set to `True`, then only articles that already have a directory in `FILTERED_DIR` will be processed
+
+    :return: a tuple: `(filename, fp)` where `fp` is a readable filepointer to the file named `filename`.
+    :rtype: tuple
+    """
+    from_zip, filenames = get_article_filenames(rescan_reviewed = rescan_reviewed)
+    allofplos_zip = get_zip_index(zipfile_path) if from_zip else None
     for filename in filenames:
-        if from_zip:
-            fp = allofplos_zip.open(filename)
+        yield filename, open_article_file(filename, allofplos_zip)
+
+
+def get_article_file(doi):
+    """
+    Opens the file of the article with the given DOI, straight from the PLOS corpus zip if it's present.
+
+    :return: a readable filepointer
+    """
+    filename = doi_to_short_doi(doi) + '.xml'
+    if os.path.exists(zipfile_path):
+        return get_zip_index(zipfile_path).open(filename)
+    return open_article_file(filename)
+
+
+def get_output_files(files) -> list:
+    """
+    Lists the files that were written for an article, as paths relative to `OUTPUT_DIR`.
+    Supplementary materials are downloaded separately (see `downloader`), so they are not listed.
+
+    :param files: the `ArticleFiles` the article was written through, after all of its files were written
+    """
+    return [os.path.relpath(path, OUTPUT_DIR) for path in files.paths]
+
+
+class PlosCrawler(ReviewCrawler):
+    """
+    Runs files from the PLOS corpus through the `ReviewCrawler` pipeline and collects the outcomes, see `process_article_files`.
+    """
+
+    def __init__(self, article_files, update = False, skip_sm_dl = False, reviewed = (), downloader = None, output_format = 'json',
+                 parse_workers = 1):
+        """
+        For the parameters, see `process_article_files`.
+        """
+        super().__init__(logger, timings = timings, parse_workers = parse_workers)
+        self.article_files = article_files
+        self.update = update
+        self.skip_sm_dl = skip_sm_dl
+        self.reviewed = reviewed
+        self.downloader = downloader
+        self.save_all_articles = output_format == 'json'
+        # `(filename, metadata, files)` for every file that was not skipped, see `process_article_files`
+        self.outcomes = []
+
+    def get_article_files(self):
+        return self.article_files
+
+    def should_parse(self, filename) -> bool:
+        a_short_doi = os.path.splitext(filename)[0]     # TODO: find a better, universal way to get identifiers from filenames
+        metadata_file_exists = self.save_all_articles and os.path.exists(os.path.join(all_articles_path, a_short_doi +".json"))
+        if metadata_file_exists and not self.update and not a_short_doi in self.reviewed:    # NOTE: reviewed articles are NEVER skipped
+            logger.debug(f'Skipping {filename} as it was already parsed.')
+            return False
+        elif metadata_file_exists and self.update:
+            logger.info(f"File with metadata for {a_short_doi} already exists in {ALL_ARTICLES_DIR} and will be overwritten.")
+        logger.debug(f'Processing file {filename}')
+        return True
+
+    def parse_article_xml(self, xml_string, writer) -> dict:
+        return parse_article_xml(xml_string, update = self.update, skip_sm_dl = self.skip_sm_dl, downloader = self.downloader,
+                                 writer = writer, save_all_articles = False)
+
+    def parse_subarticle(self, sub_article) -> dict:
+        return parse_subarticle(sub_article)
+
+    def write_outcome(self, filename, metadata, files):
+        with self.lock:
+            self.outcomes.append((filename, metadata, files))
+        if metadata is not None and self.save_all_articles:
+            try:
+                save_metadata(metadata, update = self.update, writer = files)
+            except Exception:
+                # the article is recorded as an error, the exception is counted by the pipeline
+                files.fail()
+                raise
+
+
+def process_article_files(article_files, update = False, skip_sm_dl = False, reviewed = (), downloader = None, output_format = 'json',
+                          parse_workers = 1):
+    """
+    Runs `parse_article_xml` on every file yielded by `article_files`, skipping articles that were already parsed.
+    Exceptions raised while parsing are logged and counted, they do not stop the loop.
+    Files are read, parsed and written in separate threads (see `PlosCrawler`).
+
+    :param article_files: iterable of `(filename, fp)` tuples, like the ones from `get_article_files`
+    :param reviewed: short DOIs of articles that already have a directory in `FILTERED_DIR`; these are never skipped
+    :param downloader: a `Downloader` for supplementary materials, passed on to `parse_article_xml`
+    :param output_format: with `'jsonl'`, metadata is not saved to `ALL_ARTICLES_DIR` and the caller is expected to save it from the outcomes.
+        Skipping already parsed articles is then also up to the caller.
+    :param parse_workers: number of threads parsing articles. With one (the default), outcomes are in the order of `article_files`.
+    :return: a tuple: `(outcomes, reviewed_counter, errors_counter)`, where `outcomes` is a list of `(filename, metadata, output_files)` tuples
+        for every file that was not skipped. `metadata` is `None` if there was an error while parsing the file or writing its outputs,
+        `output_files` lists the files written for the article (see `get_output_files`).
+    :rtype: tuple
+    """
+    crawler = PlosCrawler(article_files, update = update, skip_sm_dl = skip_sm_dl, reviewed = reviewed, downloader = downloader,
+                          output_format = output_format, parse_workers = parse_workers)
+    reviewed_counter, errors_counter = crawler.parse_corpus()
+    # all files were written now, so an article whose files were not all written can be recorded as an error
+    outcomes = []
+    for filename, metadata, files in crawler.outcomes:
+        if files is None or files.failed:
+            outcomes.append((filename, None, []))
         else:
-            fp = open(os.path.join(input_path, filename), 'rb')  # using bytes because lxml.etree likes them better
-        yield filename, fp
+            outcomes.append((filename, metadata, get_output_files(files)))
+    return outcomes, reviewed_counter, errors_counter
+
+
+def record_outcomes(manifest, zip_index, outcomes):
+    """
+    Saves the outcomes returned by `process_article_files` to a `ZipManifest`.
+
+    :param zip_index: `ZipIndex` of the PLOS corpus zip
+    """
+    for filename, metadata, output_files in outcomes:
+        zinfo = zip_index.getinfo(filename)
+        if metadata is None:
+            manifest.record(zinfo, OUTCOME_ERROR)
+        elif metadata['has_reviews']:
+            manifest.record(zinfo, OUTCOME_REVIEWED, output_files)
+        else:
+            manifest.record(zinfo, OUTCOME_PARSED, output_files)
+
+
+# every worker process keeps its own index of the zip, see `_init_worker`
+_worker_zip = None
+
+def _init_worker(from_zip, instrument = False, amendments = None):
+    global _worker_zip, amendment_index
+    if from_zip:
+        _worker_zip = get_zip_index(zipfile_path)
+    timings.enabled = instrument
+    amendment_index = amendments if amendments is not None else AmendmentIndex()
 
 
-def process_allofplos_zip(update = False, rescan_reviewed = False, skip_sm_dl = False):
+def _process_chunk(filenames, update, skip_sm_dl, reviewed, output_format, serialize = False, parse_workers = 1):
+    """
+    :param serialize: whether to return the outcomes serialized with `serialization.dumps`, which is cheaper to send from a worker process than a pickled list
+    :param parse_workers: number of threads parsing the files of this chunk, see `process_article_files`
+    :return: the tuple returned by `process_article_files`, with a snapshot of the timings of this chunk appended
+    """
+    article_files = ((filename, open_article_file(filename, _worker_zip)) for filename in filenames)
+    if skip_sm_dl:
+        result = process_article_files(article_files, update = update, skip_sm_dl = skip_sm_dl, reviewed = reviewed,
+                                       output_format = output_format, parse_workers = parse_workers)
+    else:
+        # supplementary materials are downloaded in the background while the chunk is parsed
+        with Downloader() as downloader:
+            result = process_article_files(article_files, update = update, skip_sm_dl = skip_sm_dl, reviewed = reviewed,
+                                           downloader = downloader, output_format = output_format, parse_workers = parse_workers)
+    if serialize:
+        with timings('serialize'):
+            result = (serialization.dumps(result[0]),) + result[1:]
+    chunk_timings = timings.snapshot()
+    timings.reset()
+    return result + (chunk_timings,)
+
+
+def process_allofplos_zip(update = False, rescan_reviewed = False, skip_sm_dl = False, workers = 1, use_manifest = False,
+                          output_format = 'json', flush_size = 1000, members = None, instrument = False, check_retractions = True,
+                          parse_workers = 1, reparse = ()):
     """
     Goes through the zip file contents and extracts XML files for reviewed articles, as well as metadata.
     For each article in the zip, metadata is extracted and stored in a JSON file in `ALL_ARTICLES_DIR`. 
@@ -273,10 +578,27 @@ def process_allofplos_zip(update = False, rescan_reviewed = False, skip_sm_dl =
     :param update: if is set to `True`, already existing files will be overwritten. Otherwise (and by default), files that were already parsed are skipped.
     :param rescan_reviewed:  if set to `True`, then only articles that already have a directory in `FILTERED_DIR` will be processed
     :param skip_sm_dl: whether to skip downloading supplementary materials. 
+    :param workers: number of worker processes. With more than one, every worker opens its own handle to the zip
+        and parses chunks of `WORKER_CHUNKSIZE` files, sending the results back to be merged.
+    :param use_manifest: if set to `True`, the outcome of parsing every member of the zip is recorded in a `ZipManifest` at `manifest_path`.
+        Members whose CRC32 and size did not change since they were last parsed without errors are skipped (even if `update` is set),
+        so reviewed articles are not parsed again either.
+    :param output_format: `'json'` to save metadata of every article to its own file in `ALL_ARTICLES_DIR`,
+        or `'jsonl'` to append it to JSON Lines shards in `ALL_ARTICLES_SHARDS_DIR` (see `shards.ShardWriter`).
+    :param flush_size: with `output_format='jsonl'`, how many records are buffered before they are written to the shards.
+    :param members: if given, only the files in the corpus with these names are processed.
+    :param instrument: if set to `True`, the time spent on every metadata field and I/O step is measured (in all workers)
+        and a summary is logged at the end.
+    :param check_retractions: if set to `True`, `retracted` is filled in from the index of amendments in the corpus (see `get_amendment_index`).
+        Otherwise, it is always `False`.
+    :param parse_workers: number of threads parsing articles in every worker process (or in this process if `workers` is 1),
+        while other threads read the files and write the outputs (see `PlosCrawler`).
+    :param reparse: names of files which are processed even if the manifest says that they did not change,
+        e.g. articles that were retracted since they were parsed.
     
     """
 
-    logger.debug(f'Setting up a PLOScrawler to go through allofplos_xml.zip | update = {update}, rescan_reviewed = {rescan_reviewed}, skip_sm_dl = {skip_sm_dl}')
+    logger.debug(f'Setting up a PLOScrawler to go through allofplos_xml.zip | update = {update}, rescan_reviewed = {rescan_reviewed}, skip_sm_dl = {skip_sm_dl}, workers = {workers}, use_manifest = {use_manifest}, output_format = {output_format}')
 
     if not os.path.exists(filtered_path):
         os.makedirs(filtered_path)
@@ -285,33 +607,109 @@ def process_allofplos_zip(update = False, rescan_reviewed = False, skip_sm_dl =
 
     reviewed_counter = 0
     errors_counter = 0 
+    run_timings = Timings()
     
-    reviewed = os.listdir(filtered_path)
-
-    for filename, fp in get_article_files(rescan_reviewed = rescan_reviewed):
-        try:
-            a_short_doi = os.path.splitext(filename)[0]     # TODO: find a better, universal way to get identifiers from filenames
-            metadata_file_exists = os.path.exists(os.path.join(all_articles_path, a_short_doi +".json"))
-            if metadata_file_exists and not update and not a_short_doi in reviewed:    # NOTE: reviewed articles are NEVER skipped
-                logger.debug(f'Skipping {filename} as it was already parsed.')
-                continue
-            elif metadata_file_exists and update:
-                logger.info(f"File with metadata for {a_short_doi} already exists in {ALL_ARTICLES_DIR} and will be overwritten.")
-            logger.debug(f'Processing file {filename}')
-            a_xml = fp.read()
-            fp.close()
-
-            a_metadata = parse_article_xml(a_xml, update = update, skip_sm_dl = skip_sm_dl)
-            if a_metadata['has_reviews']: reviewed_counter += 1
-            
-        except Exception as e:
-            errors_counter += 1
-            logger.error(f"There was a {e.__class__.__name__} while parsing {filename} from zip: {str(e)}")
+    reviewed = set(os.listdir(filtered_path))
+
+    from_zip, filenames = get_article_filenames(rescan_reviewed = rescan_reviewed)
+    if members is not None:
+        members = set(members)
+        filenames = [f for f in filenames if f in members]
+    manifest = None
+    if use_manifest and not from_zip:
+        logger.warning("The manifest can only be used with the zipped PLOS corpus, it will be ignored.")
+    elif use_manifest:
+        zip_index = get_zip_index(zipfile_path)
+        manifest = ZipManifest(manifest_path)
+        total = len(filenames)
+        reparse = set(reparse)
+        filenames = [f for f in filenames if f in reparse or not manifest.is_unchanged(zip_index.getinfo(f))]
+        logger.info(f"Skipping {total - len(filenames)} files which did not change since they were last parsed.")
+
+    shard_writer = None
+    if output_format == 'jsonl':
+        shard_writer = ShardWriter(all_articles_shards_path, flush_size = flush_size)
+        if not update:
+            # NOTE: reviewed articles are NEVER skipped
+            filenames = [f for f in filenames if os.path.splitext(f)[0] not in shard_writer or os.path.splitext(f)[0] in reviewed]
+    elif output_format != 'json':
+        raise ValueError(f"Unknown output format: {output_format}")
+
+    amendments = get_amendment_index() if check_retractions and filenames else None
+
+    chunks = [filenames[i:i+WORKER_CHUNKSIZE] for i in range(0, len(filenames), WORKER_CHUNKSIZE)]
+    executor = None
+    try:
+        if workers > 1:
+            executor = ProcessPoolExecutor(max_workers = workers, initializer = _init_worker, initargs = (from_zip, instrument, amendments))
+            futures = [executor.submit(_process_chunk, chunk, update, skip_sm_dl, reviewed, output_format, True, parse_workers) for chunk in chunks]
+            # results are merged in the order of the chunks, so shards and the manifest do not depend on which worker finished first
+            results = (future.result() for future in futures)
+        else:
+            # a serial run goes through the same chunks in this process
+            _init_worker(from_zip, instrument, amendments)
+            results = (_process_chunk(chunk, update, skip_sm_dl, reviewed, output_format, parse_workers = parse_workers) for chunk in chunks)
+        for outcomes, chunk_reviewed, chunk_errors, chunk_timings in results:
+            if workers > 1:
+                outcomes = serialization.loads(outcomes)
+            reviewed_counter += chunk_reviewed
+            errors_counter += chunk_errors
+            run_timings.merge(chunk_timings)
+            if shard_writer is not None:
+                for filename, metadata, output_files in outcomes:
+                    if metadata is not None:
+                        shard_writer.write(doi_to_short_doi(metadata['doi']), metadata)
+            if manifest is not None:
+                record_outcomes(manifest, zip_index, outcomes)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if shard_writer is not None:
+            shard_writer.close()
+        if manifest is not None:
+            manifest.close()
+        _init_worker(False)
         
     logger.info(f"Finished parsing allofplos_xml.zip with {errors_counter} errors encountered in the meantime.")
     logger.info(f"Found {reviewed_counter} reviewed articles.")
+    run_timings.log_summary(logger)
     
 
+def process_allofplos_delta(previous_zipfile_path, skip_sm_dl = False, workers = 1, use_manifest = False, output_format = 'json',
+                            instrument = False, check_retractions = True, parse_workers = 1):
+    """
+    Processes only the articles which were added or modified since a previous snapshot of the PLOS corpus zip,
+    by comparing the central directories of both zips (member names, CRC32 and sizes).
+    Outputs of the modified articles are overwritten.
+    Articles which are no longer in the corpus are only reported, so that their outputs can be retired.
+
+    :param previous_zipfile_path: path to the previous snapshot of `allofplos.zip`
+    :param check_retractions: if set to `True`, the index of amendments is updated from the added and modified files only
+        (see `update_amendment_index`), and the articles which they retract or correct are processed again as well,
+        so that their `retracted` is up to date.
+    For the other parameters, see `process_allofplos_zip`.
+    :return: list of DOIs of articles which were removed from the corpus
+    :rtype: list
+    """
+    added, modified, removed = diff_zip_indexes(get_zip_index(previous_zipfile_path), get_zip_index(zipfile_path))
+    logger.info(f"Compared to {previous_zipfile_path}, {len(added)} files were added, {len(modified)} modified and {len(removed)} removed.")
+    members = added + modified
+    amended = []
+    if check_retractions:
+        allofplos_zip = get_zip_index(zipfile_path)
+        amended = [doi_to_short_doi(doi) + '.xml' for doi in update_amendment_index(members)]
+        amended = sorted({filename for filename in amended if filename in allofplos_zip} - set(members))
+        logger.info(f"{len(amended)} articles were amended since, they will be processed again.")
+        members += amended
+    process_allofplos_zip(update = True, skip_sm_dl = skip_sm_dl, workers = workers, use_manifest = use_manifest,
+                          output_format = output_format, members = members, instrument = instrument,
+                          check_retractions = check_retractions, parse_workers = parse_workers, reparse = amended)
+    removed_dois = [filename_to_doi(filename) for filename in removed]
+    for doi in removed_dois:
+        logger.info(f"Article {doi} was removed from the corpus, its outputs can be retired.")
+    return removed_dois
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description = "Find reviewed articles in the allofplos corpus.", epilog="Detects which articles had been peer-reviewed, extracts them from the zip into subdirectories in `plos/reviewed_articles`. Additionally, the sub-articles (reviews and such) from each xml are extracted and saved into files. Parsed metadata about each article in the zip file is saved to `plos/all_articles` directory")
     parser.add_argument('--download', action='store_true', help=
@@ -320,6 +718,18 @@ if __name__ == '__main__':
                         'Unzip the allofplos corpus before starting the crawler. The zip archive will be removed after extracting the files.', dest='unzip')
     # parser.add_argument('--input-dir', action='store', help=
     #                     'Set the input dir', default=zipfile_dir)
+    parser.add_argument('--workers', action='store', type=int, default=1, help=
+                        'Number of worker processes used for parsing the articles.', dest='workers')
+    parser.add_argument('--parse-workers', action='store', type=int, default=1, help=
+                        'Number of threads parsing the articles in every worker process.', dest='parse_workers')
+    parser.add_argument('--manifest', action='store_true', help=
+                        'Keep a manifest of parsed files and skip the ones that did not change in the zip since the last run.', dest='manifest')
+    parser.add_argument('--output-format', action='store', choices=['json', 'jsonl'], default='json', help=
+                        'Save metadata of all articles to separate JSON files, or to JSON Lines shards.', dest='output_format')
+    parser.add_argument('--previous-zip', action='store', help=
+                        'Path to a previous snapshot of the corpus zip. Only articles added or modified since then will be processed.', dest='previous_zip')
+    parser.add_argument('--timings', action='store_true', help=
+                        'Measure the time spent on every metadata field and I/O step, and log a summary at the end.', dest='timings')
     # TODO: add other arguments for the argparser: update, rescan etc. 
     
     args = parser.parse_args()
@@ -328,4 +738,9 @@ if __name__ == '__main__':
         zip_path = download_corpus_zip(zipfile_dir)
     if args.unzip:
         unzip_articles(zip_path, extract_directory = default_extract_dir, delete_file = True)
-    process_allofplos_zip(update = True, rescan_reviewed = False, skip_sm_dl = False)
+    if args.previous_zip:
+        process_allofplos_delta(args.previous_zip, skip_sm_dl = False, workers = args.workers, use_manifest = args.manifest,
+                                output_format = args.output_format, instrument = args.timings, parse_workers = args.parse_workers)
+    else:
+        process_allofplos_zip(update = True, rescan_reviewed = False, skip_sm_dl = False, workers = args.workers, use_manifest = args.manifest,
+                              output_format = args.output_format, instrument = args.timings, parse_workers = args.parse_workers)
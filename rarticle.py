@@ -15,6 +15,327 @@ from allofplos.allofplos.elements import (parse_article_date, get_contrib_info,
                        License, match_contribs_to_dicts)
 from allofplos.allofplos.utils import dedent
 
+from xml_parsers import get_parser, parse_xml
+
+# timeout (in seconds) of the requests for single articles, see `link_checker` for checking many of them
+REQUEST_TIMEOUT = 30
+
+# returned by `Article.check_if_doi_resolves` (and `link_checker.LinkChecker.check_doi`) for a DOI that is not valid
+INVALID_DOI_STRUCTURE = "Not valid PLOS DOI structure"
+
+
+# Every XPath expression that `Article` and its helpers evaluate, compiled once at import instead of once per lookup.
+# `get_element_xpath` joins its `tag_path_elements` with '/', which is why some of them start with '//article'.
+# The other paths of the front matter (title, journal, dates, abstract, categories, counts...) are not looked up
+# with XPath anymore: `FrontMatter` collects all of them in one walk over `<front>`, which is faster than evaluating
+# even their precompiled expressions (see `benchmarks.bench_xpath`). `FrontMatter.EXPRESSIONS` lists what it replaces.
+# `get_xpath` compiles and adds other expressions on first use, those only come from outside callers of `get_element_xpath`.
+XPATHS = {expression: et.XPath(expression) for expression in (
+    # get_element_xpath
+    '//article',
+    '//article/front/article-meta/custom-meta-group/custom-meta/meta-value',
+    # direct lookups
+    '/article/front/article-meta/title-group/article-title',
+    './meta-name',
+    './meta-value',
+    './back',
+)}
+
+
+def get_xpath(expression) -> et.XPath:
+    """
+    Returns the compiled `XPath` for `expression` from `XPATHS`.
+    Expressions which are not there yet are compiled and added on first use.
+    """
+    xpath = XPATHS.get(expression)
+    if xpath is None:
+        xpath = XPATHS[expression] = et.XPath(expression)
+    return xpath
+
+
+# elements which are left out of the text of `Article.body`
+BODY_EXCLUDED_TAGS = frozenset(('tr', 'td', 'caption', 'fig', 'graphic', 'table-wrap', 'ext-link'))
+
+
+def _is_supplementary_section(element) -> bool:
+    return element.tag == 'sec' and any(child.tag == 'supplementary-material' for child in element)
+
+
+def extract_text(element, excluded_tags=BODY_EXCLUDED_TAGS, with_tail=False):
+    """Get the text content of an element, leaving out some of its subtrees.
+
+    Gives the same text as `et.tostring(element, method='text')`, except for the contents of the excluded elements.
+    The text that follows an excluded element is kept. The tree is walked only once (with `et.iterwalk`) and is not modified.
+    Works on any element, e.g. the `<body>` of an article or a `<sub-article>`.
+    :param element: root of the subtree to extract the text from
+    :param excluded_tags: tags of elements whose contents are left out.
+    Sections (`<sec>`) containing supplementary material are always left out.
+    :param with_tail: whether to include the text that follows `element` itself
+    :returns: plain text
+    :rtype: {str}
+    """
+    parts = []
+    walker = et.iterwalk(element, events=('start', 'end', 'comment', 'pi'))
+    for event, el in walker:
+        if event == 'start':
+            if el is not element and (el.tag in excluded_tags or _is_supplementary_section(el)):
+                # the 'end' event of a skipped element still comes, right after this one
+                walker.skip_subtree()
+            elif el.text:
+                parts.append(el.text)
+        elif event == 'end':
+            if el is not element and el.tail:
+                parts.append(el.tail)
+        elif el.tail:
+            # comments and processing instructions: only the text after them is a part of the content
+            parts.append(el.tail)
+    if with_tail and element.tail:
+        parts.append(element.tail)
+    return ''.join(parts)
+
+
+class FrontMatter:
+    """
+    Elements of the front matter of an article, collected in a single walk over `<front>` (see `Article.front_matter`).
+
+    Every field is a tuple of elements in document order: the same ones its XPath expression in `EXPRESSIONS`
+    would find, so properties of `Article` can read them instead of searching the tree again.
+    """
+    # the XPath expression every field replaces
+    EXPRESSIONS = {
+        'journal_titles': '/article/front/journal-meta/journal-title-group/journal-title',
+        'article_metas': '/article/front/article-meta',
+        'article_titles': '/article/front/article-meta/title-group/article-title',
+        'volumes': '/article/front/article-meta/volume',
+        'issues': '/article/front/article-meta/issue',
+        'elocation_ids': '/article/front/article-meta/elocation-id',
+        'pub_dates': '/article/front/article-meta/pub-date',
+        'histories': '/article/front/article-meta/history',
+        'custom_metas': '/article/front/article-meta/custom-meta-group/custom-meta',
+        'meta_values': '/article/front/article-meta/custom-meta-group/custom-meta/meta-value',
+        'contribs': '/article/front/article-meta/contrib-group/contrib',
+        'author_notes': '/article/front/article-meta/author-notes',
+        'related_articles': '/article/front/article-meta/related-article',
+        'article_categories': '/article/front/article-meta/article-categories',
+        'abstracts': '/article/front/article-meta/abstract[count(@*)=0]',
+        'counts': '/article/front/article-meta/counts',
+        'permissions': '/article/front/article-meta/permissions',
+        'author_keywords': '/article/front/article-meta/kwd-group[@kwd-group-type="author-keywords"]/kwd',
+    }
+    __slots__ = tuple(EXPRESSIONS)
+
+    # children of <article-meta> which are collected as they are
+    _ARTICLE_META_TAGS = {'volume': 'volumes',
+                          'issue': 'issues',
+                          'elocation-id': 'elocation_ids',
+                          'pub-date': 'pub_dates',
+                          'history': 'histories',
+                          'author-notes': 'author_notes',
+                          'related-article': 'related_articles',
+                          'article-categories': 'article_categories',
+                          'counts': 'counts',
+                          'permissions': 'permissions'}
+
+    def __init__(self, root):
+        """
+        :param root: the root element of an article
+        """
+        fields = {name: [] for name in self.__slots__}
+        fronts = root.iterchildren('front') if root.tag == 'article' else ()
+        for front in fronts:
+            for journal_meta in front.iterchildren('journal-meta'):
+                for title_group in journal_meta.iterchildren('journal-title-group'):
+                    fields['journal_titles'].extend(title_group.iterchildren('journal-title'))
+            for article_meta in front.iterchildren('article-meta'):
+                fields['article_metas'].append(article_meta)
+                for child in article_meta:
+                    tag = child.tag
+                    if tag in self._ARTICLE_META_TAGS:
+                        fields[self._ARTICLE_META_TAGS[tag]].append(child)
+                    elif tag == 'title-group':
+                        fields['article_titles'].extend(child.iterchildren('article-title'))
+                    elif tag == 'custom-meta-group':
+                        for custom_meta in child.iterchildren('custom-meta'):
+                            fields['custom_metas'].append(custom_meta)
+                            fields['meta_values'].extend(custom_meta.iterchildren('meta-value'))
+                    elif tag == 'contrib-group':
+                        fields['contribs'].extend(child.iterchildren('contrib'))
+                    elif tag == 'abstract':
+                        if not child.attrib:
+                            fields['abstracts'].append(child)
+                    elif tag == 'kwd-group':
+                        if child.get('kwd-group-type') == 'author-keywords':
+                            fields['author_keywords'].extend(child.iterchildren('kwd'))
+        for name, elements in fields.items():
+            setattr(self, name, tuple(elements))
+
+
+class ArticleStats:
+    """
+    Size statistics of an article, collected in one pass over its tree and one over the text of its body (see `Article.stats`).
+
+    Element counts are over the whole article, including its sub-articles.
+    `words` is counted like `Article.word_count` always did it: the number of pieces of the text of `/article/body` split on single spaces.
+    """
+    __slots__ = ('figures',         # .//fig
+                 'tables',          # .//table-wrap
+                 'equations',       # .//disp-formula
+                 'references',      # .//ref
+                 'sub_articles',    # .//sub-article
+                 'words')
+
+    # counted elements
+    _TAGS = {'fig': 'figures',
+             'table-wrap': 'tables',
+             'disp-formula': 'equations',
+             'ref': 'references',
+             'sub-article': 'sub_articles'}
+
+    def __init__(self, root):
+        """
+        :param root: the root element of an article
+        """
+        counts = dict.fromkeys(self._TAGS.values(), 0)
+        # `iter` with tags filters the elements in lxml's C code, which is faster than walking the tree in Python
+        for el in root.iter(*self._TAGS):
+            counts[self._TAGS[el.tag]] += 1
+        for name, count in counts.items():
+            setattr(self, name, count)
+        body = root.find('body')
+        if body is not None:
+            self.words = et.tostring(body, encoding='unicode', method='text').count(' ') + 1
+        else:
+            self.words = 0
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return "ArticleStats({0})".format(', '.join('{0}={1}'.format(name, getattr(self, name)) for name in self.__slots__))
+
+
+class SubArticle:
+    """
+    View of a `<sub-article>` (a review, decision letter, author response...), with the fields the crawlers read from it.
+
+    The elements are located in one pass over `<front-stub>` and one over `<body>`, when the view is created,
+    and every field is computed from them the first time it is needed.
+    """
+    __slots__ = ('element', 'front_stub', 'body', '_article_id', '_article_title', '_contribs', '_related_object',
+                 '_named_content', '_supplementary_materials', '_memo')
+
+    def __init__(self, element):
+        """
+        :param element: a `<sub-article>` element, e.g. one returned by `Article.get_subarticles`
+        """
+        self.element = element
+        self.front_stub = front_stub = element.find('front-stub')
+        self.body = body = element.find('body')
+        self._article_id = self._article_title = self._related_object = self._named_content = None
+        contribs = []
+        supplementary_materials = []
+        if front_stub is not None:
+            for el in front_stub.iter('article-id', 'article-title', 'contrib', 'related-object'):
+                tag = el.tag
+                if tag == 'contrib':
+                    contribs.append(el)
+                elif tag == 'article-title':
+                    if self._article_title is None:
+                        self._article_title = el
+                elif el.getparent() is front_stub:
+                    # only direct children of <front-stub> are the sub-article's own id and related object
+                    if tag == 'article-id' and self._article_id is None:
+                        self._article_id = el
+                    elif tag == 'related-object' and self._related_object is None:
+                        self._related_object = el
+        if body is not None:
+            for el in body.iter('named-content', 'supplementary-material'):
+                if el.tag == 'named-content':
+                    if self._named_content is None:
+                        self._named_content = el
+                elif el.getparent() is body:
+                    supplementary_materials.append(el)
+        self._contribs = tuple(contribs)
+        self._supplementary_materials = tuple(supplementary_materials)
+        self._memo = {}
+
+    def __repr__(self):
+        return "SubArticle(type_={0!r}, doi={1!r})".format(self.element.get('article-type'), self.doi)
+
+    @property
+    def type_(self):
+        """The `article-type` of the sub-article, e.g. 'decision-letter' or 'aggregated-review-documents'."""
+        return self.element.attrib['article-type']
+
+    @property
+    def specific_use(self):
+        """The `specific-use` attribute of the sub-article, `None` if there is none."""
+        return self.element.get('specific-use')
+
+    @property
+    def doi(self):
+        """DOI of the sub-article, from the `<article-id>` in its front stub."""
+        if 'doi' not in self._memo:
+            self._memo['doi'] = self._article_id.text.strip() if self._article_id is not None else None
+        return self._memo['doi']
+
+    @property
+    def title(self):
+        """Text of the first `<article-title>` in the front stub."""
+        if 'title' not in self._memo:
+            self._memo['title'] = self._article_title.text.strip() if self._article_title is not None else None
+        return self._memo['title']
+
+    @property
+    def contributors(self):
+        """List of `(contrib_type, name)` tuples for every `<contrib>` in the front stub, with names as 'given-names surname'."""
+        if 'contributors' not in self._memo:
+            self._memo['contributors'] = [(contrib.get('contrib-type'),
+                                           f"{contrib.find('.//given-names').text.strip()} {contrib.find('.//surname').text.strip()}")
+                                          for contrib in self._contribs]
+        return self._memo['contributors']
+
+    @property
+    def related_object(self):
+        """The `<related-object>` of the front stub as a dictionary of its attributes, `None` if there is none."""
+        return dict(self._related_object.attrib) if self._related_object is not None else None
+
+    @property
+    def date(self):
+        """Text of the first `<named-content>` in the body, which is where PLOS puts the date of a review."""
+        if 'date' not in self._memo:
+            self._memo['date'] = self._named_content.text.strip() if self._named_content is not None else None
+        return self._memo['date']
+
+    @property
+    def supplementary_materials(self):
+        """List of `(id, original_filename)` tuples for every `<supplementary-material>` directly in the body."""
+        if 'supplementary_materials' not in self._memo:
+            self._memo['supplementary_materials'] = [(sm.get('id'), sm.find('.//named-content').text)
+                                                     for sm in self._supplementary_materials]
+        return self._memo['supplementary_materials']
+
+    @property
+    def paragraphs(self):
+        """Texts of the children of the body (their text up to the first child element), skipping the empty ones."""
+        if self.body is None:
+            return []
+        return [child.text for child in self.body if child.text]
+
+    @property
+    def boxed_text(self):
+        """The first `<boxed-text>` in the sub-article, `None` if there is none. PLOS uses them for warnings."""
+        if 'boxed_text' not in self._memo:
+            self._memo['boxed_text'] = self.element.find('.//boxed-text')
+        return self._memo['boxed_text']
+
+    @property
+    def tree(self):
+        """The sub-article as a separate `ElementTree`, e.g. for writing it to a file."""
+        if 'tree' not in self._memo:
+            self._memo['tree'] = et.ElementTree(self.element)
+        return self._memo['tree']
+
 
 class Article:
     """The primary object of a PLOS article, initialized by a valid PLOS DOI.
@@ -54,11 +375,10 @@ class Article:
         Excludes <back> element (including references list) for easier viewing
         :param exclude_refs: remove references from the article tree (eases print viewing)
         """
-        parser = et.XMLParser(remove_blank_text=True)
-        tree = et.parse(self.filepath, parser)
+        tree = et.parse(self.filepath, get_parser(remove_blank_text=True))
         if exclude_refs:
             root = tree.getroot()
-            back = tree.xpath('./back')
+            back = get_xpath('./back')(tree)
             if back:
                 root.remove(back[0])
         local_xml = et.tostring(tree,
@@ -113,6 +433,10 @@ class Article:
         self._tree = None
         self._local = None
         self._contributors = None
+        self._front_matter = None
+        self._stats = None
+        self._body = None
+        self._subarticle_texts = {}
 
     @property
     def doi(self):
@@ -228,7 +552,7 @@ class Article:
             root = self.remote_tree.getroot()
         else:
             root = self.root
-        return root.xpath(tag_location)
+        return get_xpath(tag_location)(root)
 
     def get_dates(self, string_=False, string_format='%Y-%m-%d'):
         """For an individual article, get all of its dates, including publication date (pubdate), submission date.
@@ -241,13 +565,7 @@ class Article:
         """
         dates = {}
         # first location is where pubdate and date added to collection are
-        tag_path_1 = ["/",
-                      "article",
-                      "front",
-                      "article-meta",
-                      "pub-date"]
-        element_list_1 = self.get_element_xpath(tag_path_elements=tag_path_1)
-        for element in element_list_1:
+        for element in self.front_matter.pub_dates:
             pub_type = element.get('date-type')
             try:
                 date = parse_article_date(element)
@@ -257,13 +575,7 @@ class Article:
             dates[pub_type] = date
 
         # second location is where historical dates are, including submission and acceptance
-        tag_path_2 = ["/",
-                      "article",
-                      "front",
-                      "article-meta",
-                      "history"]
-        element_list_2 = self.get_element_xpath(tag_path_elements=tag_path_2)
-        for element in element_list_2:
+        for element in self.front_matter.histories:
             for part in element:
                 date_type = part.get('date-type')
                 try:
@@ -276,16 +588,9 @@ class Article:
         # third location is for vor updates when it's updated (see `proof(self)`)
         rev_date = ''
         if self.proof == 'vor_update':
-            tag_path = ('/',
-                        'article',
-                        'front',
-                        'article-meta',
-                        'custom-meta-group',
-                        'custom-meta')
-            xpath_results = self.get_element_xpath(tag_path_elements=tag_path)
-            for result in xpath_results:
-                if result.xpath('./meta-name')[0].text == 'Publication Update':
-                    rev_date_string = result.xpath('./meta-value')[0].text
+            for result in self.front_matter.custom_metas:
+                if get_xpath('./meta-name')(result)[0].text == 'Publication Update':
+                    rev_date_string = get_xpath('./meta-value')(result)[0].text
                     rev_date = datetime.datetime.strptime(rev_date_string, '%Y-%m-%d')
                     break
                 else:
@@ -333,19 +638,19 @@ class Article:
     def volume(self):
         """Volume of the article."""
         try:
-            return int(self.root.xpath('/article/front/article-meta/volume')[0].text)
+            return int(self.front_matter.volumes[0].text)
         except IndexError:
             print("error: no volume for {}".format(self.doi))
 
     @property
     def issue(self):
         """Issue of the article."""
-        return int(self.root.xpath('/article/front/article-meta/issue')[0].text)
+        return int(self.front_matter.issues[0].text)
 
     @property
     def elocation(self):
         """Elocation ID of the article."""
-        return self.root.xpath('/article/front/article-meta/elocation-id')[0].text
+        return self.front_matter.elocation_ids[0].text
 
     def get_aff_dict(self):
         """For a given PLOS article, get list of contributor-affiliated institutions.
@@ -356,11 +661,7 @@ class Article:
         :returns: Dictionary of footnote ids to institution information
         :rtype: {dict}
         """
-        tags_to_aff = ["/",
-                       "article",
-                       "front",
-                       "article-meta"]
-        article_aff_elements = self.get_element_xpath(tag_path_elements=tags_to_aff)
+        article_aff_elements = self.front_matter.article_metas
         aff_dict = {}
         aff_elements = [el
                         for aff_element in article_aff_elements
@@ -390,12 +691,7 @@ class Article:
         :returns: Dictionary of footnote ids to institution information
         :rtype: {dict}
         """
-        tags_to_fn = ["/",
-                      "article",
-                      "front",
-                      "article-meta",
-                      "author-notes"]
-        article_fn_elements = self.get_element_xpath(tag_path_elements=tags_to_fn)
+        article_fn_elements = self.front_matter.author_notes
         fn_dict = {}
         fn_elements = [el
                        for fn_element in article_fn_elements
@@ -426,13 +722,8 @@ class Article:
         :return: dictionary of rid or author initials mapped to list of email address(es)
         :rtype: {dict}
         """
-        tag_path = ["/",
-                    "article",
-                    "front",
-                    "article-meta",
-                    "author-notes"]
         try:
-            author_notes_element = self.get_element_xpath(tag_path_elements=tag_path)[0]
+            author_notes_element = self.front_matter.author_notes[0]
         except IndexError:
             # no emails found
             return {}
@@ -524,13 +815,8 @@ class Article:
         if self.type_ in ['correction', 'retraction', 'expression-of-concern']:
             # these article types don't have proper 'authors'
             return {}
-        tag_path = ["/",
-                    "article",
-                    "front",
-                    "article-meta",
-                    "author-notes"]
         try:
-            author_notes_element = self.get_element_xpath(tag_path_elements=tag_path)[0]
+            author_notes_element = self.front_matter.author_notes[0]
         except IndexError:
             return {}
         author_contributions = {}
@@ -605,13 +891,7 @@ class Article:
         credit_dict = self.get_contributions_dict()
 
         # get list of contributor elements (one per contributor)
-        tag_path = ["/",
-                    "article",
-                    "front",
-                    "article-meta",
-                    "contrib-group",
-                    "contrib"]
-        contrib_list = self.get_element_xpath(tag_path_elements=tag_path)
+        contrib_list = self.front_matter.contribs
         contrib_dict_list = []
 
         error_printed = False
@@ -742,11 +1022,7 @@ class Article:
         :return: dictionary of related DOIs
         :rtype: dict
         """
-        related_article_elements = self.get_element_xpath(tag_path_elements=["/",
-                                                                             "article",
-                                                                             "front",
-                                                                             "article-meta",
-                                                                             "related-article"])
+        related_article_elements = self.front_matter.related_articles
         related_article_dict = {}
 
         if related_article_elements:
@@ -772,8 +1048,9 @@ class Article:
         Full list of potential status codes: https://www.w3.org/Protocols/rfc2616/rfc2616-sec10.html
         :return: boolean if HTTP status code returned available or unavailable,
         "error" if a different status code is returned than 200 or 404
+        To check many articles, use `link_checker.LinkChecker.check_links`, which caches the results.
         """
-        request = requests.get(self.url)
+        request = requests.get(self.url, timeout=REQUEST_TIMEOUT)
         if request.status_code == 200:
             return True
         elif request.status_code == 404:
@@ -788,13 +1065,14 @@ class Article:
         Checks first if it's a valid DOI or see if it's a redirect.
         :return: 'works' if works as expected, 'doesn't work' if it doesn't resolve correctly,
         or if the metadata DOI doesn't match self.doi, return the metadata DOI
+        To check many articles, use `link_checker.LinkChecker.check_dois`, which caches the results.
         """
         if plos_valid and validate_doi(self.doi) is False:
-            return "Not valid PLOS DOI structure"
+            return INVALID_DOI_STRUCTURE
         url = "http://dx.doi.org/" + self.doi
         if self.check_if_link_works() is True:
             headers = {"accept": "application/vnd.citationstyles.csl+json"}
-            r = requests.get(url, headers=headers)
+            r = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
             r_doi = r.json()['DOI']
             if r_doi == self.doi:
                 return "works"
@@ -826,7 +1104,7 @@ class Article:
         """
         if self._tree is None:
             if self.local:
-                local_element_tree = et.parse(self.filepath)
+                local_element_tree = et.parse(self.filepath, get_parser())
                 self._tree = local_element_tree
             else:
                 print("Local article file not found: {}".format(self.filepath))
@@ -841,6 +1119,30 @@ class Article:
         """
         return self.tree.getroot()
 
+    @property
+    def front_matter(self):
+        """Elements of the article's front matter, collected in a single pass the first time they are needed.
+
+        Properties like title, journal, pubdate, contributors and keywords read their elements from here,
+        instead of each searching `<article-meta>` again.
+        :returns: front matter of the article
+        :rtype: {FrontMatter}
+        """
+        if self._front_matter is None:
+            self._front_matter = FrontMatter(self.root)
+        return self._front_matter
+
+    @property
+    def stats(self):
+        """Numbers of figures, tables, equations, references, sub-articles and words in the body, all counted together the first time they are needed.
+
+        :returns: statistics of the article
+        :rtype: {ArticleStats}
+        """
+        if self._stats is None:
+            self._stats = ArticleStats(self.root)
+        return self._stats
+
     def get_page(self, page_type='article'):
         """Get any of the URLs associated with a particular DOI.
 
@@ -876,12 +1178,7 @@ class Article:
         """Taxonomy information. For a complete list of subject areas see
         https://github.com/PLOS/plos-thesaurus
         """
-        tag_path_elements = ('/',
-                             'article',
-                             'front',
-                             'article-meta',
-                             'article-categories')
-        e_list = self.get_element_xpath(tag_path_elements=tag_path_elements)
+        e_list = self.front_matter.article_categories
         subjs_dict = {}
         for subj in e_list[0].getchildren():
             try:
@@ -935,7 +1232,7 @@ class Article:
         :return: proof status if it exists
         :rtype: str
         """
-        xpath_results = self.get_element_xpath()
+        xpath_results = self.front_matter.meta_values
         proof = ''
         for result in xpath_results:
             if result.text == 'uncorrected-proof':
@@ -968,7 +1265,7 @@ class Article:
         :returns: article's online element tree
         :rtype: {lxml.etree._ElementTree-class}
         """
-        return et.fromstring(requests.get(self.url).content)
+        return et.fromstring(requests.get(self.url, timeout=REQUEST_TIMEOUT).content)
 
     @property
     def journal(self):
@@ -980,7 +1277,7 @@ class Article:
         # else:
         #     journal_meta = self.root.xpath('/article/front/journal-meta')[0]
         #     journal = str(Journal(journal_meta))
-        return self.root.xpath('/article/front/journal-meta/journal-title-group/journal-title')[0].text
+        return self.front_matter.journal_titles[0].text
 
     @property
     def title(self):
@@ -988,12 +1285,7 @@ class Article:
 
         :return: string of article title at specified xpath location
         """
-        title = self.get_element_xpath(tag_path_elements=["/",
-                                                          "article",
-                                                          "front",
-                                                          "article-meta",
-                                                          "title-group",
-                                                          "article-title"])
+        title = self.front_matter.article_titles
         title_text = et.tostring(title[0], encoding='unicode', method='text', pretty_print=True)
         title_cleaned = " ".join(title_text.split())
         return title_cleaned
@@ -1016,7 +1308,7 @@ class Article:
         """
         root = self.root
         objectify.deannotate(root, cleanup_namespaces=True, xsi_nil=True)
-        art_title = root.xpath("/article/front/article-meta/title-group/article-title")
+        art_title = get_xpath('/article/front/article-meta/title-group/article-title')(root)
         art_title = art_title[0]
         try:
             text = art_title.text
@@ -1061,7 +1353,7 @@ class Article:
     @property
     def license(self):
         """Return dictionary of CC license information from the license field."""
-        permissions = self.root.xpath('/article/front/article-meta/permissions')[0]
+        permissions = self.front_matter.permissions[0]
         return dict(License(permissions, self.doi))
 
     @property
@@ -1143,11 +1435,7 @@ class Article:
         This format is less standardized than the JATS article type (self.type_)
         :return: PLOS article_type at that xpath location
         """
-        article_categories = self.get_element_xpath(tag_path_elements=["/",
-                                                                       "article",
-                                                                       "front",
-                                                                       "article-meta",
-                                                                       "article-categories"])
+        article_categories = self.front_matter.article_categories
         subject_list = article_categories[0].getchildren()
 
         for i, subject in enumerate(subject_list):
@@ -1186,11 +1474,7 @@ class Article:
         Info about the article abstract: https://journals.plos.org/plosone/s/submission-guidelines#loc-abstract
         :return: plain-text string of content in abstract
         """
-        abstract_list = self.get_element_xpath(tag_path_elements=["/",
-                                                                  "article",
-                                                                  "front",
-                                                                  "article-meta",
-                                                                  "abstract[count(@*)=0]"])
+        abstract_list = self.front_matter.abstracts
         if abstract_list:
                 abstract = abstract_list[0]
                 assert len(abstract_list) == 1
@@ -1213,30 +1497,15 @@ class Article:
         """
         For an individual PLOS article, get the string of the body content.
 
+        Supplementary material sections, tables, figures and links are left out, but not the text that follows them (see `extract_text`).
+        The tree is not modified, and the text is extracted only the first time.
         :returns: main body of the article
         :rtype: {str}
         """
-
-        # limit the text to the body section
-        body = self.root.find('./body')
-
-        # remove supplementary material section
-        for sec in body.findall('.//sec'):
-            if 'supplementary-material' in [element.tag for element in sec]:
-                parent=sec.getparent()
-                parent.remove(sec)
-
-        # remove unwanted xml elements
-        remove_list = ['tr','td','caption','fig','graphic','table-wrap','ext-link']
-        for tag in remove_list:
-            for element in body.findall('.//'+tag):
-                parent=element.getparent()
-                parent.remove(element)
-
-        # convert XML to string
-        body_text = et.tostring(body, encoding='utf8', method='text').decode()
-
-        return(body_text)
+        if self._body is None:
+            # limit the text to the body section
+            self._body = extract_text(self.root.find('./body'), with_tail=True)
+        return self._body
 
     @property
     def amendment(self):
@@ -1313,17 +1582,12 @@ class Article:
         """For a single article, return a dictionary of the several counts functions that are available.
 
         Dictionary format for XML tags: {figures: fig-count, pages: page-count, tables: table-count}
-        For articles without the figure and table counts fields, calculates those values using XPath.
+        For articles without the figure and table counts fields, takes those values from `stats`.
         :return: counts dictionary of number of figures, pages, and tables in the article
         """
         counts = {}
 
-        tag_path = ["/",
-                    "article",
-                    "front",
-                    "article-meta",
-                    "counts"]
-        count_element_list = self.get_element_xpath(tag_path_elements=tag_path)
+        count_element_list = self.front_matter.counts
         for count_element in count_element_list:
             for count_item in count_element:
                 count = count_item.get('count')
@@ -1332,9 +1596,9 @@ class Article:
         if len(counts) > 3:  # this shouldn't happen
             print(counts)
         if 'fig-count' not in counts:
-            counts['fig-count'] = len(self.root.xpath('.//fig'))
+            counts['fig-count'] = self.stats.figures
         if 'table-count' not in counts:
-            counts['table-count'] = len(self.root.xpath('.//table-wrap'))
+            counts['table-count'] = self.stats.tables
         return counts
 
     @property
@@ -1343,15 +1607,9 @@ class Article:
 
         :return: count of words in the body of the PLOS article
         """
-        body_element = self.get_element_xpath(tag_path_elements=["/",
-                                                                 "article",
-                                                                 "body"])
-        try:
-            body_text = et.tostring(body_element[0], encoding='unicode', method='text')
-            body_word_count = len(body_text.split(" "))
-        except IndexError:
+        body_word_count = self.stats.words
+        if body_word_count == 0:
             print("Error parsing article body: {}".format(self.doi))
-            body_word_count = 0
         return body_word_count
 
     @filename.setter
@@ -1387,7 +1645,15 @@ class Article:
             :param source: string containing XML describing an article
             :param directory: path to directory containing the XML for this article. Defaults to `get_corpus_dir()` via `Article().__init__`.
         """
-        root = et.fromstring(source)
+        return cls.from_root(parse_xml(source), directory)
+
+    @classmethod
+    def from_root(cls, root, directory = None):
+        """Initiate an article object using the root element of an article that was already parsed, e.g. with `xml_parsers.parse_stream`.
+
+            :param root: the `article` element
+            :param directory: see `from_xml`
+        """
         doi = root.find("front//article-id[@pub-id-type='doi']").text.strip()
         a = Article(doi, directory)
         a.tree = root.getroottree()
@@ -1400,6 +1666,10 @@ class Article:
         """
         assert isinstance(value, et._ElementTree)   # TODO better validation?
         self._tree = value
+        self._front_matter = None
+        self._stats = None
+        self._body = None
+        self._subarticle_texts = {}
 
     def get_subarticles(self):
         """Get sub-articles embedded in the XML tree of this article.
@@ -1410,6 +1680,29 @@ class Article:
         sub_articles = self.root.findall('sub-article')
         return sub_articles 
 
+    def get_subarticle_text(self, sub_article):
+        """Get the text of the body of a sub-article (e.g. a review), like `body` does for the article.
+
+        The text of every sub-article is extracted only once.
+        :param sub_article: one of the elements returned by `get_subarticles()`
+        :rtype: str
+        """
+        text = self._subarticle_texts.get(sub_article)
+        if text is None:
+            body = sub_article.find('body')
+            text = extract_text(body) if body is not None else ''
+            self._subarticle_texts[sub_article] = text
+        return text
+
+    def release(self):
+        """Drop the XML tree of this article and everything extracted from it.
+
+        Call this once all metadata was extracted and the files were written,
+        so that memory is freed even if the article object itself is still referenced.
+        The DOI is kept: accessing the tree again reads it from the local file, if there is one.
+        """
+        self.reset_memoized_attrs()
+
     def get_author_names(self):
         """
         Compresses the list of dicts stored in `self.authors` into a simpler list of author names.
@@ -1432,7 +1725,7 @@ class Article:
         :rtype: list
         """
         keywords_set = set()    # using a set because they tend to be duplicated
-        kwds = self.root.xpath('/article/front/article-meta/kwd-group[@kwd-group-type="author-keywords"]/kwd')
+        kwds = self.front_matter.author_keywords
         for kwd in kwds:
             keyword = ' '.join([k.text for k in kwd.iter() if k.text is not None])
             keywords_set.add(keyword.strip())
@@ -1,16 +1,216 @@
-import os
-import json
+"""
+Base class of the crawlers, which runs a corpus through a pipeline of three stages joined by bounded queues:
+
+- read: takes `(filename, fp)` tuples from `get_article_files`, skips the ones `should_parse` rejects and reads the rest with `read_article`,
+- parse: runs `parse_article_xml` on the XML,
+- write: hands the metadata to `write_outcome`, which saves it.
+
+Every stage runs in its own threads (`read_workers`, `parse_workers` and `write_workers` of them), so decompressing
+the next files and writing the outputs of the previous ones overlap with parsing (lxml and zlib release the GIL).
+The queues hold at most `queue_size` articles each, which bounds the memory used by articles waiting between stages.
+Output files are written through `writer`, an `AsyncWriter` created for every run, so neither parsing nor the write stage waits for the disk.
+Every article writes through its own `ArticleFiles`, which tells which files it produced; files which could not be written
+are counted as errors and `write_failed` is called for their article, so that it is not recorded as parsed.
+With one thread per stage (the default) articles go through the pipeline in the order of `get_article_files`.
+
+Usage:
+```
+class MyCrawler(ReviewCrawler):
+    def get_article_files(self): ...
+    def parse_article_xml(self, xml_string, writer): ...
+    def write_outcome(self, filename, metadata, files): ...
+
+reviewed_counter, errors_counter = MyCrawler(logger, parse_workers = 2).parse_corpus()
+```
+"""
+
+import queue
+import threading
+
+from file_writer import ArticleFiles, AsyncWriter
+from timings import Timings
+
+# marks the end of the input of a stage
+_DONE = object()
+
 
 class ReviewCrawler:
 
-    def parse_corpus(self):
+    def __init__(self, logger, timings = None, read_workers = 1, parse_workers = 1, write_workers = 1, queue_size = 64):
+        """
+        :param logger: errors in every stage are logged to it
+        :param timings: `Timings` to measure reading in, a disabled one if `None`
+        :param read_workers: number of threads reading files from `get_article_files`
+        :param parse_workers: number of threads running `parse_article_xml`
+        :param write_workers: number of threads running `write_outcome`
+        :param queue_size: maximum number of articles waiting between two stages
+        """
+        self.logger = logger
+        self.timings = timings if timings is not None else Timings()
+        self.read_workers = read_workers
+        self.parse_workers = parse_workers
+        self.write_workers = write_workers
+        self.queue_size = queue_size
+        # guards the counters, subclasses can use it for their own state in `write_outcome`
+        self.lock = threading.Lock()
+        self.reviewed_counter = 0
+        self.errors_counter = 0
+        self._failure = None
+        # the `AsyncWriter` of the current run of `parse_corpus`
+        self.writer = None
+
+    def get_article_files(self):
+        """
+        :return: iterable of `(filename, fp)` tuples, where `fp` is opened for reading bytes
+        """
         raise NotImplementedError
-    
-    def parse_article_xml(self):
+
+    def should_parse(self, filename) -> bool:
+        """
+        Whether the file should be parsed, e.g. `False` if it was already parsed in a previous run. Called before the file is read.
+        """
+        return True
+
+    def read_article(self, filename, fp):
+        """
+        Reads a file for `parse_article_xml`, by default all of it at once. `fp` is closed afterwards.
+        """
+        return fp.read()
+
+    def parse_article_xml(self, xml_string, writer) -> dict:
+        """
+        :param xml_string: whatever `read_article` returned
+        :param writer: the `ArticleFiles` of this article, all of its files have to be written through it
+        :return: metadata of the article, with `has_reviews` set
+        """
         raise NotImplementedError
-    
-    def parse_subarticle(self):
+
+    def parse_subarticle(self, sub_article) -> dict:
         raise NotImplementedError
-    
-    def get_article_files(self):
-        raise NotImplementedError
\ No newline at end of file
+
+    def write_outcome(self, filename, metadata, files):
+        """
+        Saves the metadata of an article. Called from `write_workers` threads, so shared state has to be guarded with `lock`.
+        Writing files while holding `lock` could deadlock with `write_failed`, so it has to be done outside of it.
+
+        :param metadata: dictionary returned by `parse_article_xml`, or `None` if there was an error while reading or parsing the file
+        :param files: the `ArticleFiles` the article was written through, `None` if the file could not be read.
+            Its files may still be waiting in `writer`, so `files.failed` is only final after `parse_corpus` returned.
+        """
+        pass
+
+    def write_failed(self, filename, files):
+        """
+        Called (from a thread of `writer`) the first time a file of an article could not be written, the error itself is already counted.
+        This can happen before or after `write_outcome` was called for the article.
+        """
+        pass
+
+    def count_error(self, filename, e):
+        with self.lock:
+            self.errors_counter += 1
+        self.logger.error(f"There was a {e.__class__.__name__} while parsing {filename}: {str(e)}")
+
+    def count_write_error(self, path, e):
+        with self.lock:
+            self.errors_counter += 1
+        self.logger.error(f"There was a {e.__class__.__name__} while writing {path}: {str(e)}")
+
+    def _read(self, article_files, files_lock, parse_queue, write_queue):
+        while True:
+            # the iterator is shared by all readers, only taking the next file has to be serialized
+            with files_lock:
+                try:
+                    filename, fp = next(article_files, (None, None))
+                except Exception as e:
+                    # the listing itself failed, `parse_corpus` raises it once the files read so far went through
+                    self._failure = e
+                    return
+            if filename is None:
+                return
+            try:
+                try:
+                    if not self.should_parse(filename):
+                        continue
+                    with self.timings('read'):
+                        xml_string = self.read_article(filename, fp)
+                finally:
+                    fp.close()
+            except Exception as e:
+                self.count_error(filename, e)
+                write_queue.put((filename, None, None))
+                continue
+            parse_queue.put((filename, xml_string))
+
+    def _parse(self, parse_queue, write_queue):
+        while True:
+            item = parse_queue.get()
+            if item is _DONE:
+                return
+            filename, xml_string = item
+            files = ArticleFiles(self.writer, on_failure = lambda files, filename = filename: self.write_failed(filename, files))
+            try:
+                metadata = self.parse_article_xml(xml_string, files)
+            except Exception as e:
+                self.count_error(filename, e)
+                metadata = None
+            write_queue.put((filename, metadata, files))
+
+    def _write(self, write_queue):
+        while True:
+            item = write_queue.get()
+            if item is _DONE:
+                return
+            filename, metadata, files = item
+            try:
+                self.write_outcome(filename, metadata, files)
+            except Exception as e:
+                self.count_error(filename, e)
+                continue
+            if metadata is not None and metadata['has_reviews']:
+                with self.lock:
+                    self.reviewed_counter += 1
+
+    def parse_corpus(self):
+        """
+        Runs every file from `get_article_files` through the pipeline and waits until all of them were written, including the files in `writer`.
+        Exceptions raised for a single file are logged and counted, they do not stop the pipeline.
+        An exception raised by `get_article_files` is raised again after the files read before it were written.
+
+        :return: a tuple: `(reviewed_counter, errors_counter)`
+        :rtype: tuple
+        """
+        parse_queue = queue.Queue(self.queue_size)
+        write_queue = queue.Queue(self.queue_size)
+        article_files = iter(self.get_article_files())
+        files_lock = threading.Lock()
+        self._failure = None
+        # output files are written in the background, see `file_writer`. It is closed at the end of the run, so every run gets its own.
+        self.writer = AsyncWriter(on_error = self.count_write_error)
+
+        def start(target, args, n):
+            threads = [threading.Thread(target = target, args = args, daemon = True) for _ in range(n)]
+            for thread in threads:
+                thread.start()
+            return threads
+
+        def finish(threads, next_queue, n):
+            # once a stage is done, every thread of the next one gets a marker to stop at
+            for thread in threads:
+                thread.join()
+            for _ in range(n):
+                next_queue.put(_DONE)
+
+        try:
+            writers = start(self._write, (write_queue,), self.write_workers)
+            parsers = start(self._parse, (parse_queue, write_queue), self.parse_workers)
+            readers = start(self._read, (article_files, files_lock, parse_queue, write_queue), self.read_workers)
+            finish(readers, parse_queue, self.parse_workers)
+            finish(parsers, write_queue, self.write_workers)
+            for thread in writers:
+                thread.join()
+        finally:
+            self.writer.close()
+        if self._failure is not None:
+            raise self._failure
+        return self.reviewed_counter, self.errors_counter
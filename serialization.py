@@ -0,0 +1,59 @@
+"""
+Binary form of parsed metadata for sending it from worker processes to the parent within a single run of a crawler.
+
+Metadata of articles is plain data (dictionaries, lists, strings, numbers, booleans and `None`), which `marshal`
+writes in C, about twice as fast as `pickle` does, so workers spend less time serializing their outcomes.
+Every payload starts with a small header: a magic string, `FORMAT_VERSION`, the version of the marshal format
+and the version of Python which wrote it, so data from anywhere else is rejected instead of being misread.
+
+This is deliberately not a storage format, nothing writes it to disk. The marshal format may change between versions
+of Python and `marshal` is not safe against crafted input, so a file in it could become unreadable after an upgrade.
+The crawlers persist metadata as JSON instead, one file per article or JSON Lines shards (see `shards.ShardWriter`),
+which stay readable by any tool and any version of Python; a binary copy next to them would only add a second format to keep in sync.
+
+Usage:
+```
+data = dumps(outcomes)    # in a worker
+...
+outcomes = loads(data)    # in the parent
+```
+"""
+
+import marshal
+import struct
+import sys
+
+# bump this when the layout of the serialized data changes
+FORMAT_VERSION = 1
+MAGIC = b'RCM'
+MARSHAL_VERSION = 4
+# magic, `FORMAT_VERSION`, `MARSHAL_VERSION` and the major and minor version of Python
+HEADER = struct.Struct('<3sBBBB')
+_PYTHON_VERSION = sys.version_info[:2]
+
+
+def dumps(obj) -> bytes:
+    """
+    :param obj: plain data: dictionaries, lists, tuples, strings, bytes, numbers, booleans and `None`
+    :raises ValueError: if `obj` contains anything else (e.g. an lxml element)
+    """
+    return HEADER.pack(MAGIC, FORMAT_VERSION, MARSHAL_VERSION, *_PYTHON_VERSION) + marshal.dumps(obj, MARSHAL_VERSION)
+
+
+def loads(data):
+    """
+    Only load data written by `dumps` in the same run, see the module's docstring.
+
+    :raises ValueError: if `data` was not written by `dumps`, or was written in another version of the format or of Python
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("The data is too short to be serialized metadata.")
+    magic, format_version, marshal_version, *python_version = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("The data is not serialized metadata.")
+    if (format_version, marshal_version, tuple(python_version)) != (FORMAT_VERSION, MARSHAL_VERSION, _PYTHON_VERSION):
+        raise ValueError(f"The data was serialized in version {format_version}/{marshal_version} of the format by Python "
+                         f"{'.'.join(map(str, python_version))}, expected {FORMAT_VERSION}/{MARSHAL_VERSION} and Python "
+                         f"{'.'.join(map(str, _PYTHON_VERSION))}.")
+    return marshal.loads(memoryview(data)[HEADER.size:])
+
@@ -0,0 +1,55 @@
+"""
+`requests.Session`s for pools of threads, shared by `downloader.Downloader` and `link_checker.LinkChecker`.
+
+Every thread keeps its own session (sessions are not guaranteed to be thread-safe), so connections are kept alive
+and reused by the requests it sends. The sessions are created on first use and all of them are closed at once.
+
+Usage:
+```
+sessions = ThreadSessions()
+sessions.get().get(url)    # from any thread
+...
+sessions.close()
+```
+"""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class ThreadSessions:
+
+    def __init__(self, pool_size = 4):
+        """
+        :param pool_size: number of connections every session keeps per host
+        """
+        self.pool_size = pool_size
+        self._local = threading.local()
+        self._sessions = []
+        self._lock = threading.Lock()
+
+    def get(self) -> requests.Session:
+        """:return: the session of the calling thread"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections = self.pool_size, pool_maxsize = self.pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def close(self):
+        """Closes the sessions of all threads. Threads which send requests afterwards get new ones."""
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+        self._local = threading.local()
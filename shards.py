@@ -0,0 +1,180 @@
+"""
+Sharded JSON Lines storage for metadata of all articles, an alternative to saving one small JSON file per article.
+
+Records are appended to rotating shard files (`<prefix>-00000.jsonl`, `<prefix>-00001.jsonl`, ...) in a single directory.
+An append-only index (`INDEX_FILENAME`) maps every short DOI to the shard and byte offset of its newest record,
+so a single record can be read back without scanning the shards.
+"""
+
+import json
+import os
+
+INDEX_FILENAME = 'index.tsv'
+
+
+def _load_index(directory) -> dict:
+    index = {}
+    index_path = os.path.join(directory, INDEX_FILENAME)
+    if os.path.exists(index_path):
+        with open(index_path, 'r', encoding='utf-8') as fp:
+            for line in fp:
+                key, shard, offset = line.rstrip('\n').split('\t')
+                # later lines override earlier ones, because the record was saved again
+                index[key] = shard, int(offset)
+    return index
+
+
+def is_shard_dir(path) -> bool:
+    """Whether `path` is a directory with shards written by `ShardWriter`."""
+    return os.path.exists(os.path.join(path, INDEX_FILENAME))
+
+
+class ShardWriter:
+    """
+    Appends metadata records to JSON Lines shards.
+
+    Records are buffered and written to disk every `flush_size` records, together with their entries in the index.
+    A new shard is started once the current one grows past `max_shard_size` bytes.
+    Opening a directory which already contains shards continues where the last run stopped.
+    """
+
+    def __init__(self, directory, prefix = 'articles', max_shard_size = 64*1024*1024, flush_size = 1000):
+        """
+        :param directory: where the shards and the index are saved, it is created if it does not exist.
+        :param max_shard_size: size in bytes after which a new shard is started
+        :param flush_size: number of records which are kept in memory before they are written to disk
+        """
+        self.directory = directory
+        self.prefix = prefix
+        self.max_shard_size = max_shard_size
+        self.flush_size = flush_size
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        self._index = _load_index(directory)
+        self._buffer = []
+        shards = sorted(f for f in os.listdir(directory) if f.startswith(prefix + '-') and f.endswith('.jsonl'))
+        self._shard_no = int(shards[-1][len(prefix)+1:-len('.jsonl')]) if shards else 0
+        self._open_shard()
+        self._index_fp = open(os.path.join(directory, INDEX_FILENAME), 'a', encoding='utf-8')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def _open_shard(self):
+        self._shard_name = f"{self.prefix}-{self._shard_no:05d}.jsonl"
+        self._shard_fp = open(os.path.join(self.directory, self._shard_name), 'ab')
+        self._shard_size = self._shard_fp.tell()
+
+    def write(self, key, record):
+        """
+        Saves `record` under `key` (the short DOI of an article). Saving another record with the same key replaces the old one.
+        """
+        self._buffer.append((key, json.dumps(record).encode('utf-8') + b'\n'))
+        if len(self._buffer) >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        index_lines = []
+        for key, line in self._buffer:
+            if self._shard_size >= self.max_shard_size:
+                self._shard_fp.close()
+                self._shard_no += 1
+                self._open_shard()
+            self._shard_fp.write(line)
+            self._index[key] = self._shard_name, self._shard_size
+            index_lines.append(f"{key}\t{self._shard_name}\t{self._shard_size}\n")
+            self._shard_size += len(line)
+        self._buffer = []
+        # the shard is flushed first, so that the index never points past its end
+        self._shard_fp.flush()
+        self._index_fp.write(''.join(index_lines))
+        self._index_fp.flush()
+
+    def close(self):
+        self.flush()
+        self._shard_fp.close()
+        self._index_fp.close()
+
+
+class ShardReader:
+    """
+    Reads metadata records saved by `ShardWriter`, either one at a time by key, or all of them.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._index = _load_index(directory)
+        self._fps = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def keys(self):
+        return self._index.keys()
+
+    def read(self, key) -> dict:
+        """
+        :return: the newest record saved under `key`
+        :raises KeyError: if there is no such record
+        """
+        shard, offset = self._index[key]
+        if shard not in self._fps:
+            self._fps[shard] = open(os.path.join(self.directory, shard), 'rb')
+        fp = self._fps[shard]
+        fp.seek(offset)
+        return json.loads(fp.readline())
+
+    def __iter__(self):
+        """
+        Yields `(key, record)` tuples for the newest record of every key, reading each shard sequentially.
+        """
+        by_shard = {}
+        for key, (shard, offset) in self._index.items():
+            by_shard.setdefault(shard, {})[offset] = key
+        for shard in sorted(by_shard):
+            offsets = by_shard[shard]
+            with open(os.path.join(self.directory, shard), 'rb') as fp:
+                offset = 0
+                for line in fp:
+                    if offset in offsets:
+                        yield offsets[offset], json.loads(line)
+                    offset += len(line)
+
+    def close(self):
+        for fp in self._fps.values():
+            fp.close()
+        self._fps = {}
+
+
+def iter_metadata(path):
+    """
+    Yields `(short_doi, metadata)` tuples from a folder with metadata of all articles,
+    no matter whether it contains shards written by `ShardWriter` or one JSON file per article.
+    """
+    if is_shard_dir(path):
+        with ShardReader(path) as reader:
+            yield from reader
+    else:
+        for filename in os.listdir(path):
+            name, ext = os.path.splitext(filename)
+            if ext.lower() == '.json':
+                with open(os.path.join(path, filename), 'r', encoding='utf-8') as fp:
+                    yield name, json.load(fp)
@@ -0,0 +1,72 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+PAYLOAD = os.urandom(300*1024)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Stands in for the servers of the publishers and for doi.org. Every request is recorded as a `(path, Range header)` tuple.
+
+    /missing/... returns 404, /broken/... 500 and /busy/... 429. Paths starting with /flaky fail with 503 every other time.
+    /doi/<doi> returns the metadata of `<doi>`, except for DOIs ending with `.moved`, which resolve to another DOI.
+    Every other path serves `PAYLOAD`, Range requests are supported.
+    """
+    requests_seen = []
+
+    def do_GET(self):
+        StandInHandler.requests_seen.append((self.path, self.headers.get('Range')))
+        if self.path.startswith('/doi/'):
+            doi = self.path[len('/doi/'):]
+            self.send_body(json.dumps({'DOI': doi.replace('.moved', '.new')}).encode(), content_type = 'application/json')
+            return
+        status = {'missing': 404, 'broken': 500, 'busy': 429}.get(self.path.split('/')[1])
+        if self.path.startswith('/flaky') and len(StandInHandler.requests_seen) % 2 == 1:
+            status = 503
+        if status is not None:
+            self.send_error(status)
+            return
+        if self.headers.get('Range'):
+            start = int(self.headers['Range'].split('=')[1].rstrip('-'))
+            if start >= len(PAYLOAD):
+                self.send_error(416)
+                return
+            self.send_body(PAYLOAD[start:], status = 206)
+            return
+        self.send_body(PAYLOAD)
+
+    def send_body(self, body, status = 200, content_type = 'application/octet-stream'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    """:return: base URL of a `StandInHandler` server running in the background"""
+    StandInHandler.requests_seen = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+
+
+@pytest.fixture
+def requests_seen(server):
+    """:return: the requests `server` received so far, as `(path, Range header)` tuples"""
+    return StandInHandler.requests_seen
+
+
+@pytest.fixture
+def payload():
+    return PAYLOAD
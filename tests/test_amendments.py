@@ -0,0 +1,50 @@
+import io
+
+from .. import amendments
+
+RETRACTION_XML = b'''<?xml version="1.0" encoding="UTF-8"?>
+<article xmlns:xlink="http://www.w3.org/1999/xlink" article-type="retraction" dtd-version="1.1d3">
+<front><article-meta>
+<article-id pub-id-type="doi">10.1371/journal.pone.0000002</article-id>
+<related-article ext-link-type="uri" xlink:href="info:doi/10.1371/journal.pone.0000001" related-article-type="retracted-article" xlink:type="simple"/>
+</article-meta></front>
+<body><p>This article has been retracted.</p></body>
+</article>'''
+
+RESEARCH_XML = b'''<?xml version="1.0" encoding="UTF-8"?>
+<article xmlns:xlink="http://www.w3.org/1999/xlink" article-type="research-article" dtd-version="1.1d3">
+<front><article-meta>
+<article-id pub-id-type="doi">10.1371/journal.pone.0000001</article-id>
+</article-meta></front>
+</article>'''
+
+
+def test_read_article_type():
+    assert amendments.read_article_type(RETRACTION_XML[:amendments.HEAD_SIZE]) == 'retraction'
+    assert amendments.read_article_type(RESEARCH_XML) == 'research-article'
+    assert amendments.read_article_type(b'<?xml version="1.0"?>') is None
+
+
+def test_build_and_load(tmpdir):
+    files = [('pone.0000001.xml', io.BytesIO(RESEARCH_XML)), ('pone.0000002.xml', io.BytesIO(RETRACTION_XML))]
+    index = amendments.AmendmentIndex.build(files)
+    assert all(fp.closed for _, fp in files)
+    assert index.is_retracted('10.1371/journal.pone.0000001')
+    assert not index.is_retracted('10.1371/journal.pone.0000002')
+    assert index.get_amendments('10.1371/JOURNAL.PONE.0000001') == {'retraction': ['10.1371/journal.pone.0000002']}
+
+    path = str(tmpdir.join('amendments.json'))
+    index.save(path, stamp = [1, 2])
+    assert amendments.AmendmentIndex.load(path, stamp = [1, 2]).is_retracted('10.1371/journal.pone.0000001')
+    # the corpus changed since:
+    assert amendments.AmendmentIndex.load(path, stamp = [1, 3]) is None
+
+
+def test_stamp_of_directory_changes_with_its_files(tmpdir):
+    article = tmpdir.join('pone.0000001.xml')
+    article.write(RESEARCH_XML)
+    stamp = amendments.get_stamp(str(tmpdir))
+    # edited in place, which does not change the directory itself
+    article.write(RETRACTION_XML)
+    article.setmtime(article.mtime() + 10)
+    assert amendments.get_stamp(str(tmpdir)) != stamp
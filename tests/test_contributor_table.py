@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+import pytest
+
+from .. import contributor_table
+
+
+def make_article(doi, journal, contributors):
+    return SimpleNamespace(doi = doi, journal = journal, contributors = contributors)
+
+
+ARTICLES = [
+    make_article('10.7554/eLife.00001', 'eLife', [
+        {'contrib_type': 'author', 'given_names': 'Kim', 'surname': 'Lee', 'affiliations': ['Uni A', 'Uni B']},
+        {'contrib_type': 'editor', 'given_names': 'Ann', 'surname': 'Smith', 'affiliations': []},
+    ]),
+    make_article('10.7554/eLife.00002', 'eLife', []),
+    make_article('10.1371/journal.pone.0000001', 'PLOS ONE', [
+        {'contrib_type': 'author', 'given_names': 'Kim', 'surname': 'Lee', 'affiliations': ['Uni A']},
+    ]),
+]
+
+
+def test_columns():
+    table = contributor_table.ContributorTable()
+    for a in ARTICLES:
+        table.add_article(a)
+    assert len(table) == 3
+    assert list(table.contributors['article']) == [0, 0, 2]
+    assert table.decode(table.contributors['surname']) == ['Lee', 'Smith', 'Lee']
+    assert table.decode(table.contributors['group_name']) == [None, None, None]
+    assert list(table.affiliations['contributor']) == [0, 0, 2]
+    assert table.decode(table.affiliations['affiliation']) == ['Uni A', 'Uni B', 'Uni A']
+    assert list(table.contributors_per_article()) == [2, 0, 1]
+    assert list(table.contributors_per_article(contrib_type = 'author')) == [1, 0, 1]
+    assert list(table.contributors_per_article(contrib_type = 'reviewer')) == [0, 0, 0]
+
+
+def test_save_and_load(tmpdir):
+    table = contributor_table.ContributorTable()
+    for a in ARTICLES:
+        table.add_article(a)
+    path = str(tmpdir.join('contributors.zip'))
+    table.save(path)
+    loaded = contributor_table.ContributorTable.load(path)
+    assert loaded.dois == table.dois
+    assert loaded.strings.strings == table.strings.strings
+    assert loaded.tables == table.tables
+
+
+def test_untyped_contributors_are_not_counted_for_unknown_types():
+    table = contributor_table.ContributorTable()
+    table.add_article(make_article('10.7554/eLife.00003', 'eLife', [
+        {'contrib_type': None, 'surname': 'Doe'},
+        {'contrib_type': 'author', 'surname': 'Lee'},
+    ]))
+    assert list(table.contributors_per_article(contrib_type = 'reviewer')) == [0]
+    assert list(table.contributors_per_article(contrib_type = 'author')) == [1]
+    assert list(table.contributors_per_article()) == [2]
+
+
+def test_counts_without_numpy(monkeypatch):
+    table = contributor_table.ContributorTable()
+    for a in ARTICLES:
+        table.add_article(a)
+    expected = [list(table.contributors_per_article(contrib_type = t)) for t in (None, 'author', 'reviewer')]
+    monkeypatch.setattr(contributor_table, 'numpy', None)
+    assert [list(table.contributors_per_article(contrib_type = t)) for t in (None, 'author', 'reviewer')] == expected
+    with pytest.raises(ImportError):
+        table.to_numpy()
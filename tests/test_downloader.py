@@ -0,0 +1,44 @@
+import os
+
+from .. import downloader
+
+def test_download_file_resumes(tmpdir, server, requests_seen, payload):
+    path = os.path.join(tmpdir, 'sm.docx')
+    with open(path + downloader.PART_SUFFIX, 'wb') as fp:
+        fp.write(payload[:1000])
+    downloader.download_file(server + '/sm.docx', path)
+    assert open(path, 'rb').read() == payload
+    assert not os.path.exists(path + downloader.PART_SUFFIX)
+    assert requests_seen == [('/sm.docx', 'bytes=1000-')]
+
+
+def test_downloader(tmpdir, server, payload):
+    with downloader.Downloader(max_workers=3, max_queued=4, backoff=0.01) as dl:
+        futures = [dl.submit(f'{server}/flaky/{i}', os.path.join(tmpdir, f'{i}.pdf')) for i in range(10)]
+    assert all(f.result() for f in futures)
+    assert not dl.failed
+    for i in range(10):
+        assert open(os.path.join(tmpdir, f'{i}.pdf'), 'rb').read() == payload
+
+
+def test_downloader_gives_up(tmpdir):
+    with downloader.Downloader(retries=1, backoff=0.01, timeout=1) as dl:
+        dl.submit('http://127.0.0.1:9/nothing', os.path.join(tmpdir, 'x.pdf'))
+    assert len(dl.failed) == 1
+
+
+def test_client_errors_are_not_retried(tmpdir, server, requests_seen):
+    with downloader.Downloader(retries=2, backoff=0.01) as dl:
+        dl.submit(server + '/missing/1', os.path.join(tmpdir, 'missing.pdf'))
+    assert requests_seen == [('/missing/1', None)]
+    requests_seen.clear()
+    with downloader.Downloader(retries=2, backoff=0.01) as dl:
+        dl.submit(server + '/busy/1', os.path.join(tmpdir, 'busy.pdf'))
+    assert requests_seen == [('/busy/1', None)] * 3
+    assert [url for url, _ in dl.failed] == [server + '/busy/1']
+
+
+def test_try_download_file_logs_errors(tmpdir, server):
+    assert downloader.try_download_file(server + '/flaky/1', os.path.join(tmpdir, 'x.pdf')) is False
+    assert not os.path.exists(os.path.join(tmpdir, 'x.pdf'))
+    assert downloader.try_download_file('http://127.0.0.1:9/nothing', os.path.join(tmpdir, 'x.pdf'), timeout = 1) is False
@@ -6,7 +6,8 @@ from .. import elife_crawler
 
 sample_filename = 'elife-47612-v2.xml'
 
-corpus_path = elife_crawler.elife_corpus_path
+# not set if the corpus is not in `input`, then only the tests that do not need it can pass
+corpus_path = getattr(elife_crawler, 'elife_corpus_path', None)
 
 NUM_RANDOM_ARTICLES = 100
 
@@ -33,6 +34,15 @@ def test_get_article_files():
         assert splat[0] not in seen_articles
         seen_articles.add(splat[0])
         
+def test_get_article_files_from_an_invalid_path(tmpdir):
+    not_a_zip = tmpdir.join('elife.zip')
+    not_a_zip.write('not a zip')
+    with pytest.raises(elife_crawler.zipfile.BadZipFile):
+        next(elife_crawler.get_article_files(str(not_a_zip)))
+    with pytest.raises(OSError):
+        next(elife_crawler.get_article_files(str(tmpdir.join('missing.zip'))))
+
+
 def test_parse_article_xml(sample_article):
     res = elife_crawler.parse_article_xml(sample_article)
     assert 'doi' in res
@@ -44,4 +54,103 @@ def test_random_articles(random_articles):
     for article in random_articles:
         res = elife_crawler.parse_article_xml(article)
         assert 'doi' in res
-        assert len(res['authors']) > 0
\ No newline at end of file
+        assert len(res['authors']) > 0
+
+def test_filename_to_short_doi():
+    assert elife_crawler.filename_to_short_doi('elife-00003-v2.xml') == 'eLife.00003'
+    assert elife_crawler.filename_to_short_doi('elife-article-xml-master/articles/elife-47612-v1.xml') == \
+        elife_crawler.doi_to_short_doi('10.7554/eLife.47612')
+
+
+def test_get_newest_versions():
+    filenames = ['articles/elife-00001-v1.xml', 'articles/elife-00001-v3.xml', 'articles/elife-00001-v2.xml',
+                 'articles/elife-00002-v1.xml', 'articles/README.md', 'articles/elife-surprise.xml']
+    assert elife_crawler.get_newest_versions(filenames) == {
+        'articles/elife-00001': (3, 'articles/elife-00001-v3.xml'),
+        'articles/elife-00002': (1, 'articles/elife-00002-v1.xml'),
+        'articles/elife-surprise.xml': (-1, 'articles/elife-surprise.xml'),
+    }
+
+
+def test_save_and_load_versions(tmpdir):
+    path = str(tmpdir.join('elife', 'versions.json'))
+    assert elife_crawler.load_versions(path) == {}
+    elife_crawler.save_versions(path, {'eLife.00001': 3})
+    assert elife_crawler.load_versions(path) == {'eLife.00001': 3}
+
+
+ELIFE_XML = '''<?xml version="1.0" encoding="UTF-8"?>
+<article article-type="research-article"><front>
+<journal-meta><journal-title-group><journal-title>eLife</journal-title></journal-title-group></journal-meta>
+<article-meta><article-id pub-id-type="doi">10.7554/eLife.{n:05d}</article-id>
+<title-group><article-title>Article {n}</article-title></title-group>
+<pub-date date-type="pub"><day>5</day><month>6</month><year>2020</year></pub-date><volume>9</volume>
+</article-meta></front><body><p>Body.</p></body></article>'''
+
+
+def test_reviewed_index_scales(tmpdir, monkeypatch):
+    output = tmpdir.mkdir('output')
+    monkeypatch.setattr(elife_crawler, 'all_articles_path', str(output.mkdir('all_articles')))
+    monkeypatch.setattr(elife_crawler, 'filtered_path', str(output.mkdir('reviewed_articles')))
+    monkeypatch.setattr(elife_crawler, 'version_index_path', str(output.join('versions.json')))
+    # output of previous runs, how often the directory is listed does not depend on its size
+    for i in range(300):
+        open(os.path.join(elife_crawler.filtered_path, f'eLife.{900000 + i}'), 'w').close()
+    corpus = tmpdir.mkdir('corpus')
+    for n in range(1, 201):
+        corpus.join(f'elife-{n:05d}-v1.xml').write(ELIFE_XML.format(n=n))
+
+    listed = []
+    listdir = os.listdir
+    def counting_listdir(path):
+        listed.append(path)
+        return listdir(path)
+    monkeypatch.setattr(os, 'listdir', counting_listdir)
+    for _ in range(2):
+        elife_crawler.process_elife_corpus(str(corpus), skip_sm_dl = True, check_retractions = False)
+    # once per run, not once per article
+    assert listed.count(elife_crawler.filtered_path) == 2
+    assert len(listdir(elife_crawler.all_articles_path)) == 200
+
+
+def test_large_articles_are_streamed(tmpdir, monkeypatch):
+    corpus = tmpdir.mkdir('corpus')
+    for n in range(1, 6):
+        corpus.join(f'elife-{n:05d}-v1.xml').write(ELIFE_XML.format(n=n))
+    outputs = []
+    for max_article_size in (None, 0):
+        output = tmpdir.mkdir(f'output{len(outputs)}')
+        monkeypatch.setattr(elife_crawler, 'all_articles_path', str(output.mkdir('all_articles')))
+        monkeypatch.setattr(elife_crawler, 'filtered_path', str(output.mkdir('reviewed_articles')))
+        monkeypatch.setattr(elife_crawler, 'version_index_path', str(output.join('versions.json')))
+        elife_crawler.process_elife_corpus(str(corpus), skip_sm_dl = True, check_retractions = False, max_article_size = max_article_size)
+        outputs.append({path.basename: path.read() for path in output.join('all_articles').listdir()})
+    assert len(outputs[0]) == 5
+    assert outputs[0] == outputs[1]
+
+
+def test_articles_with_failed_writes_are_not_recorded(tmpdir, monkeypatch):
+    output = tmpdir.mkdir('output')
+    monkeypatch.setattr(elife_crawler, 'all_articles_path', str(output.mkdir('all_articles')))
+    monkeypatch.setattr(elife_crawler, 'filtered_path', str(output.mkdir('reviewed_articles')))
+    monkeypatch.setattr(elife_crawler, 'version_index_path', str(output.join('versions.json')))
+    corpus = tmpdir.mkdir('corpus')
+    for n in range(1, 6):
+        corpus.join(f'elife-{n:05d}-v1.xml').write(ELIFE_XML.format(n=n))
+
+    # the class the crawler writes with, the package import of `file_writer` is a different module
+    write_bytes = elife_crawler.FileWriter.write_bytes
+    def failing_write_bytes(self, path, data, files = None):
+        if path.endswith('eLife.00003.json'):
+            if files is not None:
+                files.fail()
+            raise OSError("disk full")
+        write_bytes(self, path, data, files)
+    monkeypatch.setattr(elife_crawler.FileWriter, 'write_bytes', failing_write_bytes)
+    elife_crawler.process_elife_corpus(str(corpus), skip_sm_dl = True, check_retractions = False)
+    versions = elife_crawler.load_versions(elife_crawler.version_index_path)
+    assert sorted(versions) == ['eLife.00001', 'eLife.00002', 'eLife.00004', 'eLife.00005']
+    # the article is parsed again in the next run
+    monkeypatch.setattr(elife_crawler.FileWriter, 'write_bytes', write_bytes)
+    elife_crawler.process_elife_corpus(str(corpus), skip_sm_dl = True, check_retractions = False)
+    assert sorted(elife_crawler.load_versions(elife_crawler.version_index_path)) == [f'eLife.{n:05d}' for n in range(1, 6)]
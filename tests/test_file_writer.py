@@ -0,0 +1,36 @@
+import json
+import os
+
+import lxml.etree as et
+
+from .. import file_writer
+
+
+def test_async_writer(tmpdir):
+    tree = et.ElementTree(et.fromstring('<article><title>é</title></article>'))
+    expected = str(tmpdir.join('expected.xml'))
+    tree.write(expected)
+    with file_writer.AsyncWriter(max_queued = 4, batch_size = 3) as writer:
+        for i in range(50):
+            writer.write_json(str(tmpdir.join(f'dir{i % 5}', 'sub', f'{i}.json')), {'id': i})
+        writer.write_tree(str(tmpdir.join('article.xml')), tree)
+    assert json.loads(tmpdir.join('dir2', 'sub', '12.json').read()) == {'id': 12}
+    assert len(tmpdir.join('dir4', 'sub').listdir()) == 10
+    assert tmpdir.join('article.xml').read_binary() == tmpdir.join('expected.xml').read_binary()
+    assert not [path for path in tmpdir.visit() if path.ext == file_writer.TMP_SUFFIX]
+
+
+def test_async_writer_errors(tmpdir):
+    tmpdir.join('file').write('')
+    errors = []
+    writer = file_writer.AsyncWriter(on_error = lambda path, e: errors.append(path))
+    writer.write_bytes(str(tmpdir.join('file', 'child.xml')), b'<a/>')
+    writer.write_bytes(str(tmpdir.join('ok.xml')), b'<a/>')
+    writer.flush()
+    assert errors == [str(tmpdir.join('file', 'child.xml'))]
+    assert tmpdir.join('ok.xml').read() == '<a/>'
+    writer.close()
+    # a closed writer starts again when it is used
+    writer.write_bytes(str(tmpdir.join('again.xml')), b'<b/>')
+    writer.close()
+    assert os.path.exists(str(tmpdir.join('again.xml')))
@@ -0,0 +1,51 @@
+import time
+from types import SimpleNamespace
+
+from .. import link_checker
+
+
+def test_check_links_and_cache(tmpdir, server, requests_seen):
+    urls = [f'{server}/ok/{i}' for i in range(10)] + [f'{server}/missing/1', f'{server}/broken/1']
+    cache_path = str(tmpdir.join('links.sqlite'))
+    with link_checker.LinkChecker(max_workers = 4, rate = 0, cache_path = cache_path) as checker:
+        results = checker.check_links(urls)
+    assert [results[url] for url in urls] == [True] * 10 + [False, 'error']
+    assert len(requests_seen) == 12
+    with link_checker.LinkChecker(rate = 0, cache_path = cache_path) as checker:
+        assert checker.check_links(urls) == results
+    # only the error is checked again
+    assert requests_seen[12:] == [('/broken/1', None)]
+
+
+def test_expired_results_are_checked_again(tmpdir, server, requests_seen):
+    with link_checker.LinkChecker(rate = 0, cache_path = str(tmpdir.join('links.sqlite')), ttl = -1) as checker:
+        checker.check_link(server + '/ok/1')
+        checker.check_link(server + '/ok/1')
+    assert requests_seen == [('/ok/1', None)] * 2
+
+
+def test_check_dois(server):
+    articles = [SimpleNamespace(doi = '10.7554/eLife.00001', url = server + '/ok/00001'),
+                SimpleNamespace(doi = '10.7554/eLife.00002', url = server + '/missing/00002')]
+    with link_checker.LinkChecker(rate = 0, doi_resolver = server + '/doi/') as checker:
+        results = checker.check_dois(articles + ['10.7554/eLife.00003.moved'])
+        assert checker.check_doi('10.1/x', validate = lambda doi: False) == 'Not valid PLOS DOI structure'
+    assert results == {'10.7554/eLife.00001': 'works',
+                       '10.7554/eLife.00002': "doesn't work",
+                       '10.7554/eLife.00003.moved': '10.7554/eLife.00003.new'}
+
+
+def test_rate_limit(server):
+    with link_checker.LinkChecker(max_workers = 4, rate = 20) as checker:
+        start = time.monotonic()
+        checker.check_links(f'{server}/ok/{i}' for i in range(5))
+        elapsed = time.monotonic() - start
+    # 5 requests to the same host, at most 20 per second
+    assert elapsed >= 4 / 20
+
+
+def test_sessions_are_reused_by_every_batch(server):
+    with link_checker.LinkChecker(max_workers = 2, rate = 0) as checker:
+        for batch in range(5):
+            checker.check_links(f'{server}/ok/{batch}-{i}' for i in range(4))
+        assert len(checker._sessions) <= 2
@@ -0,0 +1,40 @@
+import os
+import pytest
+from zipfile import ZipFile
+
+from .. import manifest
+
+
+@pytest.fixture
+def sample_zip(tmpdir):
+    path = os.path.join(tmpdir, 'sample.zip')
+    with ZipFile(path, 'w') as z:
+        z.writestr('a.xml', b'<article/>')
+        z.writestr('b.xml', b'<article><sub-article/></article>')
+    return path
+
+
+def test_is_unchanged(tmpdir, sample_zip):
+    manifest_path = os.path.join(tmpdir, 'manifest.sqlite')
+    with ZipFile(sample_zip) as z, manifest.ZipManifest(manifest_path) as m:
+        a_info, b_info = z.getinfo('a.xml'), z.getinfo('b.xml')
+        assert not m.is_unchanged(a_info)
+        m.record(a_info, manifest.OUTCOME_PARSED, ['all_articles/a.json'])
+        m.record(b_info, manifest.OUTCOME_ERROR)
+        assert m.is_unchanged(a_info)
+        assert not m.is_unchanged(b_info)   # errors are always retried
+    # records persist between runs:
+    with manifest.ZipManifest(manifest_path) as m:
+        assert len(m) == 2
+        assert m.get_outcome('a.xml') == manifest.OUTCOME_PARSED
+        assert m.get_files('a.xml') == ['all_articles/a.json']
+
+
+def test_changed_member(tmpdir, sample_zip):
+    manifest_path = os.path.join(tmpdir, 'manifest.sqlite')
+    with ZipFile(sample_zip) as z, manifest.ZipManifest(manifest_path) as m:
+        m.record(z.getinfo('a.xml'), manifest.OUTCOME_PARSED)
+    with ZipFile(sample_zip, 'w') as z:
+        z.writestr('a.xml', b'<article>changed</article>')
+    with ZipFile(sample_zip) as z, manifest.ZipManifest(manifest_path) as m:
+        assert not m.is_unchanged(z.getinfo('a.xml'))
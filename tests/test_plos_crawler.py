@@ -1,10 +1,134 @@
+import json
 import os
+import shutil
+import sqlite3
+import zipfile
+
 import pytest
 
-from .. import plos_crawler
+from .. import file_writer, plos_crawler
 
 dumpdir = os.path.join(os.path.dirname(__file__), 'dumps')
 
 # TODO: logs are currently saved to the base folder (/review_crawler/logs),
 #        could be saved instead to /review_crawler/tests/logs
 
+
+sample_front = b"""<article article-type="research-article"><front><journal-meta><journal-title-group><journal-title>PLOS ONE</journal-title></journal-title-group></journal-meta>
+<article-meta><article-id pub-id-type="doi">10.1371/journal.pone.0000001</article-id><title-group><article-title>Sample</article-title></title-group></article-meta></front>"""
+
+
+def test_prescan_article_xml():
+    a = plos_crawler.prescan_article_xml(sample_front + b"<body><p>text</p></body></article>")
+    assert a.doi == '10.1371/journal.pone.0000001'
+    assert [el.tag for el in a.root] == ['front']
+    reviewed = sample_front + b"<body/><sub-article article-type='aggregated-review-documents'/></article>"
+    assert plos_crawler.prescan_article_xml(reviewed) is None
+
+
+def test_get_output_files(tmpdir, monkeypatch):
+    monkeypatch.setattr(plos_crawler, 'OUTPUT_DIR', str(tmpdir))
+    files = file_writer.ArticleFiles(file_writer.FileWriter())
+    files.write_bytes(str(tmpdir.join('reviewed_articles', 'journal.pone.0000001', 'journal.pone.0000001.xml')), b'<article/>')
+    files.write_json(str(tmpdir.join('all_articles', 'journal.pone.0000001.json')), {})
+    assert plos_crawler.get_output_files(files) == [os.path.join('reviewed_articles', 'journal.pone.0000001', 'journal.pone.0000001.xml'),
+                                                    os.path.join('all_articles', 'journal.pone.0000001.json')]
+
+
+
+def plos_xml(i, article_type = 'research-article', retracted_doi = None):
+    related = ''
+    if retracted_doi is not None:
+        related = (f'<related-article ext-link-type="uri" xlink:href="info:doi/{retracted_doi}" related-article-type="retracted-article" '
+                   'xlink:type="simple"/>')
+    reviews = ''
+    if i % 4 == 0:
+        reviews = f"""<sub-article article-type="aggregated-review-documents" id="pone.{i:07d}.r001" specific-use="decision-letter">
+<front-stub><article-id pub-id-type="doi">10.1371/journal.pone.{i:07d}.r001</article-id>
+<title-group><article-title>Decision Letter 0</article-title></title-group></front-stub>
+<body><p><named-content content-type="letter-date">1 Jan 2020</named-content></p><p>Reviewer #1: No</p></body></sub-article>"""
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<article xmlns:xlink="http://www.w3.org/1999/xlink" article-type="{article_type}" dtd-version="1.1d3">
+<front><journal-meta><journal-title-group><journal-title>PLOS ONE</journal-title></journal-title-group></journal-meta>
+<article-meta><article-id pub-id-type="doi">10.1371/journal.pone.{i:07d}</article-id>
+<article-categories><subj-group subj-group-type="heading"><subject>Research Article</subject></subj-group></article-categories>
+<title-group><article-title>Article {i}</article-title></title-group>
+<contrib-group><contrib contrib-type="author"><name><surname>Doe</surname><given-names>Jane</given-names></name></contrib></contrib-group>
+<pub-date pub-type="epub" date-type="pub"><day>5</day><month>3</month><year>2020</year></pub-date><volume>15</volume><issue>3</issue>
+{related}</article-meta></front>
+<body><p>Text of article {i}.</p></body>{reviews}</article>""".encode()
+
+
+def write_zip(path, articles):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as z:
+        for i, xml in articles.items():
+            z.writestr(f'journal.pone.{i:07d}.xml', xml)
+
+
+def load_metadata(i):
+    with open(os.path.join(plos_crawler.all_articles_path, f'journal.pone.{i:07d}.json')) as fp:
+        return json.load(fp)
+
+
+@pytest.fixture
+def corpus(tmpdir, monkeypatch):
+    """Points the crawler to a zip and an output directory in `tmpdir`."""
+    output = tmpdir.mkdir('output')
+    monkeypatch.setattr(plos_crawler, 'zipfile_path', str(tmpdir.join('allofplos.zip')))
+    monkeypatch.setattr(plos_crawler, 'default_extract_dir', str(tmpdir.join('allofplos_xml')))
+    monkeypatch.setattr(plos_crawler, 'all_articles_path', str(output.join('all_articles')))
+    monkeypatch.setattr(plos_crawler, 'all_articles_shards_path', str(output.join('all_articles_jsonl')))
+    monkeypatch.setattr(plos_crawler, 'filtered_path', str(output.join('reviewed_articles')))
+    monkeypatch.setattr(plos_crawler, 'manifest_path', str(output.join('manifest.sqlite')))
+    monkeypatch.setattr(plos_crawler, 'amendment_index_path', str(output.join('amendments.json')))
+    return tmpdir
+
+
+def test_delta_reprocesses_articles_retracted_since(corpus, monkeypatch):
+    articles = {i: plos_xml(i) for i in range(1, 4)}
+    write_zip(plos_crawler.zipfile_path, articles)
+    plos_crawler.process_allofplos_zip(skip_sm_dl = True, use_manifest = True)
+    assert not load_metadata(1)['retracted']
+
+    previous_zipfile_path = str(corpus.join('previous.zip'))
+    os.replace(plos_crawler.zipfile_path, previous_zipfile_path)
+    articles[4] = plos_xml(4, 'retraction', retracted_doi = '10.1371/journal.pone.0000001')
+    write_zip(plos_crawler.zipfile_path, articles)
+    # only the new files are looked through for amendments
+    def build(*args, **kwargs):
+        raise AssertionError("the whole corpus was searched for amendments")
+    monkeypatch.setattr(plos_crawler.AmendmentIndex, 'build', build)
+    assert plos_crawler.process_allofplos_delta(previous_zipfile_path, skip_sm_dl = True, use_manifest = True) == []
+    assert load_metadata(1)['retracted']
+    assert not load_metadata(2)['retracted']
+    assert load_metadata(4)['doi'] == '10.1371/journal.pone.0000004'
+
+
+def read_outputs(output) -> dict:
+    """:return: contents of every file under `output` (except the manifest) and the rows of the manifest"""
+    contents = {}
+    for dirpath, _, filenames in os.walk(output):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            if path != plos_crawler.manifest_path:
+                with open(path, 'rb') as fp:
+                    contents[os.path.relpath(path, output)] = fp.read()
+    with sqlite3.connect(plos_crawler.manifest_path) as conn:
+        rows = sorted(conn.execute("SELECT name, crc, size, outcome, files FROM members"))
+    return contents, rows
+
+
+@pytest.mark.parametrize('parallel', [{'workers': 2}, {'parse_workers': 2}])
+def test_parallel_runs_give_the_same_outputs(corpus, parallel):
+    articles = {i: plos_xml(i) for i in range(1, 11)}
+    articles[11] = plos_xml(11, 'retraction', retracted_doi = '10.1371/journal.pone.0000003')
+    write_zip(plos_crawler.zipfile_path, articles)
+    output = str(corpus.join('output'))
+    plos_crawler.process_allofplos_zip(skip_sm_dl = True, use_manifest = True)
+    serial = read_outputs(output)
+    shutil.rmtree(output)
+    plos_crawler.process_allofplos_zip(skip_sm_dl = True, use_manifest = True, **parallel)
+    contents, rows = read_outputs(output)
+    assert len(rows) == 11 and load_metadata(3)['retracted']
+    assert any(name.startswith('reviewed_articles') for name in contents)
+    assert (contents, rows) == serial
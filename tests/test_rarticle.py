@@ -0,0 +1,158 @@
+import gc
+
+import lxml.etree as et
+
+from .. import rarticle
+
+SAMPLE_XML = b'''<?xml version="1.0" encoding="UTF-8"?>
+<article xmlns:xlink="http://www.w3.org/1999/xlink" article-type="research-article" dtd-version="1.1d3">
+<front>
+<journal-meta><journal-title-group><journal-title>PLOS ONE</journal-title></journal-title-group></journal-meta>
+<article-meta>
+<article-id pub-id-type="doi">10.1371/journal.pone.0000001</article-id>
+<article-categories><subj-group subj-group-type="heading"><subject>Research Article</subject></subj-group></article-categories>
+<title-group><article-title>A <italic>sample</italic> title</article-title></title-group>
+<contrib-group><contrib contrib-type="author"><name><surname>Doe</surname><given-names>Jane</given-names></name></contrib></contrib-group>
+<contrib-group><contrib contrib-type="editor"><name><surname>Roe</surname><given-names>Rick</given-names></name></contrib></contrib-group>
+<author-notes><fn fn-type="conflict" id="coi001"><p>None.</p></fn></author-notes>
+<pub-date date-type="pub" pub-type="epub"><day>1</day><month>2</month><year>2020</year></pub-date>
+<volume>15</volume><issue>2</issue><elocation-id>e0000001</elocation-id>
+<history><date date-type="received"><day>1</day><month>1</month><year>2020</year></date></history>
+<permissions><license xlink:href="https://creativecommons.org/licenses/by/4.0/"><license-p>CC BY</license-p></license></permissions>
+<related-article related-article-type="corrected-article" xlink:href="info:doi/10.1371/journal.pone.0000002"/>
+<abstract abstract-type="summary"><p>Author summary.</p></abstract>
+<abstract><p>The abstract.</p></abstract>
+<kwd-group kwd-group-type="author-keywords"><kwd>first</kwd><kwd>second</kwd></kwd-group>
+<kwd-group kwd-group-type="research-organism"><kwd>Mouse</kwd></kwd-group>
+<counts><fig-count count="2"/><table-count count="1"/><page-count count="10"/></counts>
+<custom-meta-group><custom-meta><meta-name>Publication Update</meta-name><meta-value>2020-02-03</meta-value></custom-meta></custom-meta-group>
+</article-meta>
+</front>
+<body><p>Body.</p></body>
+</article>'''
+
+def test_front_matter_matches_xpath():
+    a = rarticle.Article.from_xml(SAMPLE_XML)
+    for field, expression in rarticle.FrontMatter.EXPRESSIONS.items():
+        assert list(getattr(a.front_matter, field)) == a.root.xpath(expression), field
+
+
+def test_xpaths_are_compiled_at_import(tmpdir):
+    registered = set(rarticle.XPATHS)
+    tmpdir.join('journal.pone.0000001.xml').write_binary(SAMPLE_XML)
+    a = rarticle.Article.from_xml(SAMPLE_XML, directory=str(tmpdir))
+    a.type_, a.dtd, a.get_dates(), a.get_element_xpath(), a.rich_title, str(a)
+    assert set(rarticle.XPATHS) == registered
+
+
+def test_front_matter_views():
+    a = rarticle.Article.from_xml(SAMPLE_XML)
+    assert a.title == 'A sample title'
+    assert a.journal == 'PLOS ONE'
+    assert (a.volume, a.issue, a.elocation) == (15, 2, 'e0000001')
+    assert sorted(a.keywords) == ['first', 'second']
+    assert a.abstract == 'The abstract.'
+    assert a.related_dois == ['10.1371/journal.pone.0000002']
+    assert a.counts == {'fig-count': 2, 'table-count': 1, 'page-count': 10}
+
+
+def test_front_matter_is_reset_with_the_tree():
+    a = rarticle.Article.from_xml(SAMPLE_XML)
+    assert a.title == 'A sample title'
+    a.tree = et.fromstring(SAMPLE_XML.replace(b'A <italic>sample</italic> title', b'Another title')).getroottree()
+    assert a.title == 'Another title'
+
+
+BODY_XML = b'''<article article-type="research-article"><front><article-meta>
+<article-id pub-id-type="doi">10.1371/journal.pone.0000003</article-id></article-meta></front>
+<body><sec><title>Intro</title><p>Text with a <ext-link>link</ext-link> and <italic>markup</italic>.<!-- a comment -->After.</p>
+<fig><caption>Figure</caption><graphic/></fig>After the figure.
+<table-wrap><table><tr><td>cell</td></tr></table></table-wrap>
+<sec><title>Supplementary</title><supplementary-material><p>S1</p></supplementary-material></sec>Tail of the section.
+</sec></body>
+<back><ref-list/></back>
+<sub-article article-type="decision-letter"><front-stub/><body><p>Dear author,<fig><caption>x</caption></fig> the review.</p></body></sub-article>
+</article>'''
+
+
+def test_body_does_not_modify_the_tree():
+    a = rarticle.Article.from_xml(BODY_XML)
+    before = et.tostring(a.tree)
+    assert a.body == ('IntroText with a  and markup.After.\nAfter the figure.\n\nTail of the section.\n\n')
+    assert et.tostring(a.tree) == before
+    assert a.body is a.body     # cached
+
+
+def test_get_subarticle_text():
+    a = rarticle.Article.from_xml(BODY_XML)
+    sub_article = a.get_subarticles()[0]
+    assert a.get_subarticle_text(sub_article) == 'Dear author, the review.'
+
+
+def reachable_elements(obj) -> list:
+    """:return: lxml elements and trees that can be reached from `obj` through references"""
+    found, seen, todo = [], set(), [obj]
+    while todo:
+        obj = todo.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, (et._Element, et._ElementTree)):
+            found.append(obj)
+        elif not isinstance(obj, type):
+            todo.extend(gc.get_referents(obj))
+    return found
+
+
+def test_release_drops_the_tree():
+    a = rarticle.Article.from_xml(BODY_XML)
+    # everything memoized from the tree
+    a.front_matter, a.stats, a.body
+    a.get_subarticle_text(a.get_subarticles()[0])
+    assert reachable_elements(a)
+    a.release()
+    assert reachable_elements(a) == []
+    assert a.doi is not None
+
+
+def test_stats_match_the_counts_of_single_searches():
+    a = rarticle.Article.from_xml(BODY_XML)
+    root = a.root
+    stats = a.stats
+    assert stats.figures == len(root.findall('.//fig'))
+    assert stats.tables == len(root.findall('.//table-wrap'))
+    assert stats.sub_articles == len(root.findall('.//sub-article')) == 1
+    assert stats.words == len(et.tostring(root.find('body'), encoding='unicode', method='text').split(' '))
+    assert a.word_count == stats.words
+    assert a.counts['fig-count'] == stats.figures
+
+
+SUB_ARTICLE_XML = b'''<sub-article article-type="aggregated-review-documents" specific-use="peer-review-report">
+<front-stub>
+<article-id pub-id-type="doi">10.1371/journal.pone.0000001.r001</article-id>
+<title-group><article-title>Peer Review History: Round 1</article-title></title-group>
+<contrib-group><contrib contrib-type="reviewer"><name><surname>Roe</surname><given-names>Richard</given-names></name></contrib></contrib-group>
+<related-object document-id="10.1371/journal.pone.0000001" link-type="peer-reviewed-article"><article-id>nested</article-id></related-object>
+</front-stub>
+<body>
+<p><named-content content-type="author-response-date">1 Jan 2020</named-content></p>
+<p>Reviewer #1: Yes: Richard Roe</p>
+<supplementary-material id="pone.0000001.s001"><label><named-content>review.docx</named-content></label></supplementary-material>
+<boxed-text><title>Warning</title></boxed-text>
+</body>
+</sub-article>'''
+
+
+def test_sub_article_view():
+    element = et.fromstring(SUB_ARTICLE_XML)
+    sub_article = rarticle.SubArticle(element)
+    assert (sub_article.type_, sub_article.specific_use) == ('aggregated-review-documents', 'peer-review-report')
+    assert sub_article.doi == '10.1371/journal.pone.0000001.r001'
+    assert sub_article.title == 'Peer Review History: Round 1'
+    assert sub_article.contributors == [('reviewer', 'Richard Roe')]
+    assert sub_article.related_object['document-id'] == '10.1371/journal.pone.0000001'
+    assert sub_article.date == '1 Jan 2020'
+    assert sub_article.supplementary_materials == [('pone.0000001.s001', 'review.docx')]
+    assert sub_article.paragraphs == ['Reviewer #1: Yes: Richard Roe']
+    assert sub_article.boxed_text.find('title').text == 'Warning'
+    assert sub_article.tree.getroot() is element
@@ -0,0 +1,103 @@
+import io
+import logging
+
+import pytest
+
+from .. import review_crawler
+
+
+class ListCrawler(review_crawler.ReviewCrawler):
+    """Parses 'reviewed' or 'plain' out of in-memory files."""
+
+    def __init__(self, files, **kwargs):
+        super().__init__(logging.getLogger("test_review_crawler"), **kwargs)
+        self.files = files
+        self.written = []
+
+    def get_article_files(self):
+        for filename, content in self.files:
+            yield filename, io.BytesIO(content)
+
+    def should_parse(self, filename):
+        return not filename.startswith('skip')
+
+    def parse_article_xml(self, xml_string, writer):
+        if xml_string == b'broken':
+            raise ValueError("broken article")
+        return {'doi': xml_string.decode(), 'has_reviews': xml_string.startswith(b'reviewed')}
+
+    def write_outcome(self, filename, metadata, files):
+        with self.lock:
+            self.written.append((filename, metadata))
+
+
+files = [(f'{i}.xml', b'reviewed' if i % 3 == 0 else b'plain') for i in range(200)]
+files += [('skip.xml', b'plain'), ('broken.xml', b'broken')]
+
+
+def test_pipeline_in_order():
+    crawler = ListCrawler(files, queue_size = 2)
+    assert crawler.parse_corpus() == (67, 1)
+    assert [filename for filename, _ in crawler.written] == [f'{i}.xml' for i in range(200)] + ['broken.xml']
+    assert crawler.written[-1] == ('broken.xml', None)
+
+
+def test_pipeline_with_many_workers():
+    serial = ListCrawler(files)
+    serial.parse_corpus()
+    crawler = ListCrawler(files, read_workers = 3, parse_workers = 4, write_workers = 2, queue_size = 2)
+    assert crawler.parse_corpus() == (67, 1)
+    assert sorted(crawler.written, key=lambda outcome: outcome[0]) == sorted(serial.written, key=lambda outcome: outcome[0])
+
+
+def test_listing_errors_are_raised():
+    class FailingCrawler(ListCrawler):
+        def get_article_files(self):
+            yield from super().get_article_files()
+            raise OSError("corpus disappeared")
+
+    crawler = FailingCrawler(files[:10], parse_workers = 2)
+    with pytest.raises(OSError):
+        crawler.parse_corpus()
+    assert len(crawler.written) == 10
+
+
+def test_write_failures_are_reported_per_article(tmpdir):
+    tmpdir.join('blocked').write('')
+
+    class WritingCrawler(ListCrawler):
+        def parse_article_xml(self, xml_string, writer):
+            metadata = super().parse_article_xml(xml_string, writer)
+            # files of plain articles can not be written, because `blocked` is not a directory
+            directory = 'blocked' if not metadata['has_reviews'] else 'ok'
+            writer.write_bytes(str(tmpdir.join(directory, f'{id(writer)}.xml')), xml_string)
+            return metadata
+
+        def write_failed(self, filename, files):
+            with self.lock:
+                self.failed.append(filename)
+
+    crawler = WritingCrawler(files[:6])
+    crawler.failed = []
+    assert crawler.parse_corpus() == (2, 4)
+    assert sorted(crawler.failed) == ['1.xml', '2.xml', '4.xml', '5.xml']
+    assert [filename for filename, metadata in crawler.written if metadata['has_reviews']] == ['0.xml', '3.xml']
+
+
+def test_parse_corpus_twice(tmpdir):
+    tmpdir.join('blocked').write('')
+
+    class WritingCrawler(ListCrawler):
+        def parse_article_xml(self, xml_string, writer):
+            writer.write_bytes(str(tmpdir.join(self.run, xml_string.decode() + '.xml')), xml_string)
+            return super().parse_article_xml(xml_string, writer)
+
+    crawler = WritingCrawler([('0.xml', b'reviewed'), ('1.xml', b'plain')])
+    crawler.run = 'blocked'
+    assert crawler.parse_corpus() == (1, 2)
+    assert len(crawler.writer.failed) == 2
+    # the second run writes through a writer of its own
+    crawler.run = 'ok'
+    assert crawler.parse_corpus() == (2, 2)
+    assert crawler.writer.failed == []
+    assert sorted(f.basename for f in tmpdir.join('ok').listdir()) == ['plain.xml', 'reviewed.xml']
@@ -0,0 +1,36 @@
+import pytest
+
+from .. import serialization
+
+METADATA = {
+    'doi': '10.1371/journal.pone.0000005', 'title': 'A títle', 'url': 'https://journals.plos.org/plosone/article?id=10.1371/journal.pone.0000005',
+    'journal': {'title': 'PLOS ONE', 'volume': 15, 'issue': None},
+    'publication_date': {'year': 2020, 'month': 6, 'day': 5},
+    'authors': ['Jane Doe', 'John Roe'], 'keywords': [], 'retracted': False, 'has_reviews': True,
+    'stats': {'figures': 2, 'words': 1234},
+    'sub_articles': [{'type': 'aggregated-review-documents', 'round': 1, 'reviewers': [{'number': 1, 'name': 'Anonymous'}],
+                      'supplementary_materials': [{'id': 'journal.pone.0000005.s001', 'filename': 'journal.pone.0000005.s001.docx'}]}],
+}
+
+
+def test_round_trip_keeps_every_field_in_order():
+    loaded = serialization.loads(serialization.dumps(METADATA))
+    assert loaded == METADATA
+    assert list(loaded) == list(METADATA)
+    # as returned by `plos_crawler.process_article_files`
+    outcomes = [('journal.pone.0000005.xml', METADATA, ['all_articles/journal.pone.0000005.json']), ('journal.pone.0000006.xml', None, [])]
+    assert serialization.loads(serialization.dumps(outcomes)) == outcomes
+
+
+def test_rejects_other_data():
+    data = serialization.dumps(METADATA)
+    with pytest.raises(ValueError):
+        serialization.loads(b'RCM' + bytes([serialization.FORMAT_VERSION + 1]) + data[4:])
+    with pytest.raises(ValueError):
+        # written by another version of Python
+        serialization.loads(data[:5] + bytes([2, 7]) + data[7:])
+    with pytest.raises(ValueError):
+        serialization.loads(b'{"doi": null}')
+    with pytest.raises(ValueError):
+        serialization.dumps({'tree': object()})
+
@@ -0,0 +1,34 @@
+import json
+import os
+
+from .. import shards
+
+
+def test_write_and_read(tmpdir):
+    shards_dir = os.path.join(tmpdir, 'shards')
+    with shards.ShardWriter(shards_dir, max_shard_size=200, flush_size=3) as writer:
+        for i in range(10):
+            writer.write(f'a{i}', {'doi': f'a{i}', 'has_reviews': i % 2 == 0})
+        writer.write('a0', {'doi': 'a0', 'has_reviews': False})
+    assert len([f for f in os.listdir(shards_dir) if f.endswith('.jsonl')]) > 1
+    with shards.ShardReader(shards_dir) as reader:
+        assert len(reader) == 10
+        assert reader.read('a3') == {'doi': 'a3', 'has_reviews': False}
+        assert reader.read('a0')['has_reviews'] is False   # newest record wins
+        assert dict(iter(reader)) == {key: reader.read(key) for key in reader.keys()}
+
+
+def test_writer_continues(tmpdir):
+    with shards.ShardWriter(tmpdir) as writer:
+        writer.write('a', {'n': 1})
+    with shards.ShardWriter(tmpdir) as writer:
+        assert 'a' in writer
+        writer.write('b', {'n': 2})
+    assert dict(shards.iter_metadata(tmpdir)) == {'a': {'n': 1}, 'b': {'n': 2}}
+
+
+def test_iter_metadata_json_files(tmpdir):
+    for name in ('x', 'y'):
+        with open(os.path.join(tmpdir, name + '.json'), 'w') as fp:
+            json.dump({'doi': name}, fp)
+    assert dict(shards.iter_metadata(tmpdir)) == {'x': {'doi': 'x'}, 'y': {'doi': 'y'}}
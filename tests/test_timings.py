@@ -0,0 +1,22 @@
+from .. import timings
+
+
+def test_disabled_timings_are_not_recorded():
+    t = timings.Timings()
+    with t('title'):
+        pass
+    assert t.snapshot() == {}
+
+
+def test_merge_snapshots():
+    t = timings.Timings(enabled = True)
+    with t('title'):
+        pass
+    with t('title'):
+        pass
+    run = timings.Timings()
+    run.merge(t.snapshot())
+    run.merge(t.snapshot())
+    assert run.calls == {'title': 4}
+    assert run.totals['title'] >= 0
+    assert 'title' in run.summary()
@@ -0,0 +1,67 @@
+import os
+import time
+import zipfile
+import pytest
+
+from .. import zip_index
+
+
+@pytest.fixture
+def sample_zip(tmpdir):
+    path = os.path.join(tmpdir, 'sample.zip')
+    with zipfile.ZipFile(path, 'w') as z:
+        z.writestr('stored.xml', b'<article/>', compress_type=zipfile.ZIP_STORED)
+        z.writestr('articles/deflated.xml', b'<article>' + b'text' * 1000 + b'</article>', compress_type=zipfile.ZIP_DEFLATED)
+    return path
+
+
+def test_open(sample_zip):
+    index = zip_index.ZipIndex(sample_zip)
+    assert index.rebuilt
+    with zipfile.ZipFile(sample_zip) as z:
+        assert index.namelist() == z.namelist()
+        for name in z.namelist():
+            assert index.getinfo(name).CRC == z.getinfo(name).CRC
+            with index.open(name) as fp:
+                assert fp.read() == z.read(name)
+
+
+def test_cache(sample_zip):
+    zip_index.ZipIndex(sample_zip)
+    assert os.path.exists(sample_zip + zip_index.CACHE_SUFFIX)
+    assert not zip_index.ZipIndex(sample_zip).rebuilt
+    # changing the zip invalidates the cache:
+    time.sleep(0.01)
+    with zipfile.ZipFile(sample_zip, 'a') as z:
+        z.writestr('new.xml', b'<article/>')
+    index = zip_index.ZipIndex(sample_zip)
+    assert index.rebuilt
+    assert 'new.xml' in index
+
+
+def test_diff_zip_indexes(tmpdir, sample_zip):
+    new_path = os.path.join(tmpdir, 'new.zip')
+    with zipfile.ZipFile(new_path, 'w') as z:
+        z.writestr('stored.xml', b'<article/>')  # unchanged, but compressed differently
+        z.writestr('new.xml', b'<article/>')
+    added, modified, removed = zip_index.diff_zip_indexes(zip_index.ZipIndex(sample_zip), zip_index.ZipIndex(new_path))
+    assert (added, modified, removed) == (['new.xml'], [], ['articles/deflated.xml'])
+    with zipfile.ZipFile(new_path, 'a') as z:
+        z.writestr('articles/deflated.xml', b'<article>changed</article>')
+    added, modified, removed = zip_index.diff_zip_indexes(zip_index.ZipIndex(sample_zip), zip_index.ZipIndex(new_path))
+    assert modified == ['articles/deflated.xml'] and removed == []
+
+
+def test_open_checks_the_local_header(tmpdir):
+    path = os.path.join(tmpdir, 'broken.zip')
+    with zipfile.ZipFile(path, 'w') as z:
+        z.writestr('a.xml', b'<article/>')
+    with open(path, 'rb') as fp:
+        data = fp.read()
+    # only the name in the local header (which comes first) is changed
+    with open(path, 'wb') as fp:
+        fp.write(data.replace(b'a.xml', b'b.xml', 1))
+    index = zip_index.ZipIndex(path)
+    with pytest.raises(zipfile.BadZipFile):
+        index.open('a.xml')
+    index.close()
@@ -0,0 +1,94 @@
+"""
+Opt-in instrumentation of the crawlers: cumulative time and number of calls for every metadata field and I/O step.
+
+Usage:
+```
+timings = Timings()
+timings.enabled = True
+with timings('title'):
+    metadata['title'] = a.title
+...
+timings.log_summary(logger)
+```
+While disabled (the default), `timings(name)` returns a shared no-op context manager, so the cost is a single attribute check.
+"""
+
+import threading
+import time
+from contextlib import nullcontext
+
+_NULL_CONTEXT = nullcontext()
+
+
+class _Measurement:
+    __slots__ = ('timings', 'name', 'start')
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.timings.add(self.name, time.perf_counter() - self.start)
+
+
+class Timings:
+    """
+    Cumulative time (in seconds) and call counts, keyed by the name of a metadata field or an I/O step.
+    """
+
+    def __init__(self, enabled = False):
+        self.enabled = enabled
+        self.totals = {}
+        self.calls = {}
+        # crawlers may measure from many threads at once
+        self._lock = threading.Lock()
+
+    def __call__(self, name):
+        """
+        :return: a context manager which adds the time spent inside of it to `name`, if timings are enabled
+        """
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return _Measurement(self, name)
+
+    def add(self, name, seconds, calls = 1):
+        with self._lock:
+            self._add(name, seconds, calls)
+
+    def _add(self, name, seconds, calls):
+        self.totals[name] = self.totals.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + calls
+
+    def snapshot(self) -> dict:
+        """
+        :return: a picklable copy of the timings, e.g. to send them from a worker process to the parent
+        """
+        return {name: (self.totals[name], self.calls[name]) for name in self.totals}
+
+    def merge(self, snapshot):
+        """Adds timings from a `snapshot` to these ones."""
+        for name, (seconds, calls) in snapshot.items():
+            self.add(name, seconds, calls)
+
+    def reset(self):
+        self.totals = {}
+        self.calls = {}
+
+    def summary(self) -> str:
+        """
+        :return: a table of all timings, sorted by the total time, slowest first
+        """
+        overall = sum(self.totals.values())
+        lines = [f"{'field/step':30}{'calls':>10}{'total [s]':>12}{'mean [ms]':>12}{'share':>8}"]
+        for name in sorted(self.totals, key=self.totals.get, reverse=True):
+            total, calls = self.totals[name], self.calls[name]
+            share = total / overall if overall else 0
+            lines.append(f"{name:30}{calls:>10}{total:>12.3f}{total / calls * 1000:>12.3f}{share:>8.1%}")
+        return '\n'.join(lines)
+
+    def log_summary(self, logger):
+        if self.totals:
+            logger.info("Time spent on each metadata field and I/O step:\n" + self.summary())
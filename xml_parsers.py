@@ -0,0 +1,112 @@
+"""
+Preconfigured lxml parsers for the XML files of the corpora, shared by `rarticle.Article.from_xml` and the crawlers.
+
+The corpora are trusted, local files, so the parsers never touch the network, never load DTDs
+and do not keep a table of XML ids (which nothing here looks up).
+lxml parsers must not be used by two threads at once, so every thread gets its own instances, which are then reused.
+Documents that hit libxml2's safety limits (very large text nodes or very deep trees) are parsed again with `huge_tree`.
+Large files can be fed to a parser in chunks with `parse_stream`, so that their raw bytes are never in memory at once.
+When only the metadata of an article is needed, `parse_front` stops parsing after its front matter.
+"""
+
+import threading
+from io import BytesIO
+
+import lxml.etree as et
+
+# options shared by all parsers, also usable with `et.iterparse`
+PARSER_OPTIONS = {
+    'no_network': True,
+    'load_dtd': False,
+    'dtd_validation': False,
+    # external entities are never resolved: lxml 5.0 and later still expand the entities declared in the document,
+    # older versions (which do not support `'internal'`) leave all entities unexpanded
+    'resolve_entities': 'internal' if et.LXML_VERSION >= (5,) else False,
+    'collect_ids': False,
+}
+
+# how many bytes `parse_stream` reads at once
+CHUNK_SIZE = 64*1024
+
+_local = threading.local()
+
+
+def get_parser(remove_blank_text = False, huge_tree = False) -> et.XMLParser:
+    """
+    Returns this thread's parser with the given options, creating it on first use.
+
+    :param remove_blank_text: whether whitespace-only text between elements is dropped. Changes the output when the tree is written back.
+    :param huge_tree: whether libxml2's limits on the size and depth of a document are lifted
+    """
+    parsers = getattr(_local, 'parsers', None)
+    if parsers is None:
+        parsers = _local.parsers = {}
+    key = remove_blank_text, huge_tree
+    parser = parsers.get(key)
+    if parser is None:
+        parser = parsers[key] = et.XMLParser(remove_blank_text = remove_blank_text, huge_tree = huge_tree, **PARSER_OPTIONS)
+    return parser
+
+
+def parse_xml(source, remove_blank_text = False) -> et._Element:
+    """
+    Parses an XML document from a string (or bytes) with one of the shared parsers.
+
+    :return: the root element
+    :raises lxml.etree.XMLSyntaxError: if the document is not well-formed
+    """
+    try:
+        return et.fromstring(source, get_parser(remove_blank_text))
+    except et.XMLSyntaxError:
+        # might be one of libxml2's limits (e.g. "huge text node"), which `huge_tree` lifts, otherwise this fails again
+        return et.fromstring(source, get_parser(remove_blank_text, huge_tree = True))
+
+
+def parse_stream(fp, chunk_size = CHUNK_SIZE, remove_blank_text = False) -> et._Element:
+    """
+    Parses an XML document from a file object, feeding it to the parser `chunk_size` bytes at a time.
+    Only the current chunk and the tree built so far are in memory, so this is meant for files too large to be read whole.
+    The tree is the same as the one from `parse_xml`.
+
+    :param fp: a file object opened for reading bytes. If the document hits libxml2's limits, it is read again with `huge_tree`,
+        which needs `fp` to be seekable (files in zips are).
+    :return: the root element
+    :raises lxml.etree.XMLSyntaxError: if the document is not well-formed
+    """
+    for huge_tree in (False, True):
+        # a new parser every time, a feed which failed half-way would leave the state of a shared one undefined
+        parser = et.XMLParser(remove_blank_text = remove_blank_text, huge_tree = huge_tree, **PARSER_OPTIONS)
+        try:
+            for chunk in iter(lambda: fp.read(chunk_size), b''):
+                parser.feed(chunk)
+            return parser.close()
+        except et.XMLSyntaxError:
+            if huge_tree or not fp.seekable():
+                raise
+            fp.seek(0)
+
+
+def iterparse(source, **kwargs):
+    """
+    `et.iterparse` with the same options as the shared parsers.
+
+    :param source: a file name or a file object opened for reading bytes
+    :param kwargs: passed on to `et.iterparse`, e.g. `events` and `tag`
+    """
+    return et.iterparse(source, **PARSER_OPTIONS, **kwargs)
+
+
+def parse_front(xml_string):
+    """
+    Parses an article incrementally, only until the end of its `<front>`, so the body and back matter never become a part of the tree.
+
+    :param xml_string: bytes of the XML document
+    :return: the root element, with `<front>` as its only child, or `None` if there is no front matter
+    """
+    for _, front in iterparse(BytesIO(xml_string), events=('end',), tag='front'):
+        root = front.getparent()
+        # the parser reads ahead in chunks, so parts of the body could already be in the tree
+        for sibling in list(front.itersiblings()):
+            root.remove(sibling)
+        return root
+    return None
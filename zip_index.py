@@ -0,0 +1,171 @@
+"""
+Cached index of the central directory of a corpus zip file.
+
+`ZipFile` reads the whole central directory every time a zip is opened, which for the PLOS and eLife corpora
+means hundreds of thousands of entries on every start of a crawler. `ZipIndex` reads it only once and saves
+the name, header offset, sizes and CRC of every member to a cache file next to the zip.
+The cache is rebuilt whenever the size or modification time of the zip changes.
+Listing members, looking them up and comparing snapshots only need the index. Members are opened through a `ZipFile`
+which every thread opens once (and so reads the central directory once), given the `ZipInfo` from the index.
+"""
+
+import os
+import pickle
+import threading
+import zipfile
+
+# bump this when the format of the cache changes
+CACHE_VERSION = 1
+CACHE_SUFFIX = '.index'
+
+
+class ZipIndex:
+    """
+    Read-only view of a zip file, backed by a cached index of its central directory.
+    Supports the parts of the `ZipFile` interface which the crawlers use: `namelist`, `infolist`, `getinfo` and `open`.
+    """
+
+    def __init__(self, zip_path, cache_path = None):
+        """
+        :param zip_path: path to the zip file
+        :param cache_path: where the index is cached, defaults to `zip_path` with `CACHE_SUFFIX` appended
+        """
+        self.zip_path = zip_path
+        self.cache_path = cache_path if cache_path else zip_path + CACHE_SUFFIX
+        self.stamp = self._get_stamp()
+        self.rebuilt = False
+        # `ZipFile`s for `open`, one per thread, since reading two members of one `ZipFile` at once is serialized
+        self._local = threading.local()
+        self._zipfiles = []
+        self._lock = threading.Lock()
+        self._entries = self._load_cache()
+        if self._entries is None:
+            self._entries = self._build()
+            self._save_cache()
+            self.rebuilt = True
+
+    def _get_stamp(self):
+        stat = os.stat(self.zip_path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, 'rb') as fp:
+                cache = pickle.load(fp)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        if cache.get('version') != CACHE_VERSION or cache.get('stamp') != self.stamp:
+            return None
+        return cache['entries']
+
+    def _build(self) -> dict:
+        with zipfile.ZipFile(self.zip_path, 'r') as z:
+            return {zinfo.filename: (zinfo.header_offset, zinfo.compress_type, zinfo.compress_size,
+                                     zinfo.file_size, zinfo.CRC, zinfo.flag_bits)
+                    for zinfo in z.infolist()}
+
+    def _save_cache(self):
+        tmp_path = self.cache_path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as fp:
+                pickle.dump({'version': CACHE_VERSION, 'stamp': self.stamp, 'entries': self._entries}, fp,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            # the index still works without the cache, it will just have to be built again next time
+            pass
+
+    def is_stale(self) -> bool:
+        """Whether the zip file changed since the index was loaded."""
+        return self._get_stamp() != self.stamp
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def namelist(self) -> list:
+        return list(self._entries)
+
+    def getinfo(self, name) -> zipfile.ZipInfo:
+        """
+        :return: `ZipInfo` of the member `name`, filled in with the fields stored in the index
+        :raises KeyError: if there is no such member
+        """
+        header_offset, compress_type, compress_size, file_size, crc, flag_bits = self._entries[name]
+        zinfo = zipfile.ZipInfo(name)
+        zinfo.header_offset = header_offset
+        zinfo.compress_type = compress_type
+        zinfo.compress_size = compress_size
+        zinfo.file_size = file_size
+        zinfo.CRC = crc
+        zinfo.flag_bits = flag_bits
+        return zinfo
+
+    def infolist(self) -> list:
+        return [self.getinfo(name) for name in self._entries]
+
+    def items(self):
+        """:return: iterator of `(name, ZipInfo)` tuples for all members, see `getinfo`"""
+        return ((name, self.getinfo(name)) for name in self._entries)
+
+    def _get_zipfile(self) -> zipfile.ZipFile:
+        z = getattr(self._local, 'zipfile', None)
+        if z is None:
+            z = self._local.zipfile = zipfile.ZipFile(self.zip_path, 'r')
+            with self._lock:
+                self._zipfiles.append(z)
+        return z
+
+    def open(self, name):
+        """
+        Opens the member `name` for reading, with `ZipFile.open` of this thread's `ZipFile`, given the `ZipInfo` from the index.
+        So, like `ZipFile.open`, the name in the local header is checked, encrypted members are rejected
+        and the returned file object decompresses lazily and checks the CRC.
+
+        :raises KeyError: if there is no such member
+        """
+        return self._get_zipfile().open(self.getinfo(name))
+
+    def close(self):
+        """Closes the `ZipFile`s opened by `open`, the index itself can still be used."""
+        with self._lock:
+            zipfiles, self._zipfiles = self._zipfiles, []
+            self._local = threading.local()
+        for z in zipfiles:
+            z.close()
+
+
+_indexes = {}
+
+def get_zip_index(zip_path) -> ZipIndex:
+    """
+    Returns a `ZipIndex` for `zip_path`, reusing the one already loaded in this process unless the zip changed since.
+    """
+    index = _indexes.get(zip_path)
+    if index is None or index.is_stale():
+        index = _indexes[zip_path] = ZipIndex(zip_path)
+    return index
+
+
+def diff_zip_indexes(old, new):
+    """
+    Compares the central directories of two snapshots of a zip file, by member name, CRC32 and size.
+
+    :param old: `ZipIndex` of the previous snapshot
+    :param new: `ZipIndex` of the current snapshot
+    :return: a tuple of lists of member names: `(added, modified, removed)`
+    :rtype: tuple
+    """
+    added, modified = [], []
+    for name, zinfo in new.items():
+        if name not in old:
+            added.append(name)
+            continue
+        old_zinfo = old.getinfo(name)
+        # compare CRC and uncompressed size, header offsets and compression may differ between snapshots
+        if (old_zinfo.CRC, old_zinfo.file_size) != (zinfo.CRC, zinfo.file_size):
+            modified.append(name)
+    removed = [name for name in old.namelist() if name not in new]
+    return added, modified, removed